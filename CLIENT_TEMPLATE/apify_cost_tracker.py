@@ -1,12 +1,24 @@
 """
 Cost and rate limiting tracker for Apify API usage.
 Prevents unbounded API costs from automated job searches.
+
+Actor runs start in parallel, so every check-and-update happens under one lock:
+a thread lock within the process plus an exclusive lock on TRACKER_FILE + '.lock'
+across gunicorn workers. Job budgets are reserved before a run starts and the
+unused part is released once the run's items are counted.
 """
 import os
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: the thread lock still applies
+    fcntl = None
+
 TRACKER_FILE = "apify_usage.json"
 MAX_SEARCHES_PER_DAY = 10
 MAX_JOBS_PER_DAY = 500
@@ -43,13 +55,31 @@ def load_usage_tracker():
         }
 
 def save_usage_tracker(data):
-    """Save the usage tracker to file."""
+    """Save the usage tracker to file (written to a temp file, then renamed into place)."""
     try:
-        with open(TRACKER_FILE, 'w') as f:
+        tmp_file = TRACKER_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_file, TRACKER_FILE)
     except Exception as e:
         print(f"Error saving usage tracker: {e}")
 
+_tracker_lock = threading.Lock()
+
+@contextmanager
+def _locked_tracker():
+    """Load the tracker under the thread + file lock and save it when the block exits cleanly."""
+    with _tracker_lock, open(TRACKER_FILE + '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            tracker = load_usage_tracker()
+            yield tracker
+            save_usage_tracker(tracker)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 def can_make_search():
     """Check if we can make another Apify search today."""
     tracker = load_usage_tracker()
@@ -63,10 +93,34 @@ def can_fetch_jobs(num_jobs, current_run_total=0):
 
 def record_search(jobs_fetched):
     """Record an Apify search and jobs fetched."""
-    tracker = load_usage_tracker()
-    tracker['searches_today'] += 1
-    tracker['jobs_fetched_today'] += jobs_fetched
-    save_usage_tracker(tracker)
+    with _locked_tracker() as tracker:
+        tracker['searches_today'] += 1
+        tracker['jobs_fetched_today'] += jobs_fetched
+
+def try_start_search():
+    """Atomically check the daily search limit and count a new search. False if the limit is reached."""
+    with _locked_tracker() as tracker:
+        if tracker['searches_today'] >= MAX_SEARCHES_PER_DAY:
+            return False
+        tracker['searches_today'] += 1
+        return True
+
+def reserve_jobs(num_jobs):
+    """
+    Atomically reserve up to num_jobs of today's job budget before starting an
+    actor run. Returns how many were granted (0 once the daily limit is reached).
+    """
+    with _locked_tracker() as tracker:
+        granted = max(0, min(num_jobs, MAX_JOBS_PER_DAY - tracker['jobs_fetched_today']))
+        tracker['jobs_fetched_today'] += granted
+        return granted
+
+def release_jobs(num_jobs):
+    """Give back the part of a reservation the run didn't use."""
+    if num_jobs <= 0:
+        return
+    with _locked_tracker() as tracker:
+        tracker['jobs_fetched_today'] = max(0, tracker['jobs_fetched_today'] - num_jobs)
 
 def get_usage_stats():
     """Get current usage statistics."""
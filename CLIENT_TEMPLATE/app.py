@@ -1,17 +1,22 @@
 import os
 import csv
+import json
+import threading
+from collections import deque
 from io import StringIO
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
 from functools import wraps
 from werkzeug.utils import secure_filename
 from apscheduler.schedulers.background import BackgroundScheduler
-from database import init_db, get_all_jobs, get_job_stats, update_job_status, insert_job
+from database import init_db, get_jobs_page, search_jobs, get_job_stats, update_job_status, insert_jobs_many, filter_new_jobs, mark_listings_seen, get_ai_usage_summary, SUB_SCORE_COLUMNS, JOB_SORT_COLUMNS
 from gmail_service import process_job_emails, complete_auth_with_code
-from job_fetcher_apify import search_jobs_apify, fetch_job_from_url_apify
-from job_fetcher_gazette import search_education_gazette
-from ai_matcher import analyze_job_match
-from job_search_config import USER_SEARCH_CONFIG, EXCLUDED_KEYWORDS
-from apify_cost_tracker import can_make_search, can_fetch_jobs, record_search, get_usage_stats
+from job_fetcher_apify import search_jobs_apify_many, fetch_jobs_from_urls_apify
+from job_fetcher_gazette import search_education_gazette, GAZETTE_SOURCE
+from ai_matcher import apply_match_result, score_jobs_batch, resume_score_batches
+from scoring_executor import score_jobs, score_job_stream
+from job_search_config import USER_SEARCH_CONFIG
+from keyword_matcher import has_excluded_keyword, extract_nz_location
+from apify_cost_tracker import can_make_search, try_start_search, get_usage_stats
 from auto_apply import auto_apply_to_job, should_auto_apply
 from dotenv import load_dotenv
 
@@ -52,9 +57,10 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
-@app.route('/')
-@login_required
-def index():
+JOBS_PAGE_SIZE = 50
+
+def get_job_filters_from_request() -> dict:
+    """Build get_jobs_page filters from the dashboard query string."""
     filters = {}
     
     source = request.args.get('source')
@@ -70,10 +76,51 @@ def index():
     if min_score:
         filters['min_score'] = int(min_score)
     
-    jobs = get_all_jobs(filters)
+    # Per-criterion AI sub-scores, e.g. ?min_role_score=25&sort=role_score
+    for column in SUB_SCORE_COLUMNS:
+        value = request.args.get(f'min_{column}', type=int)
+        if value:
+            filters[f'min_{column}'] = value
+    
+    sort = request.args.get('sort')
+    if sort in JOB_SORT_COLUMNS:
+        filters['sort'] = sort
+    
+    return filters
+
+@app.route('/')
+@login_required
+def index():
+    page = get_jobs_page(get_job_filters_from_request(), limit=JOBS_PAGE_SIZE)
     stats = get_job_stats()
     
-    return render_template('index.html', jobs=jobs, stats=stats, filters=request.args)
+    return render_template('index.html', jobs=page['jobs'], next_cursor=page['next_cursor'],
+                           stats=stats, filters=request.args)
+
+@app.route('/api/jobs')
+@login_required
+def api_jobs():
+    """Keyset-paginated job listing for the dashboard's infinite scroll."""
+    try:
+        page = get_jobs_page(
+            get_job_filters_from_request(),
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit', JOBS_PAGE_SIZE, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, **page})
+
+@app.route('/api/search')
+@login_required
+def api_search():
+    """Full-text job search (BM25-ranked, with highlighted snippets) for the dashboard search box."""
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', JOBS_PAGE_SIZE, type=int)
+    
+    jobs = search_jobs(query, get_job_filters_from_request(), limit=limit)
+    return jsonify({'success': True, 'query': query, 'jobs': jobs})
 
 @app.route('/api/sync', methods=['POST'])
 @login_required
@@ -113,83 +160,110 @@ def complete_authorization():
         print(f"Authorization error: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+ANALYZE_SAVE_BATCH_SIZE = 20
+
 @app.route('/analyze_jobs', methods=['POST'])
 @login_required
 def analyze_jobs():
-    """Analyze job URLs pasted by user."""
-    try:
-        data = request.get_json()
-        urls_text = data.get('urls', '')
-        
-        # Parse URLs from text (one per line)
-        import re
-        urls = [line.strip() for line in urls_text.split('\n') if line.strip()]
-        
-        # Filter valid URLs
-        valid_urls = [url for url in urls if url.startswith('http')]
-        
-        if not valid_urls:
-            return jsonify({'success': False, 'error': 'No valid URLs provided'})
-        
+    """
+    Analyze job URLs pasted by user.
+    
+    URLs are fetched with one Apify run per platform, scored concurrently as
+    each run's items arrive, and saved in bulk. The response is streamed as
+    newline-delimited JSON: a 'job' or 'failed' line per URL as soon as it is
+    known, then a final 'done' line with the totals.
+    """
+    data = request.get_json() or {}
+    urls_text = data.get('urls', '')
+    
+    # Parse URLs from text (one per line), keeping the first of any repeats
+    urls = [line.strip() for line in urls_text.split('\n') if line.strip()]
+    valid_urls = list(dict.fromkeys(url for url in urls if url.startswith('http')))
+    
+    if not valid_urls:
+        return jsonify({'success': False, 'error': 'No valid URLs provided'})
+    
+    def line(payload: dict) -> str:
+        return json.dumps(payload) + '\n'
+    
+    def generate():
         print(f"\n{'='*80}")
         print(f"🔍 Analyzing {len(valid_urls)} job URLs")
         print(f"{'='*80}")
         
-        jobs_analyzed = 0
-        jobs_failed = 0
+        failed_urls = deque()
+        pending_save = []
+        counts = {'analyzed': 0, 'failed': 0, 'saved': 0}
         
-        for url in valid_urls:
-            print(f"\n📋 Fetching: {url[:60]}...")
-            
-            # Fetch job data using Apify scraper
-            job_data = fetch_job_from_url_apify(url)
-            
-            if not job_data:
-                print(f"   ❌ Failed to fetch job")
-                jobs_failed += 1
-                continue
-            
-            print(f"   ✅ Fetched: {job_data['job_title']}")
-            print(f"   🏢 Company: {job_data['company_name']}")
-            
-            # Analyze with AI
-            print(f"   🤖 Analyzing with Claude AI...")
-            ai_result = analyze_job_match(job_data)
-            job_data['match_score'] = ai_result['match_score']
-            job_data['ai_analysis'] = ai_result['analysis']
-            job_data['status'] = 'new'
-            job_data['rejection_reason'] = None
-            job_data['email_id'] = None
-            
-            print(f"   ✨ Match Score: {ai_result['match_score']}%")
+        def fetched_jobs():
+            for url, job_data in fetch_jobs_from_urls_apify(valid_urls):
+                if not job_data:
+                    print(f"   ❌ Failed to fetch job: {url[:60]}")
+                    failed_urls.append(url)
+                    continue
+                print(f"   ✅ Fetched: {job_data['job_title']} ({job_data['company_name']})")
+                job_data['email_id'] = None
+                yield job_data
+        
+        def failures():
+            while failed_urls:
+                counts['failed'] += 1
+                yield line({'event': 'failed', 'url': failed_urls.popleft()})
+        
+        def save_pending():
+            if pending_save:
+                result = insert_jobs_many(pending_save)
+                counts['saved'] += len(result['inserted_ids'])
+                print(f"   💾 Saved {len(result['inserted_ids'])} new jobs "
+                      f"({len(pending_save) - len(result['inserted_ids'])} already in database)")
+                pending_save.clear()
+        
+        try:
+            for job_data, ai_result in score_job_stream(fetched_jobs()):
+                yield from failures()
+                apply_match_result(job_data, ai_result)
+                print(f"   ✨ {job_data['job_title']}: {ai_result['match_score']}%")
+                
+                counts['analyzed'] += 1
+                pending_save.append(job_data)
+                if len(pending_save) >= ANALYZE_SAVE_BATCH_SIZE:
+                    save_pending()
+                
+                yield line({
+                    'event': 'job',
+                    'url': job_data['job_url'],
+                    'job_title': job_data['job_title'],
+                    'company_name': job_data['company_name'],
+                    'match_score': ai_result['match_score']
+                })
             
-            # Insert into database
-            job_id = insert_job(job_data)
-            if job_id:
-                jobs_analyzed += 1
-                print(f"   💾 Saved to database (ID: {job_id})")
-            else:
-                print(f"   ⏭️  Duplicate job (already in database)")
-                jobs_analyzed += 1  # Count as analyzed even if duplicate
+            save_pending()
+            yield from failures()
+        except Exception as e:
+            print(f"❌ Error analyzing jobs: {e}")
+            import traceback
+            traceback.print_exc()
+            # Keep whatever was scored before the failure
+            save_pending()
+            yield line({'event': 'done', 'success': False, 'error': str(e)})
+            return
         
         print(f"\n{'='*80}")
         print(f"✅ Analysis Complete!")
-        print(f"   Analyzed: {jobs_analyzed}/{len(valid_urls)}")
-        print(f"   Failed: {jobs_failed}/{len(valid_urls)}")
+        print(f"   Analyzed: {counts['analyzed']}/{len(valid_urls)} ({counts['saved']} new)")
+        print(f"   Failed: {counts['failed']}/{len(valid_urls)}")
         print(f"{'='*80}\n")
         
-        return jsonify({
+        yield line({
+            'event': 'done',
             'success': True,
-            'jobs_analyzed': jobs_analyzed,
-            'jobs_failed': jobs_failed,
+            'jobs_analyzed': counts['analyzed'],
+            'jobs_saved': counts['saved'],
+            'jobs_failed': counts['failed'],
             'total_urls': len(valid_urls)
         })
-        
-    except Exception as e:
-        print(f"❌ Error analyzing jobs: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'success': False, 'error': str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/auto_search_jobs', methods=['POST'])
 @login_required
@@ -217,7 +291,6 @@ def auto_search_jobs():
         all_jobs_found = []
         total_new_jobs = 0
         total_jobs_from_apify = 0
-        jobs_fetched_this_run = 0
         
         # Determine which platforms to search
         platforms_to_search = USER_SEARCH_CONFIG.get('platforms', ['linkedin', 'seek'])
@@ -230,95 +303,64 @@ def auto_search_jobs():
         else:
             return jsonify({'success': False, 'error': 'No platforms configured'})
         
+        # Count this search atomically - concurrent runs can't both take the last slot
+        if not try_start_search():
+            return jsonify({
+                'success': False,
+                'error': 'Daily search limit reached',
+                'usage': get_usage_stats()
+            })
+        
         # OPTIONAL: Search Education Gazette if enabled
         if 'education_gazette' in platforms_to_search:
             print(f"\n📰 Searching Education Gazette NZ...")
             try:
                 gazette_jobs = search_education_gazette(max_jobs=20)
-                for job_data in gazette_jobs:
-                    job_text = f"{job_data['job_title']} {job_data['description']}".lower()
-                    if any(excluded in job_text for excluded in EXCLUDED_KEYWORDS):
-                        continue
-                    
-                    ai_result = analyze_job_match(job_data)
-                    job_data['match_score'] = ai_result['match_score']
-                    job_data['ai_analysis'] = ai_result['analysis']
-                    job_data['status'] = 'new'
-                    
-                    job_id = insert_job(job_data)
-                    if job_id:
-                        job_data['id'] = job_id
-                        total_new_jobs += 1
-                        all_jobs_found.append(job_data)
-                        
-                        if should_auto_apply(job_data):
-                            auto_apply_to_job(job_data)
+                to_score = filter_new_gazette_jobs(gazette_jobs)
+                
+                scored_jobs = []
+                for job_data, ai_result in score_jobs(to_score):
+                    apply_match_result(job_data, ai_result)
+                    scored_jobs.append(job_data)
+                
+                new_jobs = save_jobs_and_auto_apply(scored_jobs)
+                total_new_jobs += len(new_jobs)
+                all_jobs_found.extend(new_jobs)
             except Exception as e:
                 print(f"   ⚠️  Education Gazette unavailable: {e}")
         
         # SEARCH LINKEDIN + SEEK (via Apify) - Main job sources
-        for keyword in USER_SEARCH_CONFIG['keywords']:
-            print(f"\n🔎 Searching LinkedIn/Seek for: {keyword}")
-            
-            # Calculate jobs to fetch for this keyword
-            jobs_per_keyword = USER_SEARCH_CONFIG['max_jobs_per_search'] // len(USER_SEARCH_CONFIG['keywords'])
-            
-            # Check if we can fetch more jobs (including what we've fetched this run)
-            if not can_fetch_jobs(jobs_per_keyword, jobs_fetched_this_run):
-                print(f"⚠️  Daily job limit would be exceeded, stopping search")
-                print(f"   Already fetched {jobs_fetched_this_run} jobs this run")
-                break
-            
-            # Search using Apify
-            jobs = search_jobs_apify(
-                keywords=keyword,
-                location=USER_SEARCH_CONFIG['location'],
-                max_jobs=jobs_per_keyword,
-                platform=platform_mode,
-                remote_only=USER_SEARCH_CONFIG.get('remote_ok', False)
-            )
-            
-            print(f"   Found {len(jobs)} jobs for '{keyword}'")
+        # Every keyword x platform actor run starts at once; each run's job budget
+        # is reserved from the daily limit before it starts
+        keywords = USER_SEARCH_CONFIG['keywords']
+        print(f"\n🔎 Searching LinkedIn/Seek for: {', '.join(keywords)}")
+        apify_jobs = search_jobs_apify_many(
+            keywords,
+            location=USER_SEARCH_CONFIG['location'],
+            max_jobs_per_keyword=USER_SEARCH_CONFIG['max_jobs_per_search'] // len(keywords),
+            platform=platform_mode,
+            remote_only=USER_SEARCH_CONFIG.get('remote_ok', False)
+        )
+        
+        def prepare_for_scoring(jobs):
+            nonlocal total_jobs_from_apify
             total_jobs_from_apify += len(jobs)
-            jobs_fetched_this_run += len(jobs)
+            return filter_jobs_for_scoring(jobs)
+        
+        # Analyze with AI, in parallel within the API rate limits, starting on the
+        # first dataset page while later pages are still downloading
+        scored_jobs = []
+        for job_data, ai_result in score_job_stream(apify_jobs, prepare=prepare_for_scoring):
+            apply_match_result(job_data, ai_result)
+            job_data['email_id'] = None
             
-            for job_data in jobs:
-                # Filter out excluded keywords
-                job_text = f"{job_data['job_title']} {job_data['description']}".lower()
-                if any(excluded in job_text for excluded in EXCLUDED_KEYWORDS):
-                    print(f"   ⏭️  Skipped: {job_data['job_title']} (contains excluded keyword)")
-                    continue
-                
-                # Analyze with AI
-                print(f"   🤖 Analyzing: {job_data['job_title']}")
-                ai_result = analyze_job_match(job_data)
-                job_data['match_score'] = ai_result['match_score']
-                job_data['ai_analysis'] = ai_result['analysis']
-                job_data['status'] = 'new'
-                job_data['rejection_reason'] = None
-                job_data['email_id'] = None
-                
-                print(f"   ✨ Match Score: {ai_result['match_score']}%")
-                
-                # Insert into database
-                job_id = insert_job(job_data)
-                if job_id:
-                    job_data['id'] = job_id
-                    total_new_jobs += 1
-                    all_jobs_found.append(job_data)
-                    print(f"   💾 Saved (ID: {job_id})")
-                    
-                    # Auto-apply if match score is high enough
-                    if should_auto_apply(job_data):
-                        print(f"   🎯 Match score {job_data['match_score']}% - attempting auto-apply")
-                        apply_result = auto_apply_to_job(job_data)
-                        if apply_result['success']:
-                            print(f"   ✅ Application prepared")
-                        else:
-                            print(f"   ⏭️  Auto-apply skipped: {apply_result.get('reason', 'Unknown')}")
-        
-        # Record usage (only record once at the end)
-        record_search(jobs_fetched_this_run)
+            print(f"   ✨ {job_data['job_title']}: Match Score {ai_result['match_score']}%")
+            scored_jobs.append(job_data)
+        
+        # Save the results in one transaction, then auto-apply to the new ones
+        new_jobs = save_jobs_and_auto_apply(scored_jobs)
+        total_new_jobs += len(new_jobs)
+        all_jobs_found.extend(new_jobs)
         
         print(f"\n{'='*80}")
         print(f"✅ AUTO SEARCH COMPLETE!")
@@ -352,7 +394,7 @@ def update_job(job_id):
 @app.route('/api/stats')
 @login_required
 def stats():
-    return jsonify(get_job_stats())
+    return jsonify({**get_job_stats(), 'ai_usage': get_ai_usage_summary()})
 
 @app.route('/scrape_education_gazette', methods=['POST'])
 @login_required
@@ -366,40 +408,19 @@ def scrape_gazette_endpoint():
         print(f"{'='*80}")
         
         gazette_jobs = search_education_gazette(max_jobs=30)
+        to_score = filter_new_gazette_jobs(gazette_jobs)
+        jobs_skipped = len(gazette_jobs) - len(to_score)
         
-        jobs_imported = 0
-        jobs_skipped = 0
+        scored_jobs = []
+        for job_data, ai_result in score_jobs(to_score):
+            apply_match_result(job_data, ai_result)
+            
+            print(f"   ✨ {job_data['job_title']}: Match Score {ai_result['match_score']}%")
+            scored_jobs.append(job_data)
         
-        for job_data in gazette_jobs:
-            try:
-                job_text = f"{job_data['job_title']} {job_data['description']}".lower()
-                if any(excluded in job_text for excluded in EXCLUDED_KEYWORDS):
-                    print(f"   ⏭️  Skipped: {job_data['job_title']} (excluded keyword)")
-                    jobs_skipped += 1
-                    continue
-                
-                print(f"   🤖 Analyzing: {job_data['job_title']}")
-                ai_result = analyze_job_match(job_data)
-                job_data['match_score'] = ai_result['match_score']
-                job_data['ai_analysis'] = ai_result['analysis']
-                job_data['status'] = 'new'
-                
-                print(f"   ✨ Match Score: {ai_result['match_score']}%")
-                
-                job_id = insert_job(job_data)
-                if job_id:
-                    jobs_imported += 1
-                    print(f"   💾 Saved (ID: {job_id})")
-                    
-                    if should_auto_apply(job_data):
-                        auto_apply_to_job(job_data)
-                else:
-                    jobs_skipped += 1
-                    
-            except Exception as e:
-                print(f"   ⚠️  Error: {e}")
-                jobs_skipped += 1
-                continue
+        new_jobs = save_jobs_and_auto_apply(scored_jobs)
+        jobs_imported = len(new_jobs)
+        jobs_skipped += len(scored_jobs) - jobs_imported
         
         print(f"\n{'='*80}")
         print(f"✅ EDUCATION GAZETTE SCRAPE COMPLETE!")
@@ -471,8 +492,9 @@ def upload_gazette_csv():
         else:
             return jsonify({'success': False, 'error': 'Unrecognized CSV format. Expected Education Gazette or Seek format.'})
         
-        jobs_imported = 0
         jobs_skipped = 0
+        candidate_jobs = []
+        scored_jobs = []
         
         for row in rows:
             try:
@@ -510,43 +532,48 @@ def upload_gazette_csv():
                     'contact_email': contact_email
                 }
                 
-                job_text = f"{job_title} {description}".lower()
-                if any(excluded in job_text for excluded in EXCLUDED_KEYWORDS):
+                if has_excluded_keyword(job_title, description):
                     print(f"   ⏭️  Skipped: {job_title} (contains excluded keyword)")
                     jobs_skipped += 1
                     continue
                 
-                print(f"   🤖 Analyzing: {job_title}")
-                ai_result = analyze_job_match(job_data)
-                job_data['match_score'] = ai_result['match_score']
-                job_data['ai_analysis'] = ai_result['analysis']
-                job_data['status'] = 'new'
-                
-                print(f"   ✨ Match Score: {ai_result['match_score']}%")
-                if contact_email:
-                    print(f"   📧 Email: {contact_email}")
-                
-                job_id = insert_job(job_data)
-                if job_id:
-                    job_data['id'] = job_id
-                    jobs_imported += 1
-                    print(f"   💾 Saved (ID: {job_id})")
-                    
-                    if should_auto_apply(job_data):
-                        print(f"   🎯 Match score {job_data['match_score']}% - attempting auto-apply")
-                        apply_result = auto_apply_to_job(job_data)
-                        if apply_result['success']:
-                            print(f"   ✅ Application prepared")
-                        else:
-                            print(f"   ⏭️  Auto-apply skipped: {apply_result.get('reason', '')}")
-                else:
-                    jobs_skipped += 1
+                candidate_jobs.append(job_data)
                 
             except Exception as e:
                 print(f"   ⚠️  Error processing row: {e}")
                 jobs_skipped += 1
                 continue
         
+        # Drop jobs already in the database before spending AI calls on them
+        new_candidates = filter_new_jobs(candidate_jobs)
+        jobs_skipped += len(candidate_jobs) - len(new_candidates)
+        
+        # Batch mode: cheaper bulk scoring that finishes in the background
+        if request.form.get('batch') == '1' and new_candidates:
+            threading.Thread(
+                target=score_batch_and_save, args=(new_candidates,), daemon=True
+            ).start()
+            print(f"   📦 {len(new_candidates)} jobs queued for batch scoring")
+            return jsonify({
+                'success': True,
+                'batch': True,
+                'jobs_queued': len(new_candidates),
+                'jobs_imported': 0,
+                'jobs_skipped': jobs_skipped
+            })
+        
+        for job_data, ai_result in score_jobs(new_candidates):
+            apply_match_result(job_data, ai_result)
+            
+            print(f"   ✨ {job_data['job_title']}: Match Score {ai_result['match_score']}%")
+            if job_data['contact_email']:
+                print(f"   📧 Email: {job_data['contact_email']}")
+            scored_jobs.append(job_data)
+        
+        new_jobs = save_jobs_and_auto_apply(scored_jobs)
+        jobs_imported = len(new_jobs)
+        jobs_skipped += len(scored_jobs) - jobs_imported
+        
         print(f"\n{'='*80}")
         print(f"✅ CSV IMPORT COMPLETE!")
         print(f"   Jobs imported: {jobs_imported}")
@@ -565,19 +592,85 @@ def upload_gazette_csv():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)})
 
-def extract_location_from_description(description: str) -> str:
-    """Extract location from job description."""
-    locations = [
-        'Auckland', 'Wellington', 'Canterbury', 'Christchurch', 
-        'Waikato', 'Hamilton', 'Bay of Plenty', 'Tauranga',
-        'Otago', 'Dunedin', 'Manawatu', 'Palmerston North'
-    ]
+def filter_jobs_for_scoring(jobs: list) -> list:
+    """Drop jobs already in the database and ones with excluded keywords, before AI scoring."""
+    to_score = []
+    for job_data in filter_new_jobs(jobs):
+        if has_excluded_keyword(job_data['job_title'], job_data['description']):
+            print(f"   ⏭️  Skipped: {job_data['job_title']} (contains excluded keyword)")
+            continue
+        to_score.append(job_data)
+    return to_score
+
+def filter_new_gazette_jobs(jobs: list) -> list:
+    """
+    filter_new_jobs for Education Gazette results. Listings it drops as duplicates
+    are marked seen, so incremental crawls don't fetch their detail pages again.
+    """
+    new_jobs = filter_new_jobs(jobs)
+    new_urls = {job_data['job_url'] for job_data in new_jobs}
+    mark_listings_seen(GAZETTE_SOURCE, [job_data['job_url'] for job_data in jobs if job_data['job_url'] not in new_urls])
+    return new_jobs
+
+def save_jobs_and_auto_apply(jobs: list) -> list:
+    """
+    Bulk-save scored jobs in a single transaction, then auto-apply to the new ones.
+    Returns the jobs that were newly inserted (with their 'id' set).
+    """
+    if not jobs:
+        return []
     
-    for location in locations:
-        if location.lower() in description.lower():
-            return location
+    result = insert_jobs_many(jobs)
+    new_jobs = []
     
-    return "New Zealand"
+    for job_data, outcome in zip(jobs, result['outcomes']):
+        if outcome['outcome'] != 'inserted':
+            continue
+        
+        job_data['id'] = outcome['id']
+        new_jobs.append(job_data)
+        print(f"   💾 Saved: {job_data['job_title']} (ID: {outcome['id']})")
+        
+        if should_auto_apply(job_data):
+            print(f"   🎯 Match score {job_data['match_score']}% - attempting auto-apply")
+            apply_result = auto_apply_to_job(job_data)
+            if apply_result['success']:
+                print(f"   ✅ Application prepared")
+            else:
+                print(f"   ⏭️  Auto-apply skipped: {apply_result.get('reason', 'Unknown')}")
+    
+    return new_jobs
+
+UPLOAD_BATCH_LABEL = 'upload_gazette_csv'
+
+def _save_batch_results(scored_pairs) -> int:
+    """Copy batch scores onto their jobs, then save them in bulk. Returns the number saved."""
+    scored_jobs = []
+    for job_data, ai_result in scored_pairs:
+        apply_match_result(job_data, ai_result)
+        scored_jobs.append(job_data)
+    return len(save_jobs_and_auto_apply(scored_jobs))
+
+def score_batch_and_save(jobs: list):
+    """Background worker for batch-mode CSV uploads."""
+    try:
+        saved = _save_batch_results(score_jobs_batch(jobs, label=UPLOAD_BATCH_LABEL))
+        print(f"✅ Batch upload complete: {saved} new jobs saved")
+    except Exception as e:
+        print(f"❌ Error in batch scoring: {e}")
+
+def resume_upload_batches():
+    """Finish batch uploads that were still scoring when the app last stopped."""
+    try:
+        saved = _save_batch_results(resume_score_batches(UPLOAD_BATCH_LABEL))
+        if saved:
+            print(f"✅ Resumed batch uploads: {saved} new jobs saved")
+    except Exception as e:
+        print(f"❌ Error resuming batch scoring: {e}")
+
+def extract_location_from_description(description: str) -> str:
+    """Extract location from job description."""
+    return extract_nz_location(description)
 
 def scheduled_email_check():
     """Run every 30 minutes to check for new job emails."""
@@ -609,7 +702,6 @@ def scheduled_job_search():
             all_jobs_found = []
             total_new_jobs = 0
             total_jobs_from_apify = 0
-            jobs_fetched_this_run = 0
             
             # Determine platforms
             platforms_to_search = USER_SEARCH_CONFIG.get('platforms', ['linkedin', 'seek'])
@@ -623,50 +715,36 @@ def scheduled_job_search():
                 print("❌ No platforms configured")
                 return
             
-            # Search for each keyword
-            for keyword in USER_SEARCH_CONFIG['keywords']:
-                print(f"\n🔎 Searching for: {keyword}")
-                
-                jobs_per_keyword = USER_SEARCH_CONFIG['max_jobs_per_search'] // len(USER_SEARCH_CONFIG['keywords'])
-                
-                if not can_fetch_jobs(jobs_per_keyword, jobs_fetched_this_run):
-                    print(f"⚠️  Daily job limit would be exceeded, stopping search")
-                    break
-                
-                jobs = search_jobs_apify(
-                    keywords=keyword,
-                    location=USER_SEARCH_CONFIG['location'],
-                    max_jobs=jobs_per_keyword,
-                    platform=platform_mode,
-                    remote_only=USER_SEARCH_CONFIG.get('remote_ok', False)
-                )
-                
-                print(f"   Found {len(jobs)} jobs for '{keyword}'")
+            if not try_start_search():
+                print("⚠️  Daily search limit reached, skipping this run")
+                return
+            
+            # Every keyword x platform actor run starts at once, within the daily job budget
+            keywords = USER_SEARCH_CONFIG['keywords']
+            print(f"\n🔎 Searching for: {', '.join(keywords)}")
+            apify_jobs = search_jobs_apify_many(
+                keywords,
+                location=USER_SEARCH_CONFIG['location'],
+                max_jobs_per_keyword=USER_SEARCH_CONFIG['max_jobs_per_search'] // len(keywords),
+                platform=platform_mode,
+                remote_only=USER_SEARCH_CONFIG.get('remote_ok', False)
+            )
+            
+            def prepare_for_scoring(jobs):
+                nonlocal total_jobs_from_apify
                 total_jobs_from_apify += len(jobs)
-                jobs_fetched_this_run += len(jobs)
-                all_jobs_found.extend(jobs)
+                # Only score jobs that are not already in the database
+                return filter_new_jobs(jobs)
             
-            # Process each job
-            record_search(jobs_fetched_this_run)
+            # Scoring starts on the first dataset page while later pages download
+            for job, ai_result in score_job_stream(apify_jobs, prepare=prepare_for_scoring):
+                print(f"\n🤖 Analyzed: {job['job_title']} at {job['company_name']}")
+                apply_match_result(job, ai_result)
+                print(f"  ✅ Match Score: {job['match_score']}%")
+                all_jobs_found.append(job)
             
-            for job in all_jobs_found:
-                # Analyze with AI
-                print(f"\n🤖 Analyzing: {job['job_title']} at {job['company_name']}")
-                ai_result = analyze_job_match(job)
-                job['match_score'] = ai_result['match_score']
-                job['ai_analysis'] = ai_result['analysis']
-                
-                # Save to database
-                job_id = insert_job(job)
-                if job_id:
-                    total_new_jobs += 1
-                    job['id'] = job_id
-                    print(f"  ✅ Match Score: {job['match_score']}%")
-                    
-                    # Auto-apply if 70%+ match
-                    if should_auto_apply(job):
-                        print(f"  🎯 Auto-applying (70%+ match)...")
-                        auto_apply_to_job(job)
+            # Save all results in one transaction, then auto-apply to 70%+ matches
+            total_new_jobs = len(save_jobs_and_auto_apply(all_jobs_found))
             
             print(f"\n{'='*80}")
             print(f"✅ SCHEDULED AUTO SEARCH COMPLETE!")
@@ -681,6 +759,7 @@ def scheduled_job_search():
 
 if __name__ == '__main__':
     init_db()
+    threading.Thread(target=resume_upload_batches, daemon=True).start()
     
     scheduler = BackgroundScheduler()
     
@@ -53,8 +53,12 @@ def prepare_application(job_data: dict) -> Dict:
     print(f"   Company: {job_data['company_name']}")
     print(f"   Match Score: {job_data.get('match_score', 0)}%")
     
-    # Generate cover letter
-    cover_letter = generate_cover_letter(job_data)
+    # Reuse the letter drafted alongside the AI score (fused mode), else generate one
+    cover_letter = job_data.get('cover_letter')
+    if cover_letter:
+        print(f"   ✍️  Using cover letter drafted during scoring ({len(cover_letter)} chars)")
+    else:
+        cover_letter = generate_cover_letter(job_data)
     
     # Save cover letter as PDF
     cover_letter_path = save_cover_letter_as_pdf(
@@ -2,28 +2,15 @@
 AI-powered cover letter generator using Claude.
 Creates personalized cover letters tailored to each job posting.
 """
-import os
-from anthropic import Anthropic
 from cv_profile import USER_PROFILE
+from llm_client import get_anthropic_client, message_usage, record_usage
 
-def generate_cover_letter(job_data: dict) -> str:
-    """
-    Generate a personalized cover letter for a job using Claude AI.
-    
-    Args:
-        job_data: Dictionary containing job details (title, company, description, etc.)
-    
-    Returns:
-        Professionally formatted cover letter as a string
-    """
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-    
-    client = Anthropic(api_key=api_key)
-    user_profile = USER_PROFILE
-    
-    prompt = f"""You are writing a professional cover letter for a teaching job application in New Zealand.
+COVER_LETTER_MODEL = "claude-3-5-haiku-20241022"
+COVER_LETTER_MAX_TOKENS = 1500
+
+def cover_letter_system_prompt(user_profile: dict = USER_PROFILE) -> str:
+    """Applicant profile and letter rules - identical for every job, so sent as a cached prefix."""
+    return f"""You are writing a professional cover letter for a teaching job application in New Zealand.
 
 **Applicant Profile:**
 Name: {user_profile['name']}
@@ -33,12 +20,6 @@ Qualifications: {', '.join(user_profile['qualifications'])}
 Key Skills: {', '.join(user_profile['key_skills'])}
 Languages: {', '.join(user_profile['languages'])}
 
-**Job Details:**
-Position: {job_data['job_title']}
-Company/School: {job_data['company_name']}
-Location: {job_data['location']}
-Description: {job_data['description'][:1500]}
-
 **Requirements:**
 1. Write a compelling, professional cover letter (250-350 words)
 2. Highlight relevant experience with special needs students (autism, Down syndrome, ADHD, intellectual disabilities)
@@ -48,18 +29,46 @@ Description: {job_data['description'][:1500]}
 6. Keep tone professional but warm and personable
 7. Include proper New Zealand business letter format
 8. Do NOT include placeholder addresses - start directly with the greeting
-9. Sign off with "Warm regards" or "Kind regards"
+9. Sign off with "Warm regards" or "Kind regards\""""
+
+def generate_cover_letter(job_data: dict) -> str:
+    """
+    Generate a personalized cover letter for a job using Claude AI.
+    
+    Args:
+        job_data: Dictionary containing job details (title, company, description, etc.)
+    
+    Returns:
+        Professionally formatted cover letter as a string
+    """
+    client = get_anthropic_client()
+    if not client:
+        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
+    
+    user_profile = USER_PROFILE
+    
+    prompt = f"""**Job Details:**
+Position: {job_data['job_title']}
+Company/School: {job_data['company_name']}
+Location: {job_data['location']}
+Description: {job_data['description'][:1500]}
 
 Write the complete cover letter now:"""
 
     response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=1500,
+        model=COVER_LETTER_MODEL,
+        max_tokens=COVER_LETTER_MAX_TOKENS,
+        system=[{
+            'type': 'text',
+            'text': cover_letter_system_prompt(user_profile),
+            'cache_control': {'type': 'ephemeral'}
+        }],
         messages=[{
             "role": "user",
             "content": prompt
         }]
     )
+    record_usage('cover_letter', COVER_LETTER_MODEL, message_usage(response))
     
     # Extract text from response
     cover_letter = ""
@@ -71,10 +80,17 @@ Write the complete cover letter now:"""
     if not cover_letter:
         cover_letter = str(response.content)
     
+    cover_letter = finish_cover_letter(cover_letter)
+    
     print(f"✍️  Generated cover letter ({len(cover_letter)} chars)")
     return cover_letter
 
 
+def finish_cover_letter(cover_letter: str) -> str:
+    """Trim a generated letter."""
+    return cover_letter.strip()
+
+
 def generate_email_subject(job_data: dict) -> str:
     """Generate a professional email subject line for the job application."""
     return f"Application for {job_data['job_title']} - {USER_PROFILE['name']}"
@@ -0,0 +1,344 @@
+"""
+Fast job description extraction from HTML pages.
+
+Pages are parsed with lxml's incremental HTML parser, fed in chunks; script,
+style, nav, header and footer elements are emptied as soon as the parser closes
+them, so they never reach the text extraction. The description is then taken from:
+
+1. per-domain rules (Education Gazette, Seek, LinkedIn)
+2. generic job-description selectors
+3. a readability-style heuristic: the block with the most paragraph text and
+   the least link text
+4. the broad page containers (article, main, .content), then the whole body
+
+Benchmark against the old html.parser path over saved pages (a directory of
+.html fixtures, or the pages in the HTTP cache):
+    python html_extract.py --benchmark [fixtures dir]
+    python html_extract.py --save-fixtures fixtures/
+"""
+
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from lxml import etree
+
+# Emptied while parsing; their tails (text after the closing tag) are kept
+STRIP_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'iframe', 'nav', 'header', 'footer')
+PARSE_CHUNK_SIZE = 64 * 1024
+MIN_DESCRIPTION_CHARS = 100
+
+def _has_class(name: str, tag: str = '*') -> str:
+    """XPath for elements whose class list contains name (CSS '.name')."""
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+# Hostname suffix -> XPath lists per field, tried in order
+DOMAIN_RULES = {
+    'gazette.education.govt.nz': {
+        'description': [_has_class('description', 'div')],
+        'contact': [_has_class('contact', 'div')],
+    },
+    'seek.co.nz': {
+        'description': ["//*[@data-automation='jobAdDetails']", "//*[@data-automation='jobDescription']"],
+    },
+    'seek.com.au': {
+        'description': ["//*[@data-automation='jobAdDetails']", "//*[@data-automation='jobDescription']"],
+    },
+    'linkedin.com': {
+        'description': [
+            _has_class('show-more-less-html__markup'),
+            _has_class('description__text'),
+            _has_class('jobs-description__content'),
+        ],
+    },
+}
+
+# The old fetch_job_description selectors, most specific first
+GENERIC_SELECTORS = [
+    _has_class('job-description'),
+    "//*[@id='job-description']",
+    _has_class('vacancy-description'),
+    _has_class('job-content'),
+    _has_class('posting-content'),
+    "//*[contains(@class, 'job-detail')]",
+    _has_class('description'),
+    "//*[contains(@class, 'description')]",
+]
+CONTAINER_SELECTORS = ['//article', '//main', _has_class('content')]
+
+# Readability scoring: text blocks feed their score to the enclosing containers
+READABILITY_BLOCK_TAGS = ('p', 'li', 'td', 'pre', 'dd', 'blockquote')
+READABILITY_MIN_BLOCK_CHARS = 25
+
+_WHITESPACE = re.compile(r'\s+')
+
+def parse_html(html: str) -> Optional[etree._Element]:
+    """Parse a page incrementally, emptying STRIP_TAGS elements as they close. None if unparseable."""
+    parser = etree.HTMLPullParser(events=('end',), tag=STRIP_TAGS, remove_comments=True, remove_pis=True,
+                                  encoding='utf-8')
+    data = html.encode('utf-8', errors='replace')
+    try:
+        for start in range(0, len(data), PARSE_CHUNK_SIZE):
+            parser.feed(data[start:start + PARSE_CHUNK_SIZE])
+            for _, element in parser.read_events():
+                element.clear(keep_tail=True)
+        root = parser.close()
+    except etree.LxmlError:
+        return None
+    for _, element in parser.read_events():
+        element.clear(keep_tail=True)
+    return root
+
+def element_text(element: etree._Element) -> str:
+    """Visible text of an element with whitespace collapsed (like get_text(' ', strip=True))."""
+    return _WHITESPACE.sub(' ', ' '.join(element.itertext())).strip()
+
+def _outermost(elements: List[etree._Element]) -> List[etree._Element]:
+    """Drop matches nested inside other matches so their text isn't repeated."""
+    matched = set(elements)
+    return [
+        element for element in elements
+        if not any(ancestor in matched for ancestor in element.iterancestors())
+    ]
+
+def _select_text(root: etree._Element, xpaths: List[str], min_chars: int = MIN_DESCRIPTION_CHARS) -> str:
+    """Text of the first XPath whose (outermost) matches hold at least min_chars."""
+    for xpath in xpaths:
+        elements = [element for element in root.xpath(xpath) if isinstance(element, etree._Element)]
+        if not elements:
+            continue
+        text = ' '.join(element_text(element) for element in _outermost(elements)).strip()
+        if len(text) >= min_chars:
+            return text
+    return ''
+
+def _link_density(element: etree._Element, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    link_chars = sum(len(element_text(link)) for link in element.iter('a'))
+    return min(1.0, link_chars / text_length)
+
+def readability_text(root: etree._Element) -> str:
+    """
+    Readability-style fallback: each text block scores 1 + commas + up to 3 for
+    length, credited fully to its parent and half to its grandparent; the best
+    container, discounted by its share of link text, wins.
+    """
+    scores = {}
+    for block in root.iter(*READABILITY_BLOCK_TAGS):
+        text = element_text(block)
+        if len(text) < READABILITY_MIN_BLOCK_CHARS:
+            continue
+        score = 1 + text.count(',') + min(3, len(text) // 100)
+        parent = block.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+    best_text = ''
+    best_score = 0.0
+    for candidate, score in scores.items():
+        text = element_text(candidate)
+        score *= 1 - _link_density(candidate, len(text))
+        if score > best_score:
+            best_score, best_text = score, text
+    return best_text if len(best_text) >= MIN_DESCRIPTION_CHARS else ''
+
+def _domain_rules(url: str) -> Dict[str, List[str]]:
+    host = (urlparse(url).hostname or '').lower()
+    for domain, rules in DOMAIN_RULES.items():
+        if host == domain or host.endswith('.' + domain):
+            return rules
+    return {}
+
+def extract_job_page(html: str, url: str = '', fallback: bool = True) -> Dict[str, str]:
+    """
+    Extract the job description (and, where a domain rule knows it, the contact
+    block) from a job page. 'method' records which step found the description:
+    'domain', 'selector', 'readability', 'container', 'body' or '' if none did.
+
+    With fallback=False only the domain rule is tried (any length counts), so a
+    page without the expected block gives '' rather than the page's boilerplate.
+    """
+    page = {'description': '', 'contact': '', 'method': ''}
+    root = parse_html(html or '')
+    if root is None:
+        return page
+
+    rules = _domain_rules(url)
+    if rules.get('contact'):
+        page['contact'] = _select_text(root, rules['contact'], min_chars=1)
+
+    if not fallback:
+        text = _select_text(root, rules.get('description', []), min_chars=1)
+        if text:
+            page['description'], page['method'] = text, 'domain'
+        return page
+
+    steps = [
+        ('domain', lambda: _select_text(root, rules.get('description', []))),
+        ('selector', lambda: _select_text(root, GENERIC_SELECTORS)),
+        ('readability', lambda: readability_text(root)),
+        ('container', lambda: _select_text(root, CONTAINER_SELECTORS)),
+    ]
+    for method, step in steps:
+        text = step()
+        if text:
+            page['description'], page['method'] = text, method
+            return page
+
+    body = root.find('body')
+    text = element_text(body if body is not None else root)
+    if text:
+        page['description'], page['method'] = text, 'body'
+    return page
+
+def extract_description(html: str, url: str = '') -> str:
+    """Just the description text from extract_job_page."""
+    return extract_job_page(html, url)['description']
+
+def _legacy_extract(html: str) -> str:
+    """The html.parser path fetch_job_description used before this module, for the benchmark."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(['script', 'style', 'nav', 'header', 'footer']):
+        script.decompose()
+    selectors = [
+        '.job-description', '.description', '#job-description',
+        '[class*="description"]', '[class*="job-detail"]',
+        '.vacancy-description', '.job-content', '.posting-content',
+        'article', 'main', '.content'
+    ]
+    text = ''
+    for selector in selectors:
+        elements = soup.select(selector)
+        if elements:
+            text = ' '.join([el.get_text(separator=' ', strip=True) for el in elements])
+            if len(text) > 100:
+                break
+    if len(text) < 100:
+        body = soup.find('body')
+        if body:
+            text = body.get_text(separator=' ', strip=True)
+    return ' '.join(text.split())
+
+def _load_fixtures(fixtures_dir: Optional[str]) -> List[Dict[str, str]]:
+    """
+    Saved pages as {'name', 'url', 'html', 'expected'}. Directory fixtures are
+    named '<host>__<anything>.html'; an optional '<same name>.txt' holds the
+    expected description. Without a directory, pages come from the HTTP cache.
+    """
+    import glob
+    import gzip
+    import os
+
+    fixtures = []
+    if fixtures_dir:
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+            name = os.path.basename(path)[:-len('.html')]
+            with open(path, encoding='utf-8', errors='replace') as f:
+                html = f.read()
+            expected = None
+            if os.path.exists(path[:-len('.html')] + '.txt'):
+                with open(path[:-len('.html')] + '.txt', encoding='utf-8') as f:
+                    expected = f.read()
+            host = name.split('__')[0] if '__' in name else ''
+            fixtures.append({'name': name, 'url': f"https://{host}/" if host else '', 'html': html, 'expected': expected})
+        return fixtures
+
+    from database import get_db
+    with get_db() as conn:
+        rows = conn.execute("SELECT url, encoding, body FROM http_cache WHERE content_type LIKE '%html%'").fetchall()
+    for row in rows:
+        html = gzip.decompress(row['body']).decode(row['encoding'] or 'utf-8', errors='replace')
+        fixtures.append({'name': row['url'], 'url': row['url'], 'html': html, 'expected': None})
+    return fixtures
+
+def save_fixtures(fixtures_dir: str) -> int:
+    """Write every cached HTML page to fixtures_dir as '<host>__<n>.html' for repeatable benchmarks."""
+    import os
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    fixtures = _load_fixtures(None)
+    for number, fixture in enumerate(fixtures, start=1):
+        host = urlparse(fixture['url']).hostname or 'unknown'
+        with open(os.path.join(fixtures_dir, f"{host}__{number}.html"), 'w', encoding='utf-8') as f:
+            f.write(fixture['html'])
+    print(f"💾 Saved {len(fixtures)} cached pages to {fixtures_dir}")
+    return len(fixtures)
+
+def _token_f1(extracted: str, expected: str) -> float:
+    """Bag-of-words F1 between extracted and expected text."""
+    got = extracted.lower().split()
+    want = expected.lower().split()
+    if not got or not want:
+        return 0.0
+    remaining = {}
+    for token in want:
+        remaining[token] = remaining.get(token, 0) + 1
+    overlap = 0
+    for token in got:
+        if remaining.get(token):
+            remaining[token] -= 1
+            overlap += 1
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(got), overlap / len(want)
+    return 2 * precision * recall / (precision + recall)
+
+def benchmark(fixtures_dir: Optional[str] = None, repeat: int = 5):
+    """Compare parse time and extraction quality of the old html.parser path and this module."""
+    fixtures = _load_fixtures(fixtures_dir)
+    if not fixtures:
+        print("No saved pages - pass a fixtures directory, or fetch some job pages so the HTTP cache fills up")
+        return
+
+    timings = {'html.parser': 0.0, 'lxml': 0.0}
+    results = []
+    for fixture in fixtures:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            legacy = _legacy_extract(fixture['html'])
+        timings['html.parser'] += (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            page = extract_job_page(fixture['html'], fixture['url'])
+        timings['lxml'] += (time.perf_counter() - start) / repeat
+        results.append((fixture, legacy, page))
+
+    total_kb = sum(len(fixture['html']) for fixture in fixtures) / 1024
+    print(f"\n⏱️  HTML extraction benchmark: {len(fixtures)} pages, {total_kb:.0f} KB, {repeat} runs each")
+    print(f"   html.parser + selectors: {timings['html.parser'] * 1000:8.1f} ms")
+    print(f"   lxml streaming extract:  {timings['lxml'] * 1000:8.1f} ms  "
+          f"({timings['html.parser'] / max(timings['lxml'], 1e-9):.1f}x faster)")
+
+    methods = {}
+    for _, _, page in results:
+        methods[page['method'] or 'none'] = methods.get(page['method'] or 'none', 0) + 1
+    print(f"   Extraction method: {', '.join(f'{method} {count}' for method, count in sorted(methods.items()))}")
+
+    print(f"\n   {'page':<40} {'old chars':>9} {'new chars':>9} {'old F1':>7} {'new F1':>7}")
+    scored = [(f, legacy, page) for f, legacy, page in results if f['expected']]
+    for fixture, legacy, page in results:
+        old_f1 = f"{_token_f1(legacy, fixture['expected']):.2f}" if fixture['expected'] else '-'
+        new_f1 = f"{_token_f1(page['description'], fixture['expected']):.2f}" if fixture['expected'] else '-'
+        print(f"   {fixture['name'][:40]:<40} {len(legacy):>9} {len(page['description']):>9} {old_f1:>7} {new_f1:>7}")
+    if scored:
+        old_mean = sum(_token_f1(legacy, f['expected']) for f, legacy, _ in scored) / len(scored)
+        new_mean = sum(_token_f1(page['description'], f['expected']) for f, _, page in scored) / len(scored)
+        print(f"\n   Mean F1 against expected text ({len(scored)} pages): old {old_mean:.2f}, new {new_mean:.2f}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark(*sys.argv[2:3])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--save-fixtures':
+        save_fixtures(sys.argv[2])
+    else:
+        print("Usage: python html_extract.py --benchmark [fixtures dir] | --save-fixtures <dir>")
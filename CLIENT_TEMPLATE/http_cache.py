@@ -0,0 +1,138 @@
+"""
+Shared HTTP session plus an on-disk response cache for job pages.
+
+Every page fetch goes through one pooled requests.Session, so repeated fetches
+from the same site reuse keep-alive connections. Successful responses are stored
+gzip-compressed in jobs.db (http_cache table):
+
+- within HTTP_CACHE_TTL_SECONDS a cached page is served without touching the network
+- after that it is revalidated with If-None-Match / If-Modified-Since, and a
+  304 Not Modified re-serves the stored body
+- entries unused for HTTP_CACHE_MAX_AGE_SECONDS, and the least recently used
+  ones beyond HTTP_CACHE_MAX_BYTES, are evicted periodically
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from database import get_http_cache_entry, put_http_cache_entry, refresh_http_cache_entry, prune_http_cache
+
+HTTP_CACHE_TTL_SECONDS = int(os.environ.get('HTTP_CACHE_TTL_SECONDS', str(24 * 3600)))
+HTTP_CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+HTTP_CACHE_PRUNE_EVERY = 50
+
+HTTP_POOL_SIZE = 10
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_cache_writes = 0
+
+def get_http_session() -> requests.Session:
+    """The process-wide pooled session, created on first use (and again after a fork)."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(BROWSER_HEADERS)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+class CachedResponse:
+    """
+    The parts of a response callers use. cache_status is 'hit' (served from the
+    cache), 'revalidated' (304 from the server), 'stale' (server unreachable,
+    cached copy served) or 'miss' (fetched from the network).
+    """
+
+    def __init__(self, url: str, status_code: int, content: bytes, encoding: Optional[str], cache_status: str):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.cache_status = cache_status
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+def _from_entry(url: str, entry: dict, cache_status: str) -> CachedResponse:
+    return CachedResponse(url, 200, gzip.decompress(entry['body']), entry['encoding'], cache_status)
+
+def _lookup(url: str) -> Optional[dict]:
+    """Cache read that never breaks a fetch (e.g. if init_db hasn't run yet)."""
+    try:
+        return get_http_cache_entry(url)
+    except sqlite3.Error as e:
+        print(f"   ⚠️  HTTP cache unavailable: {e}")
+        return None
+
+def _store(url: str, response: requests.Response):
+    """Cache write that never breaks a fetch; prunes old/oversized entries periodically."""
+    global _cache_writes
+    if 'no-store' in response.headers.get('Cache-Control', '').lower():
+        return
+    try:
+        put_http_cache_entry(
+            url,
+            gzip.compress(response.content, compresslevel=6),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            content_type=response.headers.get('Content-Type'),
+            encoding=response.encoding or response.apparent_encoding
+        )
+        _cache_writes += 1
+        if _cache_writes % HTTP_CACHE_PRUNE_EVERY == 0:
+            prune_http_cache(HTTP_CACHE_MAX_AGE_SECONDS, HTTP_CACHE_MAX_BYTES)
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Could not cache {url}: {e}")
+
+def cached_get(url: str, timeout: float = 15, ttl: float = HTTP_CACHE_TTL_SECONDS) -> CachedResponse:
+    """
+    GET url through the shared session and the on-disk cache. Non-200 responses
+    are returned but never cached. Raises requests exceptions like requests.get,
+    unless a cached copy (however old) can be served instead.
+    """
+    entry = _lookup(url)
+    if entry and time.time() - entry['fetched_at'] < ttl:
+        return _from_entry(url, entry, 'hit')
+
+    headers = {}
+    if entry and entry['etag']:
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry['last_modified']:
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = get_http_session().get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        if not entry:
+            raise
+        print(f"   ⚠️  {e.__class__.__name__} fetching {url} - serving cached copy")
+        return _from_entry(url, entry, 'stale')
+
+    if response.status_code == 304 and entry:
+        try:
+            refresh_http_cache_entry(url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        except sqlite3.Error as e:
+            print(f"   ⚠️  Could not refresh cached {url}: {e}")
+        return _from_entry(url, entry, 'revalidated')
+
+    if response.status_code == 200:
+        _store(url, response)
+    return CachedResponse(url, response.status_code, response.content,
+                          response.encoding or response.apparent_encoding, 'miss')
@@ -1,231 +1,354 @@
 import os
-from typing import Dict, Optional, List
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, List, Iterator, Tuple, Set
 from datetime import datetime
 from apify_client import ApifyClient
+from apify_cost_tracker import reserve_jobs, release_jobs
+from database import get_known_job_urls
 
 APIFY_API_KEY = os.environ.get('APIFY_API_KEY')
 
-def search_jobs_apify(keywords: str, location: str = "New Zealand", max_jobs: int = 50, platform: str = "both", remote_only: bool = False) -> List[Dict]:
+LINKEDIN_ACTOR = "bebity/linkedin-jobs-scraper"
+SEEK_ACTOR = "websift/seek-job-scraper"
+
+# How long to wait for a started actor run before aborting it
+APIFY_RUN_TIMEOUT_SECS = int(os.environ.get('APIFY_RUN_TIMEOUT_SECS', '900'))
+
+# Dataset items are read a page at a time, so callers can start on the first
+# page while later ones are still downloading
+DATASET_PAGE_SIZE = 100
+
+def _linkedin_search_input(keywords: str, location: str, max_items: int, remote_only: bool) -> Dict:
+    return {
+        "keywords": keywords,
+        "location": location,
+        "maxItems": max_items,
+        "remote": "Remote" if remote_only else "Any"
+    }
+
+
+def _linkedin_start_urls_input(urls: List[str], max_items: int) -> Dict:
+    return {
+        "startUrls": [{"url": url} for url in urls],
+        "maxItems": max_items
+    }
+
+
+def _linkedin_job(item: Dict, location: str, remote_only: bool = False) -> Optional[Dict]:
+    """Normalize one LinkedIn actor dataset item."""
+    return {
+        'job_title': item.get('job_title', item.get('title', 'Unknown Job')),
+        'company_name': item.get('company', item.get('company_name', 'Unknown Company')),
+        'location': item.get('location', location),
+        'description': item.get('description', item.get('job_description', ''))[:1000],
+        'job_url': item.get('job_url', item.get('url', '')),
+        'source_platform': 'LinkedIn',
+        'posted_date': item.get('posted_date', datetime.now().strftime('%Y-%m-%d')),
+        'salary_info': item.get('salary', item.get('compensation', None)),
+        'employment_type': item.get('employment_type', item.get('job_type', None)),
+        'experience_level': item.get('experience_level', None),
+        'applicants_count': item.get('applicants', item.get('num_applicants', None))
+    }
+
+
+def _seek_search_input(keywords: str, location: str, max_items: int, remote_only: bool) -> Dict:
+    return {
+        "keyword": keywords,
+        "place": location.lower().replace('new zealand', 'new-zealand'),
+        "maxItems": max_items,
+        "workType": "Any"
+    }
+
+
+def _seek_start_urls_input(urls: List[str], max_items: int) -> Dict:
+    return {
+        "startUrls": list(urls),
+        "maxItems": max_items
+    }
+
+
+def _seek_job(item: Dict, location: str, remote_only: bool = False) -> Optional[Dict]:
+    """Normalize one Seek actor dataset item (None if it fails the remote filter)."""
+    # Filter for remote jobs if requested
+    if remote_only:
+        work_arrangement = item.get('workArrangement', '').lower()
+        if 'remote' not in work_arrangement and 'work from home' not in work_arrangement:
+            return None
+    
+    return {
+        'job_title': item.get('title', item.get('job_title', 'Unknown Job')),
+        'company_name': item.get('company', item.get('advertiser', 'Unknown Company')),
+        'location': item.get('location', item.get('suburb', location)),
+        'description': item.get('description', item.get('teaser', ''))[:1000],
+        'job_url': item.get('jobUrl', item.get('url', '')),
+        'source_platform': 'Seek NZ',
+        'posted_date': item.get('listedDate', item.get('posted_date', datetime.now().strftime('%Y-%m-%d'))),
+        'salary_info': item.get('salary', item.get('salaryRange', None)),
+        'employment_type': item.get('workType', item.get('job_type', None)),
+        'experience_level': None,
+        'applicants_count': None
+    }
+
+
+# platform -> actor, input builders and item normalizer. start_urls_input takes
+# job-page URLs, so several pasted URLs share one run.
+APIFY_PLATFORMS = {
+    'linkedin': {'name': 'LinkedIn', 'actor': LINKEDIN_ACTOR, 'domain': 'linkedin.com',
+                 'search_input': _linkedin_search_input,
+                 'start_urls_input': _linkedin_start_urls_input, 'to_job': _linkedin_job},
+    'seek': {'name': 'Seek', 'actor': SEEK_ACTOR, 'domain': 'seek.co.nz',
+             'search_input': _seek_search_input,
+             'start_urls_input': _seek_start_urls_input, 'to_job': _seek_job},
+}
+
+
+def _platform_keys(platform: str) -> List[str]:
+    return ['linkedin', 'seek'] if platform == 'both' else [platform]
+
+
+def _url_platform(url: str) -> Optional[str]:
+    for key, config in APIFY_PLATFORMS.items():
+        if config['domain'] in url:
+            return key
+    return None
+
+
+def _job_id(url: Optional[str]) -> Optional[str]:
+    """The numeric job id in a LinkedIn or Seek job URL (e.g. /jobs/view/...-3812345678, /job/81234567)."""
+    if not url:
+        return None
+    ids = re.findall(r'\d{6,}', str(url))
+    return ids[-1] if ids else None
+
+
+def load_known_job_urls() -> Set[str]:
+    """Every job_url already in jobs.db, for dropping known jobs while datasets stream in."""
+    try:
+        return get_known_job_urls()
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not load known job URLs ({e}) - callers will dedupe instead")
+        return set()
+
+
+def _iterate_dataset(client: ApifyClient, dataset_id: str) -> Iterator[Dict]:
+    """Yield a dataset's items, fetching DATASET_PAGE_SIZE at a time."""
+    dataset = client.dataset(dataset_id)
+    offset = 0
+    while True:
+        items = dataset.list_items(offset=offset, limit=DATASET_PAGE_SIZE).items
+        yield from items
+        if len(items) < DATASET_PAGE_SIZE:
+            return
+        offset += len(items)
+
+
+def _is_new_job(job_data: Optional[Dict], known_urls: Set[str]) -> bool:
+    """False for empty results and known URLs; a new URL is remembered, so repeats in the stream drop too."""
+    if not job_data:
+        return False
+    url = job_data.get('job_url')
+    if url:
+        if url in known_urls:
+            return False
+        known_urls.add(url)
+    return True
+
+
+def _wait_for_run(client: ApifyClient, run: Dict) -> Dict:
+    """Block until a started run finishes; raises (after aborting it) unless it succeeded."""
+    finished = client.run(run['id']).wait_for_finish(wait_secs=APIFY_RUN_TIMEOUT_SECS)
+    status = (finished or {}).get('status')
+    if status in (None, 'READY', 'RUNNING'):
+        client.run(run['id']).abort()
+        raise TimeoutError(f"actor run {run['id']} still running after {APIFY_RUN_TIMEOUT_SECS}s - aborted")
+    if status != 'SUCCEEDED':
+        raise ValueError(f"actor run {run['id']} finished with status {status}")
+    return finished
+
+
+def _start_runs(client: ApifyClient, specs: List[Dict], errors: List[str]) -> List[Dict]:
+    """Start every run spec's actor at once with .start(); failed starts release their reservation."""
+    started = []
+    for spec in specs:
+        config = APIFY_PLATFORMS[spec['platform']]
+        try:
+            spec['run'] = client.actor(config['actor']).start(run_input=spec['run_input'])
+        except Exception as e:
+            release_jobs(spec['granted'])
+            errors.append(f"{config['name']} {spec['label']}: {e}")
+            print(f"❌ {config['name']} error for {spec['label']}: {e}")
+            continue
+        print(f"🔍 Started {config['name']} run for {spec['label']}")
+        started.append(spec)
+    return started
+
+
+def _stream_runs(client: ApifyClient, specs: List[Dict], errors: List[str]) -> Iterator[Tuple[Dict, Optional[Dict]]]:
     """
-    Search for jobs using Apify scrapers.
+    Wait on all started runs together and yield (spec, item) from each run's
+    dataset as soon as that run finishes, then (spec, None) to mark its end.
+    spec['succeeded'] records whether the run worked; the part of its job
+    reservation it didn't return is released.
+    """
+    if not specs:
+        return
+    with ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix='apify-run') as pool:
+        futures = {pool.submit(_wait_for_run, client, spec['run']): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            config = APIFY_PLATFORMS[spec['platform']]
+            fetched = 0
+            try:
+                finished = future.result()
+                for item in _iterate_dataset(client, finished['defaultDatasetId']):
+                    fetched += 1
+                    yield spec, item
+                spec['succeeded'] = True
+                print(f"✅ {config['name']} run for {spec['label']} returned {fetched} items")
+            except Exception as e:
+                spec['succeeded'] = False
+                errors.append(f"{config['name']} {spec['label']}: {e}")
+                print(f"❌ {config['name']} error for {spec['label']}: {e}")
+            finally:
+                release_jobs(spec['granted'] - fetched)
+            yield spec, None
+
+
+def _search_spec(key: str, keyword: str, location: str, granted: int, remote_only: bool) -> Dict:
+    """One keyword search run, using the actor's own keyword input."""
+    return {
+        'platform': key,
+        'granted': granted,
+        'label': f"'{keyword}'",
+        'run_input': APIFY_PLATFORMS[key]['search_input'](keyword, location, granted, remote_only)
+    }
+
+
+def search_jobs_apify_many(keywords: List[str], location: str = "New Zealand", max_jobs_per_keyword: int = 50,
+                           platform: str = "both", remote_only: bool = False,
+                           known_urls: Optional[Set[str]] = None) -> Iterator[Dict]:
+    """
+    Run every keyword search on every platform and yield job_data as each run
+    finishes, streaming its dataset items.
     
-    Args:
-        keywords: Job keywords/titles to search for
-        location: Job location (default: New Zealand)
-        max_jobs: Maximum number of jobs to return (default: 50)
-        platform: 'linkedin', 'seek', or 'both' (default: both)
-        remote_only: Filter for remote jobs only (default: False)
+    There is one actor run per keyword and platform; every run is started with
+    .start() up front and waited on together. Each run's maxItems is reserved
+    from the daily job budget before it starts (apify_cost_tracker); runs the
+    budget can't cover are skipped, and unused reservations are released.
     
-    Returns:
-        List of job dictionaries with standardized fields
+    Jobs whose URL is in known_urls (by default every URL in jobs.db) are
+    dropped as the items stream in; new URLs are added to the set.
+    
+    Raises ValueError if every run failed.
     """
     if not APIFY_API_KEY:
         print("❌ ERROR: APIFY_API_KEY not found in environment")
         raise ValueError("APIFY_API_KEY environment variable is required for job search")
     
     client = ApifyClient(APIFY_API_KEY)
-    all_jobs = []
-    errors = []
+    known_urls = load_known_job_urls() if known_urls is None else known_urls
+    platforms = _platform_keys(platform)
+    per_platform = max_jobs_per_keyword // len(platforms) if len(platforms) > 1 else max_jobs_per_keyword
     
-    if platform in ['linkedin', 'both']:
-        try:
-            linkedin_jobs = search_linkedin_jobs(client, keywords, location, max_jobs // 2 if platform == 'both' else max_jobs, remote_only)
-            all_jobs.extend(linkedin_jobs)
-        except Exception as e:
-            errors.append(f"LinkedIn: {str(e)}")
-            print(f"❌ LinkedIn search error: {e}")
-            if platform == 'linkedin':
-                raise
+    specs = []
+    errors = []
+    for key in platforms:
+        for keyword in keywords:
+            granted = reserve_jobs(per_platform)
+            if not granted:
+                print(f"⚠️  Daily job limit reached - not searching {APIFY_PLATFORMS[key]['name']} for {keyword}")
+                continue
+            specs.append(_search_spec(key, keyword, location, granted, remote_only))
     
-    if platform in ['seek', 'both']:
-        try:
-            seek_jobs = search_seek_jobs(client, keywords, location, max_jobs // 2 if platform == 'both' else max_jobs, remote_only)
-            all_jobs.extend(seek_jobs)
-        except Exception as e:
-            errors.append(f"Seek: {str(e)}")
-            print(f"❌ Seek search error: {e}")
-            if platform == 'seek':
-                raise
+    runs = _start_runs(client, specs, errors)
+    for spec, item in _stream_runs(client, runs, errors):
+        if item is None:
+            continue
+        job_data = APIFY_PLATFORMS[spec['platform']]['to_job'](item, location, remote_only)
+        if _is_new_job(job_data, known_urls):
+            yield job_data
     
-    if not all_jobs and errors:
+    if errors and not any(spec.get('succeeded') for spec in runs):
         error_msg = f"All searches failed - {'; '.join(errors)}"
         print(f"⚠️  {error_msg}")
         raise ValueError(error_msg)
-    
-    return all_jobs[:max_jobs]
-
-
-def search_linkedin_jobs(client: ApifyClient, keywords: str, location: str, max_jobs: int, remote_only: bool = False) -> List[Dict]:
-    """Search LinkedIn jobs using Apify actor bebity/linkedin-jobs-scraper."""
-    print(f"🔍 Searching LinkedIn for '{keywords}' in {location}...")
-    
-    run_input = {
-        "keywords": keywords,
-        "location": location,
-        "maxItems": max_jobs,
-        "remote": "Remote" if remote_only else "Any"
-    }
-    
-    run = client.actor("bebity/linkedin-jobs-scraper").call(run_input=run_input)
-    
-    if not run or "defaultDatasetId" not in run:
-        print("❌ LinkedIn scraper run failed - no dataset returned")
-        raise ValueError("LinkedIn actor returned no dataset - check actor ID and input parameters")
-    
-    jobs = []
-    for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-        job_data = {
-            'job_title': item.get('job_title', item.get('title', 'Unknown Job')),
-            'company_name': item.get('company', item.get('company_name', 'Unknown Company')),
-            'location': item.get('location', location),
-            'description': item.get('description', item.get('job_description', ''))[:1000],
-            'job_url': item.get('job_url', item.get('url', '')),
-            'source_platform': 'LinkedIn',
-            'posted_date': item.get('posted_date', datetime.now().strftime('%Y-%m-%d')),
-            'salary_info': item.get('salary', item.get('compensation', None)),
-            'employment_type': item.get('employment_type', item.get('job_type', None)),
-            'experience_level': item.get('experience_level', None),
-            'applicants_count': item.get('applicants', item.get('num_applicants', None))
-        }
-        jobs.append(job_data)
-    
-    print(f"✅ Found {len(jobs)} LinkedIn jobs")
-    return jobs
 
 
-def search_seek_jobs(client: ApifyClient, keywords: str, location: str, max_jobs: int, remote_only: bool = False) -> List[Dict]:
-    """Search Seek NZ jobs using Apify actor websift/seek-job-scraper."""
-    print(f"🔍 Searching Seek for '{keywords}' in {location}...")
-    
-    run_input = {
-        "keyword": keywords,
-        "place": location.lower().replace('new zealand', 'new-zealand'),
-        "maxItems": max_jobs,
-        "workType": "Any"
-    }
-    
-    run = client.actor("websift/seek-job-scraper").call(run_input=run_input)
-    
-    if not run or "defaultDatasetId" not in run:
-        print("❌ Seek scraper run failed - no dataset returned")
-        raise ValueError("Seek actor returned no dataset - check actor ID and input parameters")
+def search_jobs_apify(keywords: str, location: str = "New Zealand", max_jobs: int = 50, platform: str = "both", remote_only: bool = False) -> List[Dict]:
+    """
+    Search for jobs using Apify scrapers.
     
-    jobs = []
-    for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-        # Filter for remote jobs if requested
-        if remote_only:
-            work_arrangement = item.get('workArrangement', '').lower()
-            if 'remote' not in work_arrangement and 'work from home' not in work_arrangement:
-                continue
-        
-        job_data = {
-            'job_title': item.get('title', item.get('job_title', 'Unknown Job')),
-            'company_name': item.get('company', item.get('advertiser', 'Unknown Company')),
-            'location': item.get('location', item.get('suburb', location)),
-            'description': item.get('description', item.get('teaser', ''))[:1000],
-            'job_url': item.get('jobUrl', item.get('url', '')),
-            'source_platform': 'Seek NZ',
-            'posted_date': item.get('listedDate', item.get('posted_date', datetime.now().strftime('%Y-%m-%d'))),
-            'salary_info': item.get('salary', item.get('salaryRange', None)),
-            'employment_type': item.get('workType', item.get('job_type', None)),
-            'experience_level': None,
-            'applicants_count': None
-        }
-        jobs.append(job_data)
+    Args:
+        keywords: Job keywords/titles to search for
+        location: Job location (default: New Zealand)
+        max_jobs: Maximum number of jobs to return (default: 50)
+        platform: 'linkedin', 'seek', or 'both' (default: both)
+        remote_only: Filter for remote jobs only (default: False)
     
-    print(f"✅ Found {len(jobs)} Seek jobs")
-    return jobs
+    Returns:
+        List of job dictionaries with standardized fields
+    """
+    # No known-URL filtering here: callers get every job found, as before
+    jobs = list(search_jobs_apify_many([keywords], location, max_jobs, platform, remote_only, known_urls=set()))
+    return jobs[:max_jobs]
 
 
-def fetch_job_from_url_apify(url: str) -> Optional[Dict]:
+def fetch_jobs_from_urls_apify(urls: List[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
     """
-    Fetch a single job from URL using Apify scrapers.
-    This is for when users paste individual job URLs.
+    Fetch pasted job URLs with one multi-startUrls actor run per platform, all
+    started at once. Yields (url, job_data) as each platform's run finishes;
+    job_data is None for unsupported URLs and ones the run returned nothing for.
+    Items are matched back to their URL by the numeric job id.
     """
     if not APIFY_API_KEY:
         print("Error: APIFY_API_KEY not found in environment")
-        return None
+        for url in urls:
+            yield url, None
+        return
     
-    client = ApifyClient(APIFY_API_KEY)
-    
-    try:
-        if 'linkedin.com' in url:
-            return fetch_single_linkedin_job(client, url)
-        elif 'seek.co.nz' in url:
-            return fetch_single_seek_job(client, url)
+    groups = {}
+    for url in dict.fromkeys(urls):
+        key = _url_platform(url)
+        if key:
+            groups.setdefault(key, []).append(url)
         else:
             print(f"Unsupported platform for URL: {url}")
-            return None
-            
-    except Exception as e:
-        print(f"Error fetching job from {url}: {e}")
-        return None
-
-
-def fetch_single_linkedin_job(client: ApifyClient, url: str) -> Optional[Dict]:
-    """Fetch a single LinkedIn job from URL."""
-    try:
-        run_input = {
-            "startUrls": [{"url": url}],
-            "maxItems": 1
-        }
-        
-        run = client.actor("bebity/linkedin-jobs-scraper").call(run_input=run_input)
-        
-        if not run or "defaultDatasetId" not in run:
-            return None
-        
-        for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-            return {
-                'job_title': item.get('job_title', item.get('title', 'LinkedIn Job')),
-                'company_name': item.get('company', item.get('company_name', 'Unknown Company')),
-                'location': item.get('location', ''),
-                'description': item.get('description', item.get('job_description', ''))[:1000],
-                'job_url': url,
-                'source_platform': 'LinkedIn',
-                'posted_date': item.get('posted_date', datetime.now().strftime('%Y-%m-%d')),
-                'salary_info': item.get('salary', item.get('compensation', None)),
-                'employment_type': item.get('employment_type', None),
-                'experience_level': item.get('experience_level', None)
-            }
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error fetching LinkedIn job: {e}")
-        return None
-
-
-def fetch_single_seek_job(client: ApifyClient, url: str) -> Optional[Dict]:
-    """Fetch a single Seek job from URL."""
-    try:
-        job_id = url.split('/')[-1].split('?')[0]
-        
-        run_input = {
-            "startUrls": [url],
-            "maxItems": 1
-        }
-        
-        run = client.actor("websift/seek-job-scraper").call(run_input=run_input)
-        
-        if not run or "defaultDatasetId" not in run:
-            return None
-        
-        for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-            return {
-                'job_title': item.get('title', 'Seek Job'),
-                'company_name': item.get('company', item.get('advertiser', 'Unknown Company')),
-                'location': item.get('location', item.get('suburb', '')),
-                'description': item.get('description', item.get('teaser', ''))[:1000],
-                'job_url': url,
-                'source_platform': 'Seek NZ',
-                'posted_date': item.get('listedDate', datetime.now().strftime('%Y-%m-%d')),
-                'salary_info': item.get('salary', item.get('salaryRange', None)),
-                'employment_type': item.get('workType', None)
-            }
+            yield url, None
+    
+    client = ApifyClient(APIFY_API_KEY)
+    errors = []
+    specs = [
+        {'platform': key, 'urls': group, 'granted': 0, 'label': f"{len(group)} job URLs",
+         'run_input': APIFY_PLATFORMS[key]['start_urls_input'](group, len(group))}
+        for key, group in groups.items()
+    ]
+    
+    pending = {spec['platform']: {_job_id(url) or url: url for url in spec['urls']} for spec in specs}
+    for spec, item in _stream_runs(client, _start_runs(client, specs, errors), errors):
+        remaining = pending[spec['platform']]
+        if item is None:
+            # The run is over - whatever it didn't return failed
+            for url in remaining.values():
+                yield url, None
+            remaining.clear()
+            continue
         
-        return None
+        job_data = APIFY_PLATFORMS[spec['platform']]['to_job'](item, '')
+        candidates = [job_data.get('job_url'), item.get('url'), item.get('link'), item.get('id'), item.get('jobId')]
+        match = next((_job_id(value) or value for value in candidates
+                      if value and (_job_id(value) or value) in remaining), None)
+        if match is None and len(spec['urls']) == 1 and remaining:
+            match = next(iter(remaining))
+        if match is None:
+            continue
         
-    except Exception as e:
-        print(f"Error fetching Seek job: {e}")
-        return None
+        url = remaining.pop(match)
+        job_data['job_url'] = url
+        yield url, job_data
+    
+    # Runs that never started
+    for remaining in pending.values():
+        for url in remaining.values():
+            yield url, None
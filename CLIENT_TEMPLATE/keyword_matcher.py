@@ -0,0 +1,162 @@
+"""
+Compiled keyword matching shared by every job filter.
+
+Each keyword list is compiled once, at import, into whole-word patterns: a
+single regex alternation that returns every hit in one scan of the text, and
+per-keyword checks for "does any keyword appear" lookups. Matching ignores case
+so callers no longer lowercase the text themselves, and 'hod' no longer matches
+inside 'method'.
+
+Benchmark against the old `in` loops over the archived Gazette export:
+    python keyword_matcher.py --benchmark [gazette_jobs_fresh.csv]
+"""
+
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+from job_search_config import EXCLUDED_KEYWORDS, NZ_LOCATIONS
+
+def _normalize(phrase: str) -> str:
+    return ' '.join(phrase.lower().split())
+
+def _keyword_regex(key: str) -> str:
+    """A normalized keyword as regex: any run of whitespace in the text matches a space."""
+    return re.escape(key).replace(r'\ ', r'\s+')
+
+def _whole_word(body: str) -> re.Pattern:
+    """body with whole-word edges (lookarounds, not \b, so "years 1-3" works) and an optional plural 's'."""
+    return re.compile(r'(?<!\w)(' + body + r')s?(?!\w)')
+
+class KeywordMatcher:
+    """
+    Matches a fixed list of keywords or phrases as whole words, ignoring case.
+    Hits are returned as the keywords were given (e.g. 'Auckland').
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._canonical = {}
+        for keyword in self.keywords:
+            self._canonical.setdefault(_normalize(keyword), keyword)
+
+        # One alternation over every keyword, longest first so "deputy principal" wins
+        # over "principal". A plural 's' is allowed ("new entrants"). Matching
+        # lowercased text without re.IGNORECASE is about twice as fast.
+        alternatives = [_keyword_regex(key) for key in sorted(self._canonical, key=len, reverse=True)]
+        self.pattern = _whole_word('|'.join(alternatives)) if alternatives else None
+
+        # first() checks keywords in list order with the same whole-word rules as
+        # find_all. A keyword can only match where its first word appears, which
+        # CPython's substring search finds far faster than a regex, so the pattern is
+        # only .match()ed at those positions
+        self._checks = [
+            (key.split(' ', 1)[0], _whole_word(_keyword_regex(key)), keyword)
+            for key, keyword in self._canonical.items()
+        ]
+
+    def find_all(self, text: Optional[str]) -> List[str]:
+        """Every hit in one pass, in order of appearance, repeats included."""
+        if not text or self.pattern is None:
+            return []
+        return [self._canonical[_normalize(match.group(1))] for match in self.pattern.finditer(text.lower())]
+
+    def counts(self, text: Optional[str]) -> Dict[str, int]:
+        """Number of hits per keyword."""
+        counts = {}
+        for keyword in self.find_all(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def first(self, text: Optional[str]) -> Optional[str]:
+        """The earliest keyword in the list (not in the text) that appears, or None."""
+        if not text:
+            return None
+        lowered = text.lower()
+        for anchor, pattern, keyword in self._checks:
+            start = lowered.find(anchor)
+            while start != -1:
+                if pattern.match(lowered, start):
+                    return keyword
+                start = lowered.find(anchor, start + 1)
+        return None
+
+    def matches(self, text: Optional[str]) -> bool:
+        return self.first(text) is not None
+
+EXCLUDED_MATCHER = KeywordMatcher(EXCLUDED_KEYWORDS)
+LOCATION_MATCHER = KeywordMatcher(NZ_LOCATIONS)
+
+def has_excluded_keyword(*texts: Optional[str]) -> Optional[str]:
+    """The first EXCLUDED_KEYWORDS hit across the given texts (e.g. title, description), or None."""
+    for text in texts:
+        hit = EXCLUDED_MATCHER.first(text)
+        if hit:
+            return hit
+    return None
+
+def extract_nz_location(text: Optional[str], default: str = "New Zealand") -> str:
+    """The first NZ_LOCATIONS entry (in list order) mentioned in the text."""
+    return LOCATION_MATCHER.first(text) or default
+
+def benchmark(csv_path: str = 'gazette_jobs_fresh.csv', repeat: int = 20):
+    """Time the compiled matchers against the substring loops they replaced."""
+    import csv
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        texts = [f"{row.get('Title', '')} {row.get('Description', '')}" for row in csv.DictReader(f)]
+    if not texts:
+        print(f"No rows in {csv_path}")
+        return
+
+    excluded_lower = [keyword.lower() for keyword in EXCLUDED_KEYWORDS]
+
+    def old_excluded(text):
+        text = text.lower()
+        return any(keyword in text for keyword in excluded_lower)
+
+    def old_location(text):
+        for location in NZ_LOCATIONS:
+            if location.lower() in text.lower():
+                return location
+        return "New Zealand"
+
+    def old_relevant(text):
+        text = text.lower()
+        if any(keyword in text for keyword in old_relevance_exclude):
+            return False
+        return any(keyword in text for keyword in old_relevance_include)
+
+    from job_fetcher_gazette import RELEVANCE_EXCLUDE, RELEVANCE_INCLUDE, is_relevant_job
+    old_relevance_exclude = [key.lower() for key in RELEVANCE_EXCLUDE.keywords]
+    old_relevance_include = [key.lower() for key in RELEVANCE_INCLUDE.keywords]
+
+    cases = [
+        ('excluded keywords', old_excluded, lambda text: has_excluded_keyword(text) is not None),
+        ('location', old_location, extract_nz_location),
+        ('gazette relevance', old_relevant, lambda text: is_relevant_job({'job_title': '', 'description': text})),
+    ]
+
+    total_chars = sum(len(text) for text in texts)
+    print(f"\n⏱️  Keyword matcher benchmark: {len(texts)} jobs, {total_chars / 1024:.0f} KB, {repeat} runs each")
+    print(f"   {'check':<20} {'substring loop':>15} {'compiled':>12} {'speed-up':>9} {'differ':>7}")
+    for name, old, new in cases:
+        timings = []
+        for func in (old, new):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = [func(text) for text in texts]
+            timings.append((time.perf_counter() - start) / repeat)
+            if func is old:
+                old_results = results
+        differ = sum(1 for a, b in zip(old_results, results) if a != b)
+        print(f"   {name:<20} {timings[0] * 1000:>12.2f} ms {timings[1] * 1000:>9.2f} ms "
+              f"{timings[0] / timings[1]:>8.1f}x {differ:>7}")
+    print("   ('differ' counts jobs where whole-word matching changes the answer, e.g. 'hod' in 'method')")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark(*sys.argv[2:3])
+    else:
+        print("Usage: python keyword_matcher.py --benchmark [csv path]")
@@ -0,0 +1,154 @@
+"""
+Polite concurrent page fetching for the job board scrapers.
+
+Pages are fetched over the shared pooled session (http_cache.get_http_session).
+Each host gets its own limits:
+
+- at most CRAWL_CONCURRENCY_PER_HOST requests in flight
+- a token bucket of CRAWL_REQUESTS_PER_MINUTE, with a burst no bigger than the concurrency
+
+A 429 or 503 with Retry-After (seconds or an HTTP date) pauses every request to
+that host for that long. Other transient failures (connection errors, timeouts,
+5xx) are retried with full-jitter exponential backoff. A crawl therefore takes
+as long as the politeness budget allows, instead of a fixed sleep per page.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from http_cache import get_http_session
+from rate_limit import TokenBucket
+
+# Conservative by default (one request every 2s) - job boards block scrapers
+# quickly. Deployments that know a host tolerates more can raise these.
+CRAWL_CONCURRENCY_PER_HOST = int(os.environ.get('CRAWL_CONCURRENCY_PER_HOST', '2'))
+CRAWL_REQUESTS_PER_MINUTE = int(os.environ.get('CRAWL_REQUESTS_PER_MINUTE', '30'))
+
+CRAWL_MAX_ATTEMPTS = 4
+CRAWL_BACKOFF_BASE_SECONDS = 1.0
+CRAWL_BACKOFF_MAX_SECONDS = 60.0
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def _retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+    """Retry-After as seconds from now, whether given as a number or an HTTP date."""
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HostBudget:
+    """Concurrency slots, request bucket and Retry-After pause for one host."""
+
+    def __init__(self, concurrency: int, requests_per_minute: int):
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+        self.bucket = TokenBucket(requests_per_minute, burst=max(1, concurrency))
+        self.pause_until = 0.0
+        self.lock = threading.Lock()
+
+    def wait_turn(self):
+        """Wait out any pause the host asked for, then take one request from the bucket."""
+        while True:
+            with self.lock:
+                wait = self.pause_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        self.bucket.acquire()
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.pause_until = max(self.pause_until, time.monotonic() + seconds)
+
+class PoliteCrawler:
+    """Fetches pages concurrently while keeping each host within its budget."""
+
+    def __init__(self, concurrency_per_host: int = CRAWL_CONCURRENCY_PER_HOST,
+                 requests_per_minute: int = CRAWL_REQUESTS_PER_MINUTE,
+                 max_attempts: int = CRAWL_MAX_ATTEMPTS):
+        self.concurrency_per_host = max(1, concurrency_per_host)
+        self.requests_per_minute = requests_per_minute
+        self.max_attempts = max(1, max_attempts)
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url: str) -> HostBudget:
+        host = (urlparse(url).hostname or '').lower()
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostBudget(self.concurrency_per_host, self.requests_per_minute)
+            return self.hosts[host]
+
+    def get(self, url: str, timeout: float = 20) -> requests.Response:
+        """
+        GET url within the host's budget, retrying transient failures. Raises
+        like requests.get + raise_for_status once the attempts run out.
+        """
+        host = self._host(url)
+        for attempt in range(self.max_attempts):
+            response, error = None, None
+            with host.slots:
+                host.wait_turn()
+                try:
+                    response = get_http_session().get(url, timeout=timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = e
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response
+            if attempt == self.max_attempts - 1:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                # The server said how long to back off - hold every request to this host
+                delay = min(CRAWL_BACKOFF_MAX_SECONDS, retry_after)
+                host.pause(delay)
+            else:
+                # Full jitter so concurrent workers don't retry in lockstep
+                delay = random.uniform(0, min(CRAWL_BACKOFF_MAX_SECONDS, CRAWL_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            reason = error.__class__.__name__ if error is not None else f"HTTP {response.status_code}"
+            print(f"   ⏳ {reason} from {urlparse(url).hostname} - retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{self.max_attempts})")
+            time.sleep(delay)
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """
+        func(item) for every item on a pool sized to the per-host concurrency,
+        results in input order. func is expected to fetch through self.get.
+        """
+        items = list(items)
+        if not items:
+            return []
+        workers = min(self.concurrency_per_host, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawler') as pool:
+            return list(pool.map(func, items))
+
+_crawler = None
+_crawler_lock = threading.Lock()
+
+def get_crawler() -> PoliteCrawler:
+    """Process-wide crawler, so concurrent searches share each host's budget."""
+    global _crawler
+    with _crawler_lock:
+        if _crawler is None:
+            _crawler = PoliteCrawler()
+        return _crawler
@@ -0,0 +1,43 @@
+"""
+Token bucket rate limiting shared by the AI scoring executor and the job board crawler.
+"""
+
+import threading
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at per_minute / 60 units a
+    second. It holds up to one minute of budget unless a smaller burst is given.
+    """
+
+    def __init__(self, per_minute: int, burst: Optional[int] = None):
+        self.rate = max(1, per_minute) / 60.0
+        self.capacity = float(max(1, burst if burst is not None else per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0):
+        """Block until `amount` units are available, then take them."""
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) units once actual usage is known."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
@@ -1,8 +1,179 @@
 import os
-import requests
-from bs4 import BeautifulSoup
-from anthropic import Anthropic
+import time
+import hashlib
+from datetime import datetime
+import sqlite3
+from anthropic import APIConnectionError, APIStatusError
 from cv_profile import CV_SUMMARY, JOB_PREFERENCES
+from cover_letter_generator import cover_letter_system_prompt, finish_cover_letter, COVER_LETTER_MAX_TOKENS
+from job_search_config import USER_SEARCH_CONFIG
+from database import (
+    get_cached_score, put_cached_score, prune_score_cache, normalize_key,
+    save_score_batch, get_open_score_batches, find_open_batch_requests,
+    get_score_batch_requests, complete_score_batch
+)
+from http_cache import cached_get
+from html_extract import extract_description
+from llm_client import get_anthropic_client, message_usage, record_usage
+from prefilter import prefilter_jobs
+
+MATCH_MODEL = "claude-3-5-haiku-20241022"
+# The record_match tool call (sub-scores plus the analysis text) is usually 100-250
+# tokens; the cap leaves headroom so it isn't cut off, while still stopping runaway text
+MATCH_MAX_TOKENS = 400
+
+# Bump whenever the scoring prompt or rubric below changes so cached scores are recomputed
+MATCH_PROMPT_VERSION = 3
+
+# Maximum points per scoring criterion (keys are the jobs table's sub-score columns)
+MATCH_SUB_SCORES = {
+    'location_score': 30,
+    'role_score': 30,
+    'experience_score': 20,
+    'specialization_score': 20,
+}
+
+# Scores are cached by content hash; changing CV_SUMMARY changes every key
+CV_SUMMARY_VERSION = hashlib.sha256(CV_SUMMARY.encode('utf-8')).hexdigest()[:16]
+SCORE_CACHE_TTL_SECONDS = 30 * 24 * 3600
+SCORE_CACHE_MAX_ENTRIES = 20000
+SCORE_CACHE_PRUNE_EVERY = 100
+
+# Fused mode: jobs scoring at or above the auto-apply threshold get their cover letter
+# drafted in the same call, saving the second round trip that re-sends the profile and job
+FUSED_COVER_LETTER = os.environ.get('AI_FUSED_COVER_LETTER', 'false').lower() == 'true'
+FUSED_DRAFT_THRESHOLD = USER_SEARCH_CONFIG.get('auto_apply_threshold', 70)
+# max_tokens of a scoring request in the current mode, for output-token rate budgeting
+MATCH_REQUEST_MAX_TOKENS = MATCH_MAX_TOKENS + COVER_LETTER_MAX_TOKENS if FUSED_COVER_LETTER else MATCH_MAX_TOKENS
+
+# Message Batches: ~50% cheaper than direct calls, results usually within minutes (max 24h)
+BATCH_POLL_INTERVAL_SECONDS = 30
+
+_score_cache_writes = 0
+
+def score_cache_key(job_data: dict) -> str:
+    """
+    Content hash identifying an AI match result: the normalized posting plus
+    everything else that feeds the prompt (CV version, prompt version, model).
+    """
+    parts = [
+        normalize_key(job_data.get('job_title')),
+        normalize_key(job_data.get('company_name')),
+        normalize_key(job_data.get('location')),
+        ' '.join((job_data.get('description') or '').split()),
+        CV_SUMMARY_VERSION,
+        str(MATCH_PROMPT_VERSION),
+        MATCH_MODEL,
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+# Identical for every job, so it is sent as a cached prompt prefix. Haiku only caches
+# prefixes of 2048+ tokens; below that the API bills it normally (cache counters stay 0).
+MATCH_SYSTEM_PROMPT = f"""You are a career matching expert analyzing job postings for a highly experienced teacher.
+
+CANDIDATE PROFILE:
+{CV_SUMMARY}
+
+SCORING CRITERIA:
+1. Location Match (0-30 points): Is this in New Zealand? (Critical requirement)
+2. Role Match (0-30 points): Foundation Phase/Primary/Special Education teaching?
+3. Experience Level (0-20 points): Suitable for 18+ years experience?
+4. Specialization Match (0-20 points): Special needs, learning support, inclusive education?
+
+IMPORTANT FILTERING:
+- If NOT in New Zealand: Maximum score is 30
+- If requires visa sponsorship: Automatic rejection (score 0)
+- If the location clearly indicates it's NOT in New Zealand (e.g., Australia, UK, USA, South Africa): Score heavily penalized
+
+For each job posting you are given, score every criterion and give the overall
+match score (0-100): the sum of the criteria, after applying the filtering rules above.
+Keep the reasoning to 2 short sentences.
+
+Focus on whether this job is actually in NEW ZEALAND and suitable for this candidate's profile.
+
+Always respond by calling the record_match tool."""
+
+# Forced tool call, so the API returns the scores as validated JSON instead of free text
+MATCH_TOOL = {
+    'name': 'record_match',
+    'description': 'Record the match assessment for one job posting.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'location_score': {'type': 'integer', 'minimum': 0, 'maximum': 30, 'description': 'Location match, 0-30'},
+            'role_score': {'type': 'integer', 'minimum': 0, 'maximum': 30, 'description': 'Role match, 0-30'},
+            'experience_score': {'type': 'integer', 'minimum': 0, 'maximum': 20, 'description': 'Experience level, 0-20'},
+            'specialization_score': {'type': 'integer', 'minimum': 0, 'maximum': 20, 'description': 'Specialization match, 0-20'},
+            'match_score': {'type': 'integer', 'minimum': 0, 'maximum': 100, 'description': 'Overall score after the filtering rules'},
+            'reasoning': {'type': 'string', 'description': 'Two short sentences explaining the score'}
+        },
+        'required': list(MATCH_SUB_SCORES) + ['match_score', 'reasoning']
+    }
+}
+
+DRAFT_TOOL = {
+    'name': 'draft_cover_letter',
+    'description': f'Record the cover letter for a job scoring {FUSED_DRAFT_THRESHOLD} or more.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'cover_letter': {'type': 'string', 'description': 'The complete cover letter text'}
+        },
+        'required': ['cover_letter']
+    }
+}
+
+# Scoring rules plus the cover letter instructions; its own cached prefix
+FUSED_SYSTEM_PROMPT = f"""{MATCH_SYSTEM_PROMPT}
+
+COVER LETTER:
+Only if the overall match score is {FUSED_DRAFT_THRESHOLD} or more, also call the draft_cover_letter
+tool in the same response, after record_match, with the complete letter written to these instructions:
+
+{cover_letter_system_prompt()}"""
+
+def _lookup_cached_score(cache_key: str):
+    """Cache read that never breaks scoring (e.g. if init_db hasn't run yet)."""
+    try:
+        return get_cached_score(cache_key, SCORE_CACHE_TTL_SECONDS)
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Score cache unavailable: {e}")
+        return None
+
+def _store_cached_score(cache_key: str, result: dict):
+    """Cache write that never breaks scoring; prunes expired/LRU entries periodically."""
+    global _score_cache_writes
+    try:
+        put_cached_score(cache_key, result)
+        _score_cache_writes += 1
+        if _score_cache_writes % SCORE_CACHE_PRUNE_EVERY == 0:
+            prune_score_cache(SCORE_CACHE_TTL_SECONDS, SCORE_CACHE_MAX_ENTRIES)
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Could not cache score: {e}")
+
+def get_cached_match(job_data: dict):
+    """Return the cached AI result for this posting (marked 'cached': True), or None."""
+    cached = _lookup_cached_score(score_cache_key(job_data))
+    if not cached:
+        return None
+    # A fused draft carries the date it was written: reuse it only the same day, in fused mode
+    drafted_at = cached.pop('drafted_at', None)
+    if cached.get('cover_letter') and not (
+            FUSED_COVER_LETTER and drafted_at
+            and datetime.fromtimestamp(drafted_at).date() == datetime.now().date()):
+        del cached['cover_letter']
+    print(f"♻️  Cached AI score for '{job_data.get('job_title', '')}': {cached['match_score']}/100")
+    return {**cached, 'cached': True}
+
+def estimate_match_tokens(job_data: dict) -> int:
+    """
+    Rough input-token count for a scoring request (~4 chars per token), used to
+    budget against tokens-per-minute limits before the real usage is known.
+    """
+    description = job_data.get('description') or ''
+    if len(description.strip()) < 50:
+        description = 'x' * 5000  # will be fetched from the URL, capped at 5000 chars
+    return (len(CV_SUMMARY) + len(description) + 2000) // 4
 
 def fetch_job_description(url: str) -> str:
     """
@@ -13,41 +184,15 @@ def fetch_job_description(url: str) -> str:
         return ''
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
+        # Shared pooled session; unchanged pages come from the on-disk HTTP cache
+        response = cached_get(url, timeout=15)
         
         if response.status_code != 200:
             print(f"   Failed to fetch URL (status {response.status_code})")
             return ''
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        for script in soup(['script', 'style', 'nav', 'header', 'footer']):
-            script.decompose()
-        
-        description_selectors = [
-            '.job-description', '.description', '#job-description',
-            '[class*="description"]', '[class*="job-detail"]',
-            '.vacancy-description', '.job-content', '.posting-content',
-            'article', 'main', '.content'
-        ]
-        
-        description_text = ''
-        for selector in description_selectors:
-            elements = soup.select(selector)
-            if elements:
-                description_text = ' '.join([el.get_text(separator=' ', strip=True) for el in elements])
-                if len(description_text) > 100:
-                    break
-        
-        if len(description_text) < 100:
-            body = soup.find('body')
-            if body:
-                description_text = body.get_text(separator=' ', strip=True)
-        
-        description_text = ' '.join(description_text.split())
+        # Per-site rules first, then generic selectors and a text-density fallback
+        description_text = extract_description(response.text, url)
         
         if len(description_text) > 5000:
             description_text = description_text[:5000] + '...'
@@ -59,142 +204,240 @@ def fetch_job_description(url: str) -> str:
         print(f"   ❌ Error fetching description: {e}")
         return ''
 
-def analyze_job_match(job_data: dict) -> dict:
+def _prepare_description(job_data: dict):
     """
-    Use Claude AI to analyze a job posting and return match score and reasoning.
-    If description is missing, attempts to fetch it from the job URL.
-    
-    Returns:
-        dict with 'match_score' (0-100), 'analysis' (reasoning), 'has_description' (bool), 
-        and optionally 'fetched_description' if we retrieved it
+    Returns (description, description_missing, fetched_description). A missing or
+    very short description is fetched from the job URL when possible.
     """
-    try:
-        api_key = os.environ.get('ANTHROPIC_API_KEY')
-        if not api_key:
-            print("Warning: ANTHROPIC_API_KEY not set, skipping AI analysis")
-            return {'match_score': 0, 'analysis': 'AI analysis disabled - no API key', 'has_description': False}
-        
-        client = Anthropic(api_key=api_key)
-        
-        job_title = job_data.get('job_title', '')
-        company = job_data.get('company_name', '')
-        location = job_data.get('location', '')
-        description = job_data.get('description', '')
-        salary = job_data.get('salary_info', 'Not specified')
-        source = job_data.get('source_platform', '')
-        job_url = job_data.get('job_url', '')
-        
-        fetched_description = None
-        description_missing = not description or len(description.strip()) < 50
-        
-        if description_missing and job_url:
-            print(f"📥 Job '{job_title}' missing description - fetching from URL...")
-            fetched_description = fetch_job_description(job_url)
-            if fetched_description and len(fetched_description) >= 50:
-                description = fetched_description
-                description_missing = False
-        
-        if description_missing:
-            print(f"⚠️ Job '{job_title}' at {company}: No description available (URL fetch failed or no URL)")
-        
-        prompt = f"""You are a career matching expert analyzing job postings for a highly experienced teacher.
-
-CANDIDATE PROFILE:
-{CV_SUMMARY}
+    job_title = job_data.get('job_title', '')
+    company = job_data.get('company_name', '')
+    description = job_data.get('description', '')
+    job_url = job_data.get('job_url', '')
+    
+    fetched_description = None
+    description_missing = not description or len(description.strip()) < 50
+    
+    if description_missing and job_url:
+        print(f"📥 Job '{job_title}' missing description - fetching from URL...")
+        fetched_description = fetch_job_description(job_url)
+        if fetched_description and len(fetched_description) >= 50:
+            description = fetched_description
+            description_missing = False
+    
+    if description_missing:
+        print(f"⚠️ Job '{job_title}' at {company}: No description available (URL fetch failed or no URL)")
+    
+    return description, description_missing, fetched_description
 
-JOB POSTING TO ANALYZE:
+def _match_request_params(job_data: dict, description: str, fused: bool = False) -> dict:
+    """
+    Messages API parameters for scoring one job (shared by direct and batch scoring).
+    The candidate profile and rubric form a cached system prefix; only the job varies.
+    With fused=True the model may also draft the cover letter (see FUSED_COVER_LETTER).
+    """
+    job_title = job_data.get('job_title', '')
+    company = job_data.get('company_name', '')
+    location = job_data.get('location', '')
+    salary = job_data.get('salary_info', 'Not specified')
+    source = job_data.get('source_platform', '')
+    
+    job_prompt = f"""JOB POSTING TO ANALYZE:
 Title: {job_title}
 Company: {company}
 Location: {location}
 Source: {source}
 Salary: {salary}
-Description: {description}
+Description: {description}"""
 
-SCORING CRITERIA:
-1. Location Match (0-30 points): Is this in New Zealand? (Critical requirement)
-2. Role Match (0-30 points): Foundation Phase/Primary/Special Education teaching?
-3. Experience Level (0-20 points): Suitable for 18+ years experience?
-4. Specialization Match (0-20 points): Special needs, learning support, inclusive education?
+    if fused:
+        job_prompt += f"\n\nToday's Date: {datetime.now().strftime('%d %B %Y')}"
+        tools = [MATCH_TOOL, DRAFT_TOOL]
+        # 'any' lets the model call both tools in one turn; record_match is checked on parse
+        tool_choice = {'type': 'any'}
+        system_prompt = FUSED_SYSTEM_PROMPT
+        max_tokens = MATCH_MAX_TOKENS + COVER_LETTER_MAX_TOKENS
+    else:
+        tools = [MATCH_TOOL]
+        tool_choice = {'type': 'tool', 'name': MATCH_TOOL['name']}
+        system_prompt = MATCH_SYSTEM_PROMPT
+        max_tokens = MATCH_MAX_TOKENS
 
-IMPORTANT FILTERING:
-- If NOT in New Zealand: Maximum score is 30
-- If requires visa sponsorship: Automatic rejection (score 0)
-- If the location clearly indicates it's NOT in New Zealand (e.g., Australia, UK, USA, South Africa): Score heavily penalized
+    return {
+        'model': MATCH_MODEL,
+        'max_tokens': max_tokens,
+        'temperature': 0.3,
+        'tools': tools,
+        'tool_choice': tool_choice,
+        # Tools come before the system prompt in the prefix, so this caches both
+        'system': [{
+            'type': 'text',
+            'text': system_prompt,
+            'cache_control': {'type': 'ephemeral'}
+        }],
+        'messages': [{
+            "role": "user",
+            "content": job_prompt
+        }]
+    }
 
-Please provide:
-1. A match score from 0-100
-2. Brief analysis (2-3 sentences) explaining the score
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
-Focus on whether this job is actually in NEW ZEALAND and suitable for this candidate's profile.
+def _tool_input(message, tool_name: str):
+    """The input of the named tool call in a response, or None if it wasn't called."""
+    for block in message.content:
+        if getattr(block, 'type', None) == 'tool_use' and block.name == tool_name:
+            return block.input if isinstance(block.input, dict) else {}
+    return None
 
-Format your response as:
-SCORE: [number 0-100]
-ANALYSIS: [your 2-3 sentence analysis]"""
-
-        message = client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=300,
-            temperature=0.3,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
-        
-        response_text = None
-        for block in message.content:
-            if hasattr(block, 'text'):
-                response_text = block.text
-                break
-        
-        if not response_text:
-            print(f"Warning: No text content found in AI response for '{job_title}'")
-            return {
-                'match_score': 0,
-                'analysis': 'AI response parsing error - no text content found',
-                'has_description': True
-            }
-        
-        score = 0
-        analysis = response_text
-        
-        lines = response_text.split('\n')
-        for line in lines:
-            if line.startswith('SCORE:'):
-                try:
-                    score_str = line.replace('SCORE:', '').strip()
-                    # Handle formats like "95/100" or "95"
-                    if '/' in score_str:
-                        score_str = score_str.split('/')[0].strip()
-                    score = int(score_str)
-                    print(f"Extracted score: {score}")
-                except Exception as e:
-                    print(f"Warning: Failed to parse score from line '{line}': {e}")
-                    score = 0
-            elif line.startswith('ANALYSIS:'):
-                analysis = line.replace('ANALYSIS:', '').strip()
-        
-        if score == 0 and 'SCORE:' not in response_text:
-            print(f"Warning: No valid SCORE found in AI response for '{job_title}'")
-            print(f"Response preview: {response_text[:200]}")
-        
-        score = max(0, min(100, score))
-        
-        print(f"AI Analysis for '{job_title}': Score {score}/100")
-        
-        result = {
-            'match_score': score,
-            'analysis': analysis,
+def _tool_scores(message) -> dict:
+    """
+    Read the record_match tool call from a response. Returns match_score, analysis
+    and the sub-scores, or None if the call is missing or incomplete.
+    """
+    tool_input = _tool_input(message, MATCH_TOOL['name'])
+    if tool_input is None:
+        return None
+    
+    sub_scores = {}
+    for column, max_points in MATCH_SUB_SCORES.items():
+        value = _int_or_none(tool_input.get(column))
+        if value is None:
+            return None
+        sub_scores[column] = max(0, min(max_points, value))
+    
+    # The total may be capped by the filtering rules, but never exceeds the criteria
+    total = sum(sub_scores.values())
+    score = _int_or_none(tool_input.get('match_score'))
+    score = total if score is None else min(score, total)
+    
+    return {
+        'match_score': score,
+        'analysis': str(tool_input.get('reasoning') or '').strip(),
+        **sub_scores
+    }
+
+def _text_scores(response_text: str) -> dict:
+    """
+    Parse the old SCORE:/ANALYSIS: text format, still returned by batches submitted
+    before scoring switched to the record_match tool. Returns None if no score.
+    """
+    score = None
+    analysis = response_text
+    for line in response_text.split('\n'):
+        if line.startswith('SCORE:'):
+            # Handle formats like "95/100" or "95"
+            score = _int_or_none(line.replace('SCORE:', '').split('/')[0].strip())
+        elif line.startswith('ANALYSIS:'):
+            analysis = line.replace('ANALYSIS:', '').strip()
+    if score is None:
+        return None
+    return {'match_score': score, 'analysis': analysis, **{column: None for column in MATCH_SUB_SCORES}}
+
+def _match_result(message, job_title: str, description_missing: bool, fetched_description) -> tuple:
+    """
+    Turn a scoring response message into a result dict.
+    Returns (result, cacheable) - parse failures are not worth caching.
+    """
+    scores = _tool_scores(message)
+    if scores is None:
+        response_text = ''.join(getattr(block, 'text', '') for block in message.content)
+        scores = _text_scores(response_text) if response_text else None
+    
+    if scores is None:
+        print(f"Warning: No record_match tool call in AI response for '{job_title}' "
+              f"(stop reason: {getattr(message, 'stop_reason', None)})")
+        return {
+            'match_score': 0,
+            'analysis': 'AI response parsing error - no scores returned',
             'has_description': not description_missing
-        }
+        }, False
+    
+    scores['match_score'] = max(0, min(100, scores['match_score']))
+    print(f"AI Analysis for '{job_title}': Score {scores['match_score']}/100")
+    
+    result = {**scores, 'has_description': not description_missing}
+    
+    # Fused mode: keep a drafted letter only if the score really qualifies for auto-apply
+    draft = _tool_input(message, DRAFT_TOOL['name'])
+    if draft and draft.get('cover_letter') and result['match_score'] >= FUSED_DRAFT_THRESHOLD:
+        result['cover_letter'] = finish_cover_letter(str(draft['cover_letter']))
+        print(f"   ✍️  Drafted cover letter with the score ({len(result['cover_letter'])} chars)")
+    
+    if fetched_description:
+        result['fetched_description'] = fetched_description
+        print(f"   📝 Returning fetched description for storage ({len(fetched_description)} chars)")
+    
+    return result, True
+
+def apply_match_result(job_data: dict, ai_result: dict) -> dict:
+    """
+    Copy an AI match result (score, analysis, sub-scores, pre-filter status, and a
+    fused-mode cover letter) onto a job dict for saving and auto-apply.
+    """
+    job_data['match_score'] = ai_result['match_score']
+    job_data['ai_analysis'] = ai_result['analysis']
+    job_data['status'] = ai_result.get('status', 'new')
+    job_data['rejection_reason'] = ai_result.get('rejection_reason')
+    for column in MATCH_SUB_SCORES:
+        job_data[column] = ai_result.get(column)
+    if ai_result.get('cover_letter'):
+        job_data['cover_letter'] = ai_result['cover_letter']
+    return job_data
+
+def analyze_job_match(job_data: dict, raise_api_errors: bool = False) -> dict:
+    """
+    Use Claude AI to analyze a job posting and return match score and reasoning.
+    If description is missing, attempts to fetch it from the job URL.
+    Results are cached by content hash, so re-scoring an unchanged posting is free.
+    
+    With raise_api_errors=True, API status errors (429 rate limit, 529 overloaded, ...)
+    and connection errors/timeouts are raised instead of returned as a zero score,
+    and the SDK does not retry them
+    itself, so a caller such as scoring_executor can back off across all its workers.
+    
+    Returns:
+        dict with 'match_score' (0-100), 'analysis' (reasoning), 'has_description' (bool),
+        the per-criterion sub-scores (see MATCH_SUB_SCORES), optionally 'fetched_description'
+        if we retrieved it and 'cover_letter' if drafted in fused mode, 'cached' (bool),
+        and 'usage' (token counts, incl. prompt cache reads/writes) when the API was called
+    """
+    try:
+        cached = get_cached_match(job_data)
+        if cached:
+            return cached
+        cache_key = score_cache_key(job_data)
+        
+        client = get_anthropic_client()
+        if not client:
+            print("Warning: ANTHROPIC_API_KEY not set, skipping AI analysis")
+            return {'match_score': 0, 'analysis': 'AI analysis disabled - no API key', 'has_description': False}
+        
+        if raise_api_errors:
+            client = client.with_options(max_retries=0)
         
-        if fetched_description:
-            result['fetched_description'] = fetched_description
-            print(f"   📝 Returning fetched description for storage ({len(fetched_description)} chars)")
+        job_title = job_data.get('job_title', '')
+        description, description_missing, fetched_description = _prepare_description(job_data)
+        
+        message = client.messages.create(**_match_request_params(job_data, description, fused=FUSED_COVER_LETTER))
+        
+        result, cacheable = _match_result(message, job_title, description_missing, fetched_description)
         
+        # Only cache real scores, not parse failures (a fused draft is cached with its score)
+        if cacheable:
+            _store_cached_score(cache_key, result)
+        
+        result['cached'] = False
+        result['usage'] = message_usage(message)
+        record_usage('match_fused' if FUSED_COVER_LETTER else 'match', MATCH_MODEL, result['usage'])
         return result
         
     except Exception as e:
+        if raise_api_errors and isinstance(e, (APIStatusError, APIConnectionError)):
+            raise
         print(f"Error in AI analysis: {e}")
         return {
             'match_score': 0,
@@ -210,3 +453,153 @@ def should_analyze_job(job_data: dict) -> bool:
     if job_data.get('status') == 'auto-rejected':
         return False
     return True
+
+def _batch_error_result(error: str, has_description: bool = False) -> dict:
+    return {'match_score': 0, 'analysis': f'AI analysis error: {error}', 'has_description': has_description}
+
+def submit_score_batch(client, jobs_by_key: dict, label: str) -> str:
+    """
+    Submit one Message Batch scoring every job in jobs_by_key (score cache key -> job),
+    and record the batch ID plus the custom_id -> job mapping so it can be resumed.
+    """
+    requests_to_save = []
+    batch_requests = []
+    for cache_key, job_data in jobs_by_key.items():
+        description, description_missing, fetched_description = _prepare_description(job_data)
+        batch_requests.append({
+            'custom_id': cache_key,
+            'params': _match_request_params(job_data, description)
+        })
+        requests_to_save.append({
+            'custom_id': cache_key,
+            'job_data': job_data,
+            'has_description': not description_missing,
+            'fetched_description': fetched_description
+        })
+    
+    batch = client.messages.batches.create(requests=batch_requests)
+    save_score_batch(batch.id, requests_to_save, label)
+    print(f"📦 Submitted {len(batch_requests)} jobs for batch scoring (batch {batch.id})")
+    return batch.id
+
+def wait_for_score_batch(client, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL_SECONDS) -> dict:
+    """
+    Poll a batch until it ends, write its scores into the score cache in one
+    transaction, and return {custom_id: result} for every recorded request.
+    """
+    while True:
+        try:
+            batch = client.messages.batches.retrieve(batch_id)
+        except APIStatusError as e:
+            if e.status_code != 404:
+                raise
+            print(f"   ⚠️  Batch {batch_id} no longer exists - giving up on its results")
+            complete_score_batch(batch_id, {})
+            return {}
+        
+        if batch.processing_status == 'ended':
+            break
+        counts = batch.request_counts
+        print(f"   ⏳ Batch {batch_id}: {counts.processing} processing, {counts.succeeded} succeeded")
+        time.sleep(poll_interval)
+    
+    requests_by_id = {request['custom_id']: request for request in get_score_batch_requests(batch_id)}
+    results = {}
+    cacheable = {}
+    for entry in client.messages.batches.results(batch_id):
+        request = requests_by_id.get(entry.custom_id)
+        if not request:
+            continue
+        job_title = request['job_data'].get('job_title', '')
+        
+        if entry.result.type != 'succeeded':
+            print(f"   ⚠️  Batch request for '{job_title}' {entry.result.type}")
+            results[entry.custom_id] = _batch_error_result(f"batch request {entry.result.type}", request['has_description'])
+            continue
+        
+        message = entry.result.message
+        result, parsed = _match_result(
+            message, job_title, not request['has_description'], request['fetched_description']
+        )
+        if parsed:
+            cacheable[entry.custom_id] = result
+        result['cached'] = False
+        result['usage'] = message_usage(message)
+        record_usage('match_batch', MATCH_MODEL, result['usage'])
+        results[entry.custom_id] = result
+    
+    complete_score_batch(batch_id, cacheable)
+    print(f"✅ Batch {batch_id} finished: {len(cacheable)}/{len(requests_by_id)} jobs scored")
+    return results
+
+def score_jobs_batch(jobs, label: str = 'bulk', poll_interval: float = BATCH_POLL_INTERVAL_SECONDS):
+    """
+    Score many jobs through the Message Batches API. Yields (job_data, ai_result)
+    pairs like scoring_executor.score_jobs, but only once the batch has finished.
+    
+    Pre-filtered and cached jobs are returned straight away. Jobs already waiting in
+    an unfinished batch (e.g. an import interrupted by a restart and run again)
+    re-attach to that batch instead of being submitted twice.
+    """
+    jobs, decided = prefilter_jobs(list(jobs))
+    yield from decided
+    
+    waiting = {}
+    for job_data in jobs:
+        cached = get_cached_match(job_data)
+        if cached:
+            yield job_data, cached
+        else:
+            waiting.setdefault(score_cache_key(job_data), []).append(job_data)
+    
+    if not waiting:
+        return
+    
+    client = get_anthropic_client()
+    if not client:
+        print("Warning: ANTHROPIC_API_KEY not set, skipping AI analysis")
+        for job_list in waiting.values():
+            for job_data in job_list:
+                yield job_data, {'match_score': 0, 'analysis': 'AI analysis disabled - no API key', 'has_description': False}
+        return
+    
+    batch_for_key = find_open_batch_requests(list(waiting))
+    if batch_for_key:
+        print(f"♻️  {len(batch_for_key)} jobs are already in unfinished batches - resuming those")
+    
+    new_jobs = {key: job_list[0] for key, job_list in waiting.items() if key not in batch_for_key}
+    if new_jobs:
+        batch_id = submit_score_batch(client, new_jobs, label)
+        for key in new_jobs:
+            batch_for_key[key] = batch_id
+    
+    for batch_id in dict.fromkeys(batch_for_key.values()):
+        results = wait_for_score_batch(client, batch_id, poll_interval)
+        for key, job_list in waiting.items():
+            if batch_for_key[key] != batch_id:
+                continue
+            result = results.get(key) or _batch_error_result('no batch result')
+            for job_data in job_list:
+                yield job_data, dict(result)
+
+def resume_score_batches(label: str = 'bulk', poll_interval: float = BATCH_POLL_INTERVAL_SECONDS):
+    """
+    Finish batches left unfinished by a previous process (same label), yielding
+    (job_data, ai_result) for each job recorded when the batch was submitted.
+    """
+    batch_ids = get_open_score_batches(label)
+    if not batch_ids:
+        return
+    
+    client = get_anthropic_client()
+    if not client:
+        print("Warning: ANTHROPIC_API_KEY not set, cannot resume score batches")
+        return
+    print(f"♻️  Resuming {len(batch_ids)} unfinished scoring batch(es)")
+    
+    for batch_id in batch_ids:
+        requests_to_resume = get_score_batch_requests(batch_id)
+        results = wait_for_score_batch(client, batch_id, poll_interval)
+        for request in requests_to_resume:
+            result = results.get(request['custom_id']) or _batch_error_result('no batch result')
+            yield request['job_data'], result
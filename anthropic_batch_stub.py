@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages and Message Batches endpoints, for
+testing batch scoring without spending API credits.
+
+Usage:
+    python anthropic_batch_stub.py --port 8765 --delay 10
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=test python smart_import.py jobs.csv --batch
+
+Batches report 'in_progress' until --delay seconds after creation, then 'ended'.
+Scores (and sub-scores) are a deterministic hash of the prompt (not real matching), so re-running
+an import gives the same numbers. Kill and restart the importer mid-batch to
+exercise resume; the stub keeps its batches in memory while it stays up.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_batches = {}
+_cached_prefixes = set()
+_lock = threading.Lock()
+BATCH_DELAY_SECONDS = 10.0
+
+def _iso(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def _prompt_cache_usage(params):
+    """Mimic prompt caching: a cache_control system prefix is written once, then read."""
+    system = params.get('system')
+    if not isinstance(system, list) or not any(block.get('cache_control') for block in system):
+        return {'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+    prefix = json.dumps(system, sort_keys=True)
+    tokens = len(prefix) // 4
+    with _lock:
+        hit = prefix in _cached_prefixes
+        _cached_prefixes.add(prefix)
+    return {'cache_creation_input_tokens': 0 if hit else tokens, 'cache_read_input_tokens': tokens if hit else 0}
+
+def _tool_call(tool, digest):
+    tool_input = {}
+    for offset, (name, schema) in enumerate(tool['input_schema'].get('properties', {}).items()):
+        if schema.get('type') == 'integer':
+            tool_input[name] = (digest >> (8 * offset)) % (schema.get('maximum', 100) + 1)
+        else:
+            tool_input[name] = f"Stub {name.replace('_', ' ')} generated locally for testing."
+    return {'type': 'tool_use', 'id': f"toolu_stub_{uuid.uuid4().hex[:20]}", 'name': tool['name'], 'input': tool_input}
+
+def _fake_content(params, digest):
+    """
+    Tool calls when the request defines tools, else the old SCORE:/ANALYSIS: text.
+    Extra tools (the fused-mode cover letter) are only called for scores of 70+.
+    """
+    tools = params.get('tools') or []
+    if not tools:
+        score = digest % 101
+        return [{'type': 'text', 'text': f"SCORE: {score}\nANALYSIS: Stub score generated locally for testing."}], 'end_turn'
+
+    calls = [_tool_call(tools[0], digest)]
+    if calls[0]['input'].get('match_score', 0) >= 70:
+        calls.extend(_tool_call(tool, digest) for tool in tools[1:])
+    return calls, 'tool_use'
+
+def _fake_message(params):
+    """A Messages API response in the format ai_matcher expects (tool call or text)."""
+    prompt = json.dumps(params.get('messages', []), sort_keys=True)
+    digest = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16)
+    content, stop_reason = _fake_content(params, digest)
+    return {
+        'id': f"msg_stub_{uuid.uuid4().hex[:24]}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': params.get('model', 'stub'),
+        'content': content,
+        'stop_reason': stop_reason,
+        'stop_sequence': None,
+        'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': 20, **_prompt_cache_usage(params)}
+    }
+
+def _batch_object(batch, base_url):
+    ended = time.time() >= batch['created_at'] + BATCH_DELAY_SECONDS
+    count = len(batch['requests'])
+    return {
+        'id': batch['id'],
+        'type': 'message_batch',
+        'processing_status': 'ended' if ended else 'in_progress',
+        'request_counts': {
+            'processing': 0 if ended else count,
+            'succeeded': count if ended else 0,
+            'errored': 0,
+            'canceled': 0,
+            'expired': 0
+        },
+        'created_at': _iso(batch['created_at']),
+        'expires_at': _iso(batch['created_at'] + 24 * 3600),
+        'ended_at': _iso(batch['created_at'] + BATCH_DELAY_SECONDS) if ended else None,
+        'cancel_initiated_at': None,
+        'archived_at': None,
+        'results_url': f"{base_url}/v1/messages/batches/{batch['id']}/results" if ended else None
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _base_url(self):
+        return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json({'type': 'error', 'error': {'type': 'not_found_error', 'message': 'Not found'}}, 404)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/v1/messages':
+            self._send_json(_fake_message(self._read_json()))
+        elif path == '/v1/messages/batches':
+            batch = {
+                'id': f"msgbatch_stub_{uuid.uuid4().hex[:20]}",
+                'requests': self._read_json().get('requests', []),
+                'created_at': time.time()
+            }
+            with _lock:
+                _batches[batch['id']] = batch
+            print(f"📦 Stub batch {batch['id']} created with {len(batch['requests'])} requests")
+            self._send_json(_batch_object(batch, self._base_url()))
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) < 4 or parts[:3] != ['v1', 'messages', 'batches']:
+            return self._not_found()
+        with _lock:
+            batch = _batches.get(parts[3])
+        if not batch:
+            return self._not_found()
+
+        if len(parts) == 4:
+            return self._send_json(_batch_object(batch, self._base_url()))
+
+        if parts[4] == 'results' and _batch_object(batch, '')['processing_status'] == 'ended':
+            lines = [
+                json.dumps({
+                    'custom_id': request['custom_id'],
+                    'result': {'type': 'succeeded', 'message': _fake_message(request.get('params', {}))}
+                })
+                for request in batch['requests']
+            ]
+            body = ('\n'.join(lines) + '\n').encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/binary')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._not_found()
+
+def main():
+    global BATCH_DELAY_SECONDS
+    parser = argparse.ArgumentParser(description='Local Anthropic Messages/Batches stub')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=BATCH_DELAY_SECONDS,
+                        help='seconds before a batch reports ended')
+    args = parser.parse_args()
+    BATCH_DELAY_SECONDS = args.delay
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    print(f"🧪 Anthropic stub listening on http://127.0.0.1:{args.port} (batch delay {args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
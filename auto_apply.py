@@ -3,13 +3,12 @@ Automatic job application system.
 Sends applications with CV and tailored cover letters for matching jobs.
 """
 import os
-import sqlite3
 from datetime import datetime
 from typing import Dict, Optional
 from cover_letter_generator import generate_cover_letter, generate_email_subject, generate_email_body
 from cover_letter_pdf import save_cover_letter_as_pdf
 from cv_profile import USER_PROFILE
-from database import update_job_status
+from database import get_db, normalize_key, update_job_status
 from email_sender import send_job_application
 
 # Auto-apply is now enabled by default with Gmail integration
@@ -23,51 +22,47 @@ def already_applied_to_job(job_data: dict) -> bool:
     Prevents duplicate applications.
     """
     try:
-        conn = sqlite3.connect('jobs.db')
-        cursor = conn.cursor()
-        
         job_url = job_data.get('job_url', '')
         job_title = job_data.get('job_title', '')
         company_name = job_data.get('company_name', '')
-        contact_email = job_data.get('contact_email') or job_data.get('email_id', '')
-        
-        if job_url:
-            cursor.execute('''
-                SELECT id FROM jobs 
-                WHERE job_url = ? AND status = 'applied'
-            ''', (job_url,))
-            if cursor.fetchone():
-                conn.close()
-                print(f"   ⚠️  Already applied to this exact job URL")
-                return True
-        
-        if job_title and company_name:
-            cursor.execute('''
-                SELECT id FROM jobs 
-                WHERE LOWER(job_title) = LOWER(?) 
-                AND LOWER(company_name) = LOWER(?)
-                AND status = 'applied'
-            ''', (job_title, company_name))
-            if cursor.fetchone():
-                conn.close()
-                print(f"   ⚠️  Already applied to '{job_title}' at '{company_name}'")
-                return True
+        contact_email = job_data.get('contact_email', '')
         
-        if contact_email and company_name:
-            cursor.execute('''
-                SELECT COUNT(*) FROM jobs 
-                WHERE email_id = ? 
-                AND LOWER(company_name) = LOWER(?)
-                AND status = 'applied'
-                AND date(application_date) = date('now')
-            ''', (contact_email, company_name))
-            count = cursor.fetchone()[0]
-            if count >= 2:
-                conn.close()
-                print(f"   ⚠️  Already sent 2+ applications to {company_name} today")
-                return True
+        with get_db() as conn:
+            cursor = conn.cursor()
+            
+            if job_url:
+                cursor.execute('''
+                    SELECT id FROM jobs 
+                    WHERE job_url = ? AND status = 'applied'
+                ''', (job_url,))
+                if cursor.fetchone():
+                    print(f"   ⚠️  Already applied to this exact job URL")
+                    return True
+            
+            if job_title and company_name:
+                cursor.execute('''
+                    SELECT id FROM jobs 
+                    WHERE title_norm = ? 
+                    AND company_norm = ?
+                    AND status = 'applied'
+                ''', (normalize_key(job_title), normalize_key(company_name)))
+                if cursor.fetchone():
+                    print(f"   ⚠️  Already applied to '{job_title}' at '{company_name}'")
+                    return True
+            
+            if contact_email and company_name:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM jobs 
+                    WHERE contact_email = ? 
+                    AND company_norm = ?
+                    AND status = 'applied'
+                    AND date(application_date) = date('now')
+                ''', (contact_email, normalize_key(company_name)))
+                count = cursor.fetchone()[0]
+                if count >= 2:
+                    print(f"   ⚠️  Already sent 2+ applications to {company_name} today")
+                    return True
         
-        conn.close()
         return False
         
     except Exception as e:
@@ -116,8 +111,12 @@ def prepare_application(job_data: dict) -> Dict:
     print(f"   Company: {job_data['company_name']}")
     print(f"   Match Score: {job_data.get('match_score', 0)}%")
     
-    # Generate cover letter
-    cover_letter = generate_cover_letter(job_data)
+    # Reuse the letter drafted alongside the AI score (fused mode), else generate one
+    cover_letter = job_data.get('cover_letter')
+    if cover_letter:
+        print(f"   ✍️  Using cover letter drafted during scoring ({len(cover_letter)} chars)")
+    else:
+        cover_letter = generate_cover_letter(job_data)
     
     # Save cover letter as PDF
     cover_letter_path = save_cover_letter_as_pdf(
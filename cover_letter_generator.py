@@ -2,34 +2,16 @@
 AI-powered cover letter generator using Claude.
 Creates personalized cover letters tailored to each job posting.
 """
-import os
 from datetime import datetime
-from anthropic import Anthropic
 from cv_profile import USER_PROFILE
+from llm_client import get_anthropic_client, message_usage, record_usage
 
-def generate_cover_letter(job_data: dict) -> str:
-    """
-    Generate a personalized cover letter for a job using Claude AI.
-    
-    Args:
-        job_data: Dictionary containing job details (title, company, description, etc.)
-    
-    Returns:
-        Professionally formatted cover letter as a string
-    """
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-    
-    client = Anthropic(api_key=api_key)
-    user_profile = USER_PROFILE
-    
-    # Get current date formatted for NZ business letter
-    current_date = datetime.now().strftime("%d %B %Y")
-    
-    prompt = f"""You are writing a professional cover letter for a teaching job application in New Zealand.
+COVER_LETTER_MODEL = "claude-3-5-haiku-20241022"
+COVER_LETTER_MAX_TOKENS = 1500
 
-**Today's Date:** {current_date}
+def cover_letter_system_prompt(user_profile: dict = USER_PROFILE) -> str:
+    """Applicant profile and letter rules - identical for every job, so sent as a cached prefix."""
+    return f"""You are writing a professional cover letter for a teaching job application in New Zealand.
 
 **Applicant Profile:**
 Name: {user_profile['name']}
@@ -39,16 +21,10 @@ Qualifications: {', '.join(user_profile['qualifications'])}
 Key Skills: {', '.join(user_profile['key_skills'])}
 Languages: {', '.join(user_profile['languages'])}
 
-**Job Details:**
-Position: {job_data['job_title']}
-Company/School: {job_data['company_name']}
-Location: {job_data.get('location', 'New Zealand')}
-Description: {(job_data.get('description') or 'Teaching position in New Zealand school')[:1500]}
-
 **Requirements:**
 1. Write ONLY a professional cover letter (250-350 words)
 2. Format: Date → Greeting → Body paragraphs → Closing signature
-3. Start with: {current_date}
+3. Start with today's date exactly as given with the job details
 4. Include greeting: Dear Hiring Manager (or Dear Principal/Headmaster)
 5. Body: Highlight special needs experience (autism, Down syndrome, ADHD)
 6. Emphasize 18+ years Foundation Phase & Special Education background
@@ -62,18 +38,51 @@ Description: {(job_data.get('description') or 'Teaching position in New Zealand
 
 12. DO NOT add anything after "Henriëtte Charlotte Beeslaar" - no email, no phone, no WhatsApp, no LinkedIn, no extra text
 13. DO NOT include postscripts, attachments mentions, or any content beyond the signature
-14. Output ONLY the cover letter text - nothing before or after
+14. Output ONLY the cover letter text - nothing before or after"""
+
+def generate_cover_letter(job_data: dict) -> str:
+    """
+    Generate a personalized cover letter for a job using Claude AI.
+    
+    Args:
+        job_data: Dictionary containing job details (title, company, description, etc.)
+    
+    Returns:
+        Professionally formatted cover letter as a string
+    """
+    client = get_anthropic_client()
+    if not client:
+        raise ValueError("ANTHROPIC_API_KEY environment variable is required")
+    
+    user_profile = USER_PROFILE
+    
+    # Get current date formatted for NZ business letter
+    current_date = datetime.now().strftime("%d %B %Y")
+    
+    prompt = f"""**Today's Date:** {current_date}
+
+**Job Details:**
+Position: {job_data['job_title']}
+Company/School: {job_data['company_name']}
+Location: {job_data.get('location', 'New Zealand')}
+Description: {(job_data.get('description') or 'Teaching position in New Zealand school')[:1500]}
 
 Generate the complete cover letter now:"""
 
     response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=1500,
+        model=COVER_LETTER_MODEL,
+        max_tokens=COVER_LETTER_MAX_TOKENS,
+        system=[{
+            'type': 'text',
+            'text': cover_letter_system_prompt(user_profile),
+            'cache_control': {'type': 'ephemeral'}
+        }],
         messages=[{
             "role": "user",
             "content": prompt
         }]
     )
+    record_usage('cover_letter', COVER_LETTER_MODEL, message_usage(response))
     
     # Extract text from response
     cover_letter = ""
@@ -85,24 +94,30 @@ Generate the complete cover letter now:"""
     if not cover_letter:
         cover_letter = str(response.content)
     
-    if cover_letter:
-        lines = cover_letter.split('\n')
-        final_lines = []
-        signature_found = False
-        
-        for line in lines:
-            final_lines.append(line)
-            if user_profile['name'] in line:
-                signature_found = True
-                break
-        
-        if signature_found:
-            cover_letter = '\n'.join(final_lines)
+    cover_letter = finish_cover_letter(cover_letter)
     
     print(f"✍️  Generated cover letter ({len(cover_letter)} chars)")
     return cover_letter
 
 
+def finish_cover_letter(cover_letter: str) -> str:
+    """Trim a generated letter and drop anything the model added after the signature."""
+    cover_letter = cover_letter.strip()
+    lines = cover_letter.split('\n')
+    final_lines = []
+    signature_found = False
+    
+    for line in lines:
+        final_lines.append(line)
+        if USER_PROFILE['name'] in line:
+            signature_found = True
+            break
+    
+    if signature_found:
+        cover_letter = '\n'.join(final_lines)
+    return cover_letter
+
+
 def generate_email_subject(job_data: dict) -> str:
     """Generate a professional email subject line for the job application."""
     return f"Application for {job_data['job_title']} - {USER_PROFILE['name']}"
@@ -1,15 +1,133 @@
+import base64
+import json
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 import os
 
 DATABASE_PATH = 'jobs.db'
 
+# Applied to every pooled connection. WAL lets the scheduler threads write while
+# Flask request threads keep reading; NORMAL sync is durable under WAL except on
+# power loss, and a negative cache_size is measured in KiB.
+SQLITE_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -20000),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 10000),
+]
+
+_local = threading.local()
+
+def normalize_key(value: Optional[str]) -> str:
+    """
+    Normalize a job title or employer name for dedupe lookups.
+    Lowercases, turns punctuation into spaces and collapses whitespace,
+    so 'Teacher - Year 1/2 ' and 'teacher year 1 2' compare equal.
+    """
+    if not value:
+        return ''
+    return ' '.join(re.sub(r'[\W_]+', ' ', str(value).lower()).split())
+
+def _open_connection() -> sqlite3.Connection:
+    """Open and tune a new connection to DATABASE_PATH."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.create_function('normalize_key', 1, normalize_key, deterministic=True)
+    for pragma, value in SQLITE_PRAGMAS:
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    return conn
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's pooled database connection.
+    Connections are opened once per thread (and per process, so forked
+    gunicorn workers never share a handle) and reused afterwards.
+    Do not close the returned connection - use get_db() for transactions.
+    """
+    key = (DATABASE_PATH, os.getpid())
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'key', None) != key:
+        conn = _open_connection()
+        _local.conn = conn
+        _local.key = key
+        _local.depth = 0
+    return conn
+
+@contextmanager
+def get_db() -> Iterator[sqlite3.Connection]:
+    """
+    Context manager around the pooled connection.
+    Commits when the outermost block exits cleanly and rolls back on error,
+    so nested helpers (e.g. job_exists inside an import loop) share one transaction.
+    """
+    conn = get_connection()
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.rollback()
+        raise
+    else:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.commit()
+
 def init_db():
-    """Initialize the database with required tables."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    """
+    Bring the database schema up to date.
+    The schema version lives in PRAGMA user_version, so an up-to-date database
+    costs a single integer comparison at startup.
+    """
+    conn = get_connection()
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    if current >= len(MIGRATIONS):
+        return
     
+    _run_migrations(conn)
+    print("Database initialized successfully")
+
+# ---------------------------------------------------------------------------
+# Schema migrations
+#
+# Each migration is (description, schema_step, backfill_step). The schema step
+# runs inside one IMMEDIATE transaction and must be idempotent. The optional
+# backfill step runs afterwards in small committed chunks (so it never holds
+# the write lock for long) and must be resumable. user_version is only bumped
+# once both have finished, so an interrupted migration simply runs again.
+# ---------------------------------------------------------------------------
+
+BACKFILL_CHUNK_SIZE = 1000
+
+def _add_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN, skipping columns that already exist (pre-migration databases)."""
+    columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _backfill(conn: sqlite3.Connection, sql: str) -> int:
+    """
+    Run an UPDATE of the form '... WHERE id IN (SELECT id FROM jobs WHERE <pending> LIMIT ?)'
+    repeatedly, committing each chunk, until no rows are left. Returns rows updated.
+    """
+    total = 0
+    while True:
+        with get_db():
+            updated = conn.execute(sql, (BACKFILL_CHUNK_SIZE,)).rowcount
+        total += updated
+        if updated < BACKFILL_CHUNK_SIZE:
+            return total
+
+def _migration_1_baseline(cursor: sqlite3.Cursor):
+    """Original tables, plus the columns older databases gained via ad-hoc ALTERs."""
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS jobs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,15 +150,9 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
-    cursor.execute("PRAGMA table_info(jobs)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if 'ai_analysis' not in columns:
-        cursor.execute('ALTER TABLE jobs ADD COLUMN ai_analysis TEXT')
-    if 'cover_letter' not in columns:
-        cursor.execute('ALTER TABLE jobs ADD COLUMN cover_letter TEXT')
-    if 'auto_applied' not in columns:
-        cursor.execute('ALTER TABLE jobs ADD COLUMN auto_applied BOOLEAN DEFAULT 0')
+    _add_column(cursor, 'jobs', 'ai_analysis', 'TEXT')
+    _add_column(cursor, 'jobs', 'cover_letter', 'TEXT')
+    _add_column(cursor, 'jobs', 'auto_applied', 'BOOLEAN DEFAULT 0')
     
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS email_tracking (
@@ -57,184 +169,1132 @@ def init_db():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+
+def _migration_2_dedupe_keys(cursor: sqlite3.Cursor):
+    """Stored normalized title/employer keys for dedupe lookups."""
+    _add_column(cursor, 'jobs', 'title_norm', 'TEXT')
+    _add_column(cursor, 'jobs', 'company_norm', 'TEXT')
+
+def _backfill_2_dedupe_keys(conn: sqlite3.Connection) -> int:
+    return _backfill(conn, '''
+        UPDATE jobs
+        SET title_norm = normalize_key(job_title), company_norm = normalize_key(company_name)
+        WHERE id IN (SELECT id FROM jobs WHERE title_norm IS NULL OR company_norm IS NULL LIMIT ?)
+    ''')
+
+def _migration_3_indexes(cursor: sqlite3.Cursor):
+    """Dashboard filters/ordering and dedupe lookups."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_date ON jobs (status, date_received)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_platform_status ON jobs (source_platform, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_match_score ON jobs (match_score)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_date_received ON jobs (date_received)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_platform_date ON jobs (source_platform, date_received)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_title_company_norm ON jobs (title_norm, company_norm)')
+
+def _migration_4_search_index(cursor: sqlite3.Cursor):
+    """
+    jobs_fts full-text index (external content over jobs) and the triggers
+    that keep it in sync. The index is rebuilt once when first created.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs_fts'"
+    ).fetchone()
+    
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                job_title, company_name, location, description,
+                content='jobs', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  Full-text search unavailable (SQLite built without FTS5): {e}")
+        return
+    
+    fts_columns = 'job_title, company_name, location, description'
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs BEGIN
+            INSERT INTO jobs_fts (rowid, {fts_columns})
+            VALUES (new.id, new.job_title, new.company_name, new.location, new.description);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {fts_columns})
+            VALUES ('delete', old.id, old.job_title, old.company_name, old.location, old.description);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF {fts_columns} ON jobs BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {fts_columns})
+            VALUES ('delete', old.id, old.job_title, old.company_name, old.location, old.description);
+            INSERT INTO jobs_fts (rowid, {fts_columns})
+            VALUES (new.id, new.job_title, new.company_name, new.location, new.description);
+        END
+    ''')
     
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully")
+    if not exists:
+        cursor.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+
+def _migration_5_stats_version(cursor: sqlite3.Cursor):
+    """
+    Change counter for the get_job_stats() snapshot. Triggers keep it current
+    for every writer, including scripts that UPDATE jobs directly.
+    """
+    for name, event in [
+        ('jobs_version_insert', 'AFTER INSERT ON jobs'),
+        ('jobs_version_delete', 'AFTER DELETE ON jobs'),
+        ('jobs_version_update', 'AFTER UPDATE OF status, match_score, source_platform ON jobs'),
+    ]:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} {event}
+            BEGIN
+                INSERT INTO app_settings (key, value, updated_at) VALUES ('jobs_version', 1, CURRENT_TIMESTAMP)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1, updated_at = CURRENT_TIMESTAMP;
+            END
+        ''')
+
+def _migration_6_contact_email(cursor: sqlite3.Cursor):
+    """
+    Store the school's contact email in its own column. It used to be read
+    from job dicts but never saved, and smart_import wrote it into email_id.
+    """
+    _add_column(cursor, 'jobs', 'contact_email', 'TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_contact_email ON jobs (contact_email)')
+
+def _backfill_6_contact_email(conn: sqlite3.Connection) -> int:
+    return _backfill(conn, '''
+        UPDATE jobs SET contact_email = email_id
+        WHERE id IN (
+            SELECT id FROM jobs
+            WHERE contact_email IS NULL AND email_id LIKE '%_@_%._%'
+            LIMIT ?
+        )
+    ''')
+
+def _migration_7_score_cache(cursor: sqlite3.Cursor):
+    """Persistent cache of AI match scores keyed by a content hash (see ai_matcher)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_score_cache (
+            cache_key TEXT PRIMARY KEY,
+            match_score INTEGER NOT NULL,
+            analysis TEXT,
+            has_description BOOLEAN,
+            fetched_description TEXT,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_score_cache_created ON ai_score_cache (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_score_cache_last_used ON ai_score_cache (last_used_at)')
+
+def _migration_8_score_batches(cursor: sqlite3.Cursor):
+    """Message Batch bookkeeping so bulk scoring can resume after a restart (see ai_matcher)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_score_batches (
+            batch_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'in_progress',
+            label TEXT NOT NULL DEFAULT 'bulk',
+            request_count INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            ended_at REAL
+        )
+    ''')
+    # custom_id is the job's score cache key; job_data is the JSON job dict to hand back
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_score_batch_requests (
+            batch_id TEXT NOT NULL REFERENCES ai_score_batches (batch_id),
+            custom_id TEXT NOT NULL,
+            job_data TEXT NOT NULL,
+            has_description BOOLEAN,
+            fetched_description TEXT,
+            PRIMARY KEY (batch_id, custom_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_score_batches_status ON ai_score_batches (status, label)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_score_batch_requests_custom_id ON ai_score_batch_requests (custom_id)')
+
+def _migration_9_ai_usage(cursor: sqlite3.Cursor):
+    """Per-call token usage, including prompt cache reads/writes, to track AI spend."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ai_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            purpose TEXT NOT NULL,
+            model TEXT,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            cache_creation_input_tokens INTEGER DEFAULT 0,
+            cache_read_input_tokens INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_usage_created ON ai_usage (created_at)')
+
+# Per-criterion AI sub-scores (see ai_matcher.MATCH_SUB_SCORES for their point ranges)
+SUB_SCORE_COLUMNS = ['location_score', 'role_score', 'experience_score', 'specialization_score']
+
+# Columns the dashboard can sort by, best first; unscored rows (NULL) sort last
+JOB_SORT_COLUMNS = ['match_score'] + SUB_SCORE_COLUMNS
+
+def _migration_10_sub_scores(cursor: sqlite3.Cursor):
+    """
+    Store the AI's per-criterion sub-scores on jobs and in the score cache, with
+    expression indexes matching get_jobs_page's sorted keyset order.
+    """
+    for column in SUB_SCORE_COLUMNS:
+        _add_column(cursor, 'jobs', column, 'INTEGER')
+        _add_column(cursor, 'ai_score_cache', column, 'INTEGER')
+    for column in JOB_SORT_COLUMNS:
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_jobs_sort_{column}
+            ON jobs (IFNULL({column}, -1), date_received, id)
+        ''')
+
+def _migration_11_http_cache(cursor: sqlite3.Cursor):
+    """On-disk HTTP response cache for fetched job pages (see http_cache)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_type TEXT,
+            encoding TEXT,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_last_used ON http_cache (last_used_at)')
+
+def _migration_12_crawl_state(cursor: sqlite3.Cursor):
+    """
+    Incremental crawl state: listing URLs whose detail pages were already fetched
+    (including ones the scraper filtered out and never saved), plus a per-source
+    watermark recording the newest listing and when the last crawls ran.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_seen (
+            url TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            first_seen_at REAL NOT NULL,
+            last_seen_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_crawl_seen_last_seen ON crawl_seen (last_seen_at)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_watermarks (
+            source TEXT PRIMARY KEY,
+            newest_url TEXT,
+            last_crawl_at REAL,
+            last_full_crawl_at REAL,
+            pages_crawled INTEGER,
+            new_listings INTEGER
+        )
+    ''')
+
+def _migration_13_cached_cover_letter(cursor: sqlite3.Cursor):
+    """Keep the fused-mode cover letter with its cached score, so a cache hit doesn't lose it."""
+    _add_column(cursor, 'ai_score_cache', 'cover_letter', 'TEXT')
 
-def get_connection():
-    """Get a database connection."""
-    return sqlite3.connect(DATABASE_PATH)
+# Index + 1 is the user_version a database has once the migration has run.
+# Append new migrations to the end; never reorder or edit ones that have shipped.
+MIGRATIONS = [
+    ('baseline schema', _migration_1_baseline, None),
+    ('normalized dedupe keys', _migration_2_dedupe_keys, _backfill_2_dedupe_keys),
+    ('secondary indexes', _migration_3_indexes, None),
+    ('full-text search index', _migration_4_search_index, None),
+    ('stats change counter', _migration_5_stats_version, None),
+    ('contact_email column', _migration_6_contact_email, _backfill_6_contact_email),
+    ('AI score cache', _migration_7_score_cache, None),
+    ('AI score batches', _migration_8_score_batches, None),
+    ('AI usage log', _migration_9_ai_usage, None),
+    ('AI sub-score columns', _migration_10_sub_scores, None),
+    ('HTTP cache', _migration_11_http_cache, None),
+    ('crawl watermarks', _migration_12_crawl_state, None),
+    ('cached cover letters', _migration_13_cached_cover_letter, None),
+]
+
+def _run_migrations(conn: sqlite3.Connection):
+    """Apply every migration newer than the database's user_version, in order."""
+    # Leave any implicit transaction so BEGIN below starts a fresh one
+    conn.commit()
+    
+    for version, (description, schema_step, backfill_step) in enumerate(MIGRATIONS, start=1):
+        # Re-read inside the write lock: another process may have migrated meanwhile
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                conn.execute('COMMIT')
+                continue
+            schema_step(conn.cursor())
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        
+        if backfill_step:
+            updated = backfill_step(conn)
+            if updated:
+                print(f"   Backfilled {updated} rows for migration {version} ({description})")
+        
+        with get_db():
+            conn.execute(f'PRAGMA user_version = {version}')
+        print(f"   Applied migration {version}: {description}")
+    
+    conn.execute('PRAGMA optimize')
 
 def job_exists(job_url: str) -> bool:
     """Check if a job with the given URL already exists."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id FROM jobs WHERE job_url = ?', (job_url,))
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+    with get_db() as conn:
+        cursor = conn.execute('SELECT id FROM jobs WHERE job_url = ?', (job_url,))
+        return cursor.fetchone() is not None
+
+def get_known_job_urls() -> set:
+    """Every stored job_url, for dropping known jobs from a result stream in memory (one indexed scan)."""
+    with get_db() as conn:
+        return {row[0] for row in conn.execute('SELECT job_url FROM jobs')}
 
 def email_processed(email_id: str) -> bool:
     """Check if an email has already been processed."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id FROM email_tracking WHERE email_id = ?', (email_id,))
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+    with get_db() as conn:
+        cursor = conn.execute('SELECT id FROM email_tracking WHERE email_id = ?', (email_id,))
+        return cursor.fetchone() is not None
 
 def mark_email_processed(email_id: str):
     """Mark an email as processed."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('INSERT OR IGNORE INTO email_tracking (email_id) VALUES (?)', (email_id,))
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        conn.execute('INSERT OR IGNORE INTO email_tracking (email_id) VALUES (?)', (email_id,))
+
+# Columns written by insert_job / insert_jobs_many, in placeholder order.
+JOB_INSERT_COLUMNS = [
+    'job_title', 'company_name', 'location', 'description', 'job_url',
+    'posted_date', 'source_platform', 'salary_info', 'status',
+    'rejection_reason', 'match_score', 'ai_analysis', 'email_id',
+    'contact_email', 'title_norm', 'company_norm'
+] + SUB_SCORE_COLUMNS
+
+def _serialize_field(value):
+    """Convert dict/list to JSON string, leave other types as-is."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _job_row(job_data: Dict[str, Any]) -> tuple:
+    """Build the INSERT parameter tuple for a job dict."""
+    defaults = {
+        'status': 'new',
+        'match_score': 0,
+        'title_norm': normalize_key(job_data.get('job_title')),
+        'company_norm': normalize_key(job_data.get('company_name')),
+    }
+    return tuple(
+        _serialize_field(job_data.get(column, defaults.get(column)))
+        for column in JOB_INSERT_COLUMNS
+    )
+
+def _insert_sql(on_conflict: str) -> str:
+    """INSERT statement for jobs with the given ON CONFLICT(job_url) action."""
+    placeholders = ', '.join('?' for _ in JOB_INSERT_COLUMNS)
+    sql = f"INSERT INTO jobs ({', '.join(JOB_INSERT_COLUMNS)}) VALUES ({placeholders}) "
+    if on_conflict == 'update':
+        # Only refresh rows whose stored description is shorter than the incoming one,
+        # so re-imports fill in missing descriptions without clobbering scores or status.
+        sql += '''ON CONFLICT(job_url) DO UPDATE SET description = excluded.description
+            WHERE length(COALESCE(excluded.description, '')) > length(COALESCE(jobs.description, ''))'''
+    else:
+        sql += 'ON CONFLICT(job_url) DO NOTHING'
+    return sql
+
+def _select_in(conn: sqlite3.Connection, sql: str, values: List[Any], chunk_size: int = 500) -> List[sqlite3.Row]:
+    """Run 'sql' (containing one '{placeholders}' slot) over values in chunks under SQLite's parameter limit."""
+    rows = []
+    for i in range(0, len(values), chunk_size):
+        chunk = values[i:i + chunk_size]
+        rows.extend(conn.execute(sql.format(placeholders=', '.join('?' for _ in chunk)), chunk).fetchall())
+    return rows
 
 def insert_job(job_data: Dict[str, Any]) -> Optional[int]:
     """Insert a new job into the database."""
-    if job_exists(job_data['job_url']):
-        print(f"Job already exists: {job_data['job_url']}")
-        return None
+    with get_db() as conn:
+        cursor = conn.execute(_insert_sql('ignore'), _job_row(job_data))
+        if cursor.rowcount == 0:
+            print(f"Job already exists: {job_data['job_url']}")
+            return None
+        job_id = cursor.lastrowid
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    print(f"Inserted job: {job_data.get('job_title')} at {job_data.get('company_name')}")
+    return job_id
+
+def insert_jobs_many(jobs: List[Dict[str, Any]], on_conflict: str = 'ignore') -> Dict[str, Any]:
+    """
+    Insert a batch of jobs in a single transaction.
     
-    import json
+    Args:
+        jobs: Job dictionaries (same shape as insert_job)
+        on_conflict: 'ignore' leaves existing rows alone, 'update' fills in a
+            longer description on rows that already exist
     
-    def serialize_field(value):
-        """Convert dict/list to JSON string, leave other types as-is."""
-        if isinstance(value, (dict, list)):
-            return json.dumps(value)
-        return value
+    Returns:
+        dict with 'inserted_ids' (new row IDs) and 'outcomes', one entry per input
+        job in order: {'job_url', 'id', 'outcome'} where outcome is
+        'inserted', 'updated', 'duplicate' or 'skipped' (no job_url)
+    """
+    if on_conflict not in ('ignore', 'update'):
+        raise ValueError(f"on_conflict must be 'ignore' or 'update', got {on_conflict!r}")
     
-    cursor.execute('''
-        INSERT INTO jobs (
-            job_title, company_name, location, description, job_url,
-            posted_date, source_platform, salary_info, status, 
-            rejection_reason, match_score, ai_analysis, email_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        serialize_field(job_data.get('job_title')),
-        serialize_field(job_data.get('company_name')),
-        serialize_field(job_data.get('location')),
-        serialize_field(job_data.get('description')),
-        serialize_field(job_data.get('job_url')),
-        serialize_field(job_data.get('posted_date')),
-        serialize_field(job_data.get('source_platform')),
-        serialize_field(job_data.get('salary_info')),
-        serialize_field(job_data.get('status', 'new')),
-        serialize_field(job_data.get('rejection_reason')),
-        job_data.get('match_score', 0),
-        serialize_field(job_data.get('ai_analysis')),
-        serialize_field(job_data.get('email_id'))
-    ))
-    
-    job_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    outcomes = [{'job_url': job.get('job_url'), 'id': None, 'outcome': 'duplicate'} for job in jobs]
+    if not jobs:
+        return {'inserted_ids': [], 'outcomes': outcomes}
     
-    print(f"Inserted job: {job_data.get('job_title')} at {job_data.get('company_name')}")
-    return job_id
+    with get_db() as conn:
+        urls = list({job.get('job_url') for job in jobs if job.get('job_url')})
+        existing = {row['job_url']: row for row in _select_in(
+            conn,
+            "SELECT id, job_url, length(COALESCE(description, '')) AS desc_len "
+            "FROM jobs WHERE job_url IN ({placeholders})",
+            urls
+        )}
+        
+        rows_to_write = []
+        seen_urls = set()
+        for job, outcome in zip(jobs, outcomes):
+            url = job.get('job_url')
+            if not url:
+                outcome['outcome'] = 'skipped'
+                continue
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            
+            if url in existing:
+                outcome['id'] = existing[url]['id']
+                incoming_len = len(_serialize_field(job.get('description')) or '')
+                if on_conflict == 'update' and incoming_len > existing[url]['desc_len']:
+                    outcome['outcome'] = 'updated'
+                    rows_to_write.append(_job_row(job))
+            else:
+                outcome['outcome'] = 'inserted'
+                rows_to_write.append(_job_row(job))
+        
+        conn.executemany(_insert_sql(on_conflict), rows_to_write)
+        
+        new_urls = [o['job_url'] for o in outcomes if o['outcome'] == 'inserted']
+        new_ids = {row['job_url']: row['id'] for row in _select_in(
+            conn, 'SELECT id, job_url FROM jobs WHERE job_url IN ({placeholders})', new_urls
+        )}
+    
+    inserted_ids = []
+    for outcome in outcomes:
+        if outcome['outcome'] == 'inserted':
+            outcome['id'] = new_ids.get(outcome['job_url'])
+            inserted_ids.append(outcome['id'])
+    
+    # Repeats of a URL within the same batch point at the row written for its first occurrence
+    ids_by_url = {o['job_url']: o['id'] for o in outcomes if o['id'] is not None}
+    for outcome in outcomes:
+        if outcome['outcome'] == 'duplicate' and outcome['id'] is None:
+            outcome['id'] = ids_by_url.get(outcome['job_url'])
+    
+    counts = {name: sum(1 for o in outcomes if o['outcome'] == name) for name in ('inserted', 'updated', 'duplicate', 'skipped')}
+    print(f"Bulk insert: {counts['inserted']} new, {counts['updated']} updated, "
+          f"{counts['duplicate']} duplicates, {counts['skipped']} skipped")
+    
+    return {'inserted_ids': inserted_ids, 'outcomes': outcomes}
 
-def get_all_jobs(filters: Optional[Dict] = None) -> List[Dict]:
-    """Get all jobs with optional filters."""
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def filter_new_jobs(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop jobs we have already stored, before any description fetching or AI scoring.
     
-    query = 'SELECT * FROM jobs'
+    A job counts as known if its job_url is in the database, or if a stored job has
+    the same normalized title and employer (the same vacancy re-posted under another
+    URL or by another board). Repeats within the batch are dropped too. Everything
+    is checked with two batched indexed lookups, however many jobs are passed in.
+    
+    Returns:
+        The unseen jobs, in their original order
+    """
+    if not jobs:
+        return []
+    
+    keys = [(normalize_key(job.get('job_title')), normalize_key(job.get('company_name'))) for job in jobs]
+    urls = list({job.get('job_url') for job in jobs if job.get('job_url')})
+    titles = list({title for title, company in keys if title and company})
+    
+    with get_db() as conn:
+        known_urls = {row['job_url'] for row in _select_in(
+            conn, 'SELECT job_url FROM jobs WHERE job_url IN ({placeholders})', urls
+        )}
+        known_keys = {(row['title_norm'], row['company_norm']) for row in _select_in(
+            conn, 'SELECT title_norm, company_norm FROM jobs WHERE title_norm IN ({placeholders})', titles
+        )}
+    
+    new_jobs = []
+    for job, key in zip(jobs, keys):
+        url = job.get('job_url')
+        has_key = bool(key[0] and key[1])
+        if url in known_urls or (has_key and key in known_keys):
+            continue
+        new_jobs.append(job)
+        # Later copies of the same posting in this batch are repeats
+        if url:
+            known_urls.add(url)
+        if has_key:
+            known_keys.add(key)
+    
+    skipped = len(jobs) - len(new_jobs)
+    if skipped:
+        print(f"   ♻️  Skipping {skipped}/{len(jobs)} jobs already in the database")
+    return new_jobs
+
+def _filter_conditions(filters: Optional[Dict], table: str = '') -> tuple:
+    """
+    SQL conditions and parameters for the dashboard filters: source_platform,
+    status, min_score, and min_<sub-score column> (e.g. min_role_score).
+    """
+    prefix = f'{table}.' if table else ''
+    conditions = []
     params = []
+    if not filters:
+        return conditions, params
     
-    if filters:
-        conditions = []
-        if filters.get('source_platform'):
-            conditions.append('source_platform = ?')
-            params.append(filters['source_platform'])
-        if filters.get('status'):
-            conditions.append('status = ?')
-            params.append(filters['status'])
-        if filters.get('min_score'):
-            conditions.append('match_score >= ?')
-            params.append(filters['min_score'])
-        
-        if conditions:
-            query += ' WHERE ' + ' AND '.join(conditions)
+    if filters.get('source_platform'):
+        conditions.append(f'{prefix}source_platform = ?')
+        params.append(filters['source_platform'])
+    if filters.get('status'):
+        conditions.append(f'{prefix}status = ?')
+        params.append(filters['status'])
+    if filters.get('min_score'):
+        conditions.append(f'{prefix}match_score >= ?')
+        params.append(filters['min_score'])
+    for column in SUB_SCORE_COLUMNS:
+        if filters.get(f'min_{column}'):
+            conditions.append(f'{prefix}{column} >= ?')
+            params.append(filters[f'min_{column}'])
+    return conditions, params
+
+def get_all_jobs(filters: Optional[Dict] = None) -> List[Dict]:
+    """Get all jobs with optional filters."""
+    query = 'SELECT * FROM jobs'
+    conditions, params = _filter_conditions(filters)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
     
     query += ' ORDER BY date_received DESC'
     
-    cursor.execute(query, params)
-    jobs = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jobs
+    with get_db() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
 
-def get_job_stats() -> Dict[str, Any]:
-    """Get statistics about jobs."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# Columns needed to render a dashboard row. Deliberately excludes the large
+# description / ai_analysis / cover_letter text columns.
+JOB_LIST_COLUMNS = [
+    'id', 'job_title', 'company_name', 'location', 'job_url', 'posted_date',
+    'source_platform', 'date_received', 'status', 'match_score',
+    'application_date', 'notes', 'email_id', 'contact_email'
+] + SUB_SCORE_COLUMNS
+
+def _encode_cursor(date_received: str, job_id: int, sort_value: Optional[int] = None) -> str:
+    """
+    Encode a (date_received, id) keyset position - or (sort_value, date_received, id)
+    when the page is sorted by a score column - as an opaque URL-safe token.
+    """
+    position = [date_received, job_id] if sort_value is None else [sort_value, date_received, job_id]
+    raw = json.dumps(position).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor: str, sorted_by_score: bool = False) -> tuple:
+    """Decode a token from _encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if sorted_by_score:
+            sort_value, date_received, job_id = position
+            return int(sort_value), date_received, int(job_id)
+        date_received, job_id = position
+        return date_received, int(job_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def get_jobs_page(filters: Optional[Dict] = None, cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """
+    Get one page of jobs, newest first, using keyset pagination on (date_received, id).
+    With filters['sort'] set to one of JOB_SORT_COLUMNS, jobs are ordered by that
+    score instead (highest first, newest first among equal scores).
     
-    cursor.execute('SELECT COUNT(*) FROM jobs')
-    total_jobs = cursor.fetchone()[0]
+    Args:
+        filters: Same keys as get_all_jobs (source_platform, status, min_score,
+            min_<sub-score>), plus 'sort'
+        cursor: next_cursor from the previous page, or None for the first page
+        limit: Page size (clamped to 1-200)
     
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'auto-rejected'")
-    auto_rejected = cursor.fetchone()[0]
+    Returns:
+        dict with 'jobs' (lean rows, see JOB_LIST_COLUMNS) and 'next_cursor'
+        (None when there are no more pages)
+    """
+    limit = max(1, min(int(limit), 200))
+    conditions, params = _filter_conditions(filters)
+    
+    sort_column = (filters or {}).get('sort')
+    if sort_column and sort_column not in JOB_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by {sort_column!r}")
+    # Matches the idx_jobs_sort_* expression indexes
+    sort_key = f'IFNULL({sort_column}, -1)' if sort_column else None
+    
+    if cursor:
+        if sort_key:
+            conditions.append(f'({sort_key}, date_received, id) < (?, ?, ?)')
+        else:
+            conditions.append('(date_received, id) < (?, ?)')
+        params.extend(_decode_cursor(cursor, sorted_by_score=bool(sort_key)))
+    
+    query = f"SELECT {', '.join(JOB_LIST_COLUMNS)} FROM jobs"
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    # Fetch one extra row to know whether another page exists
+    if sort_key:
+        query += f' ORDER BY {sort_key} DESC, date_received DESC, id DESC LIMIT ?'
+    else:
+        query += ' ORDER BY date_received DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+    
+    with get_db() as conn:
+        jobs = [dict(row) for row in conn.execute(query, params).fetchall()]
+    
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        last = jobs[-1]
+        sort_value = None
+        if sort_column:
+            sort_value = last[sort_column] if last[sort_column] is not None else -1
+        next_cursor = _encode_cursor(last['date_received'], last['id'], sort_value)
+    
+    return {'jobs': jobs, 'next_cursor': next_cursor}
+
+# Control characters wrapped around matched terms in search_jobs() highlights and
+# snippets; the dashboard HTML-escapes the text first and then swaps them for <mark>.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# bm25() column weights for jobs_fts: title, company, location, description
+SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+def _fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every word is quoted (so punctuation and operators are literal) and ANDed;
+    the last word is a prefix match so results update while typing.
+    """
+    words = re.findall(r'\w+', query, flags=re.UNICODE)
+    if not words:
+        return ''
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def _has_search_index(conn: sqlite3.Connection) -> bool:
+    """False when migration 4 skipped jobs_fts because SQLite lacks FTS5."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs_fts'"
+    ).fetchone() is not None
+
+def _search_jobs_like(conn: sqlite3.Connection, query: str, filters: Optional[Dict], limit: int) -> List[Dict]:
+    """
+    search_jobs without jobs_fts: every word must appear in the title, employer,
+    location or description. Newest first, with no highlight markup.
+    """
+    words = re.findall(r'\w+', query, flags=re.UNICODE)
+    columns = ', '.join(f'jobs.{column}' for column in JOB_LIST_COLUMNS)
+    sql = f'''
+        SELECT {columns},
+            jobs.job_title AS title_highlight,
+            substr(COALESCE(jobs.description, ''), 1, 200) AS snippet
+        FROM jobs
+        WHERE 1 = 1
+    '''
+    params = []
+    for word in words:
+        pattern = '%' + word.replace('_', '\\_') + '%'
+        sql += " AND (" + ' OR '.join(
+            f"jobs.{column} LIKE ? ESCAPE '\\'" for column in ('job_title', 'company_name', 'location', 'description')
+        ) + ")"
+        params.extend([pattern] * 4)
     
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'applied'")
-    applied = cursor.fetchone()[0]
+    conditions, filter_params = _filter_conditions(filters, table='jobs')
+    for condition in conditions:
+        sql += f' AND {condition}'
+    params.extend(filter_params)
     
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'new'")
-    new_jobs = cursor.fetchone()[0]
+    sql += ' ORDER BY jobs.date_received DESC, jobs.id DESC LIMIT ?'
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+def search_jobs(query: str, filters: Optional[Dict] = None, limit: int = 50) -> List[Dict]:
+    """
+    Full-text search over job titles, employers, locations and descriptions.
     
-    cursor.execute("SELECT source_platform, COUNT(*) FROM jobs GROUP BY source_platform")
-    by_platform = dict(cursor.fetchall())
+    Args:
+        query: Free text, e.g. "learning support Canterbury"
+        filters: Same filter keys as get_jobs_page ('sort' is ignored; results are ranked)
+        limit: Maximum results (clamped to 1-200)
     
-    # Match score categories
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE match_score >= 70")
-    high_matches = cursor.fetchone()[0]
+    Returns:
+        Lean job rows (JOB_LIST_COLUMNS) ordered by BM25 relevance, each with
+        'title_highlight' and 'snippet' marked up with HIGHLIGHT_START/HIGHLIGHT_END.
+        Without FTS5 (no jobs_fts table) this falls back to _search_jobs_like.
+    """
+    match = _fts_query(query or '')
+    if not match:
+        return []
     
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE match_score >= 50 AND match_score < 70")
-    medium_matches = cursor.fetchone()[0]
+    limit = max(1, min(int(limit), 200))
+    columns = ', '.join(f'jobs.{column}' for column in JOB_LIST_COLUMNS)
+    sql = f'''
+        SELECT {columns},
+            highlight(jobs_fts, 0, ?, ?) AS title_highlight,
+            snippet(jobs_fts, 3, ?, ?, '…', 24) AS snippet
+        FROM jobs_fts
+        JOIN jobs ON jobs.id = jobs_fts.rowid
+        WHERE jobs_fts MATCH ?
+    '''
+    params = [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match]
     
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE match_score < 50 OR match_score IS NULL")
-    low_matches = cursor.fetchone()[0]
+    conditions, filter_params = _filter_conditions(filters, table='jobs')
+    for condition in conditions:
+        sql += f' AND {condition}'
+    params.extend(filter_params)
     
-    # Pending review: ALL ready_to_apply jobs (cover letters ready, need manual application)
-    cursor.execute("SELECT COUNT(*) FROM jobs WHERE status = 'ready_to_apply'")
-    pending_review = cursor.fetchone()[0]
+    sql += f" ORDER BY bm25(jobs_fts, {', '.join(str(w) for w in SEARCH_WEIGHTS)}) LIMIT ?"
+    params.append(limit)
     
-    conn.close()
+    with get_db() as conn:
+        if not _has_search_index(conn):
+            return _search_jobs_like(conn, query, filters, limit)
+        return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+# Last computed get_job_stats() result and the jobs_version it was computed at
+_stats_snapshot = {'version': None, 'stats': None}
+_stats_lock = threading.Lock()
+
+def _jobs_version(conn: sqlite3.Connection) -> Optional[str]:
+    """Read the change counter bumped by the jobs_version_* triggers."""
+    row = conn.execute("SELECT value FROM app_settings WHERE key = 'jobs_version'").fetchone()
+    return row[0] if row else None
+
+def get_job_stats() -> Dict[str, Any]:
+    """
+    Get statistics about jobs.
+    All buckets are computed in one pass over the table; the result is cached
+    until a trigger bumps jobs_version (any insert, delete or status/score change,
+    from this process or another one), so repeated dashboard polls are a
+    single primary-key lookup.
+    """
+    with get_db() as conn:
+        version = _jobs_version(conn)
+        with _stats_lock:
+            if _stats_snapshot['stats'] is not None and _stats_snapshot['version'] == version:
+                return _copy_stats(_stats_snapshot['stats'])
+        
+        rows = conn.execute('''
+            SELECT
+                source_platform,
+                COUNT(*) AS total_jobs,
+                SUM(CASE WHEN status = 'auto-rejected' THEN 1 ELSE 0 END) AS auto_rejected,
+                SUM(CASE WHEN status = 'applied' THEN 1 ELSE 0 END) AS applied,
+                SUM(CASE WHEN status = 'new' THEN 1 ELSE 0 END) AS new_jobs,
+                SUM(CASE WHEN match_score >= 70 THEN 1 ELSE 0 END) AS high_matches,
+                SUM(CASE WHEN match_score >= 50 AND match_score < 70 THEN 1 ELSE 0 END) AS medium_matches,
+                SUM(CASE WHEN match_score < 50 OR match_score IS NULL THEN 1 ELSE 0 END) AS low_matches,
+                -- Pending review: ALL ready_to_apply jobs (cover letters ready, need manual application)
+                SUM(CASE WHEN status = 'ready_to_apply' THEN 1 ELSE 0 END) AS pending_review
+            FROM jobs
+            GROUP BY source_platform
+        ''').fetchall()
     
-    return {
-        'total_jobs': total_jobs,
-        'auto_rejected': auto_rejected,
-        'applied': applied,
-        'new_jobs': new_jobs,
-        'by_platform': by_platform,
-        'high_matches': high_matches,
-        'medium_matches': medium_matches,
-        'low_matches': low_matches,
-        'pending_review': pending_review
+    stats = {
+        'total_jobs': 0,
+        'auto_rejected': 0,
+        'applied': 0,
+        'new_jobs': 0,
+        'by_platform': {},
+        'high_matches': 0,
+        'medium_matches': 0,
+        'low_matches': 0,
+        'pending_review': 0
     }
+    for row in rows:
+        stats['by_platform'][row['source_platform']] = row['total_jobs']
+        for key in stats:
+            if key != 'by_platform':
+                stats[key] += row[key]
+    
+    with _stats_lock:
+        _stats_snapshot['version'] = version
+        _stats_snapshot['stats'] = stats
+    
+    return _copy_stats(stats)
+
+def _copy_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a stats dict so callers can't mutate the cached snapshot."""
+    return {**stats, 'by_platform': dict(stats['by_platform'])}
 
 def update_job_status(job_id: int, status: str, notes: Optional[str] = None):
     """Update job status."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_db() as conn:
+        if status == 'applied':
+            conn.execute('''
+                UPDATE jobs 
+                SET status = ?, application_date = ?, notes = ?
+                WHERE id = ?
+            ''', (status, datetime.now().isoformat(), notes, job_id))
+        else:
+            conn.execute('''
+                UPDATE jobs 
+                SET status = ?, notes = ?
+                WHERE id = ?
+            ''', (status, notes, job_id))
+
+def get_cached_score(cache_key: str, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached AI match result. Entries older than max_age_seconds are ignored.
+    A hit refreshes last_used_at so LRU eviction keeps frequently reused scores.
+    A cached cover letter comes with 'drafted_at' (epoch seconds).
+    """
+    now = time.time()
+    with get_db() as conn:
+        row = conn.execute('''
+            SELECT match_score, analysis, has_description, fetched_description,
+                location_score, role_score, experience_score, specialization_score,
+                cover_letter, created_at
+            FROM ai_score_cache WHERE cache_key = ? AND created_at >= ?
+        ''', (cache_key, now - max_age_seconds)).fetchone()
+        if not row:
+            return None
+        conn.execute(
+            'UPDATE ai_score_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+            (now, cache_key)
+        )
     
-    if status == 'applied':
-        cursor.execute('''
-            UPDATE jobs 
-            SET status = ?, application_date = ?, notes = ?
-            WHERE id = ?
-        ''', (status, datetime.now().isoformat(), notes, job_id))
-    else:
-        cursor.execute('''
-            UPDATE jobs 
-            SET status = ?, notes = ?
-            WHERE id = ?
-        ''', (status, notes, job_id))
+    result = {
+        'match_score': row['match_score'],
+        'analysis': row['analysis'],
+        'has_description': bool(row['has_description'])
+    }
+    for column in SUB_SCORE_COLUMNS:
+        result[column] = row[column]
+    if row['fetched_description']:
+        result['fetched_description'] = row['fetched_description']
+    if row['cover_letter']:
+        # The letter is dated when it was drafted, which is when the entry was written
+        result['cover_letter'] = row['cover_letter']
+        result['drafted_at'] = row['created_at']
+    return result
+
+SCORE_CACHE_UPSERT_SQL = '''
+    INSERT INTO ai_score_cache (
+        cache_key, match_score, analysis, has_description,
+        fetched_description, created_at, last_used_at,
+        location_score, role_score, experience_score, specialization_score, cover_letter
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(cache_key) DO UPDATE SET
+        match_score = excluded.match_score,
+        location_score = excluded.location_score,
+        role_score = excluded.role_score,
+        experience_score = excluded.experience_score,
+        specialization_score = excluded.specialization_score,
+        analysis = excluded.analysis,
+        has_description = excluded.has_description,
+        fetched_description = excluded.fetched_description,
+        cover_letter = excluded.cover_letter,
+        created_at = excluded.created_at,
+        last_used_at = excluded.last_used_at
+'''
+
+def _score_cache_row(cache_key: str, result: Dict[str, Any], now: float) -> tuple:
+    return (
+        cache_key,
+        result['match_score'],
+        result.get('analysis'),
+        result.get('has_description'),
+        result.get('fetched_description'),
+        now,
+        now,
+        *(result.get(column) for column in SUB_SCORE_COLUMNS),
+        result.get('cover_letter')
+    )
+
+def put_cached_score(cache_key: str, result: Dict[str, Any]):
+    """Store an AI match result (as returned by analyze_job_match) under cache_key."""
+    with get_db() as conn:
+        conn.execute(SCORE_CACHE_UPSERT_SQL, _score_cache_row(cache_key, result, time.time()))
+
+def prune_score_cache(max_age_seconds: float, max_entries: int) -> int:
+    """Drop expired score cache entries, then the least recently used beyond max_entries."""
+    with get_db() as conn:
+        expired = conn.execute(
+            'DELETE FROM ai_score_cache WHERE created_at < ?', (time.time() - max_age_seconds,)
+        ).rowcount
+        evicted = conn.execute('''
+            DELETE FROM ai_score_cache WHERE cache_key IN (
+                SELECT cache_key FROM ai_score_cache
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (max_entries,)).rowcount
+    return expired + evicted
+
+def save_score_batch(batch_id: str, requests: List[Dict[str, Any]], label: str = 'bulk'):
+    """
+    Record a submitted Message Batch and its custom_id -> job mapping.
+    Each request needs 'custom_id' and 'job_data', optionally 'has_description'
+    and 'fetched_description' (from fetching a missing description before submit).
+    The label says which workflow owns the batch, so each only resumes its own.
+    """
+    with get_db() as conn:
+        conn.execute(
+            'INSERT INTO ai_score_batches (batch_id, label, request_count, created_at) VALUES (?, ?, ?, ?)',
+            (batch_id, label, len(requests), time.time())
+        )
+        conn.executemany('''
+            INSERT OR IGNORE INTO ai_score_batch_requests (
+                batch_id, custom_id, job_data, has_description, fetched_description
+            ) VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (
+                batch_id,
+                request['custom_id'],
+                json.dumps(request['job_data']),
+                request.get('has_description'),
+                request.get('fetched_description')
+            )
+            for request in requests
+        ])
+
+def get_open_score_batches(label: str = 'bulk') -> List[str]:
+    """IDs of submitted batches whose results haven't been written back yet, oldest first."""
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT batch_id FROM ai_score_batches WHERE status = 'in_progress' AND label = ? ORDER BY created_at",
+            (label,)
+        ).fetchall()
+    return [row['batch_id'] for row in rows]
+
+def find_open_batch_requests(custom_ids: List[str]) -> Dict[str, str]:
+    """Map each custom_id that is already waiting in an unfinished batch to that batch's ID."""
+    with get_db() as conn:
+        rows = _select_in(conn, '''
+            SELECT r.custom_id, r.batch_id FROM ai_score_batch_requests r
+            JOIN ai_score_batches b ON b.batch_id = r.batch_id
+            WHERE b.status = 'in_progress' AND r.custom_id IN ({placeholders})
+        ''', list(custom_ids))
+    return {row['custom_id']: row['batch_id'] for row in rows}
+
+def get_score_batch_requests(batch_id: str) -> List[Dict[str, Any]]:
+    """The requests recorded for a batch, with job_data decoded back into a dict."""
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT custom_id, job_data, has_description, fetched_description
+            FROM ai_score_batch_requests WHERE batch_id = ?
+        ''', (batch_id,)).fetchall()
+    return [
+        {
+            'custom_id': row['custom_id'],
+            'job_data': json.loads(row['job_data']),
+            'has_description': bool(row['has_description']),
+            'fetched_description': row['fetched_description']
+        }
+        for row in rows
+    ]
+
+def complete_score_batch(batch_id: str, results: Dict[str, Dict[str, Any]]):
+    """
+    Write a finished batch's scores into the score cache (keyed by custom_id) and
+    mark the batch ended, in one transaction.
+    """
+    now = time.time()
+    with get_db() as conn:
+        conn.executemany(SCORE_CACHE_UPSERT_SQL, [
+            _score_cache_row(custom_id, result, now) for custom_id, result in results.items()
+        ])
+        conn.execute(
+            "UPDATE ai_score_batches SET status = 'ended', ended_at = ? WHERE batch_id = ?",
+            (now, batch_id)
+        )
+
+AI_USAGE_FIELDS = ['input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens']
+
+def record_ai_usage(purpose: str, model: str, usage: Dict[str, int]):
+    """Log the token usage of one API call ('match', 'match_batch', 'cover_letter', ...)."""
+    with get_db() as conn:
+        conn.execute('''
+            INSERT INTO ai_usage (
+                created_at, purpose, model, input_tokens, output_tokens,
+                cache_creation_input_tokens, cache_read_input_tokens
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (time.time(), purpose, model, *[usage.get(field) or 0 for field in AI_USAGE_FIELDS]))
+
+def get_ai_usage_summary(since_seconds: float = 7 * 24 * 3600) -> Dict[str, Dict[str, Any]]:
+    """
+    Token totals per purpose over the last since_seconds, plus the share of
+    prompt input tokens served from the prompt cache.
+    """
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT purpose, COUNT(*) AS calls,
+                   SUM(input_tokens) AS input_tokens,
+                   SUM(output_tokens) AS output_tokens,
+                   SUM(cache_creation_input_tokens) AS cache_creation_input_tokens,
+                   SUM(cache_read_input_tokens) AS cache_read_input_tokens
+            FROM ai_usage WHERE created_at >= ?
+            GROUP BY purpose
+        ''', (time.time() - since_seconds,)).fetchall()
     
-    conn.commit()
-    conn.close()
+    summary = {}
+    for row in rows:
+        totals = {field: row[field] or 0 for field in AI_USAGE_FIELDS}
+        prompt_tokens = totals['input_tokens'] + totals['cache_creation_input_tokens'] + totals['cache_read_input_tokens']
+        totals['calls'] = row['calls']
+        totals['cache_hit_rate'] = round(totals['cache_read_input_tokens'] / prompt_tokens, 3) if prompt_tokens else 0.0
+        summary[row['purpose']] = totals
+    return summary
+
+def get_phrase_document_frequencies(phrases: List[str]) -> Dict[str, Any]:
+    """
+    How many stored jobs contain each phrase (via jobs_fts), plus the total job
+    count - corpus statistics for the local pre-filter's BM25 weighting.
+    Returns zero counts if the full-text index is unavailable.
+    """
+    with get_db() as conn:
+        total = conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+        frequencies = {}
+        try:
+            for phrase in phrases:
+                words = re.findall(r'\w+', phrase, flags=re.UNICODE)
+                if words:
+                    frequencies[phrase] = conn.execute(
+                        'SELECT COUNT(*) FROM jobs_fts WHERE jobs_fts MATCH ?', ('"' + ' '.join(words) + '"',)
+                    ).fetchone()[0]
+        except sqlite3.OperationalError:
+            return {'total': 0, 'frequencies': {}}
+    return {'total': total, 'frequencies': frequencies}
+
+def get_llm_scored_jobs(limit: int = 5000) -> List[Dict]:
+    """
+    Jobs whose match_score came from a successful AI analysis (not the local
+    pre-filter or an API error) - the reference set for pre-filter calibration.
+    """
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT id, job_title, company_name, location, description, source_platform, match_score
+            FROM jobs
+            WHERE match_score IS NOT NULL AND ai_analysis IS NOT NULL
+            AND ai_analysis NOT LIKE 'Pre-filter:%'
+            AND ai_analysis NOT LIKE 'AI analysis%'
+            AND ai_analysis NOT LIKE 'AI response parsing error%'
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+def get_http_cache_entry(url: str) -> Optional[Dict[str, Any]]:
+    """Cached response for url (body still gzip-compressed), refreshing its LRU timestamp."""
+    with get_db() as conn:
+        row = conn.execute('SELECT * FROM http_cache WHERE url = ?', (url,)).fetchone()
+        if not row:
+            return None
+        conn.execute('UPDATE http_cache SET last_used_at = ? WHERE url = ?', (time.time(), url))
+    return dict(row)
+
+def put_http_cache_entry(url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                         content_type: Optional[str] = None, encoding: Optional[str] = None):
+    """Store (or replace) a response; body is the gzip-compressed payload."""
+    now = time.time()
+    with get_db() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO http_cache (
+                url, etag, last_modified, content_type, encoding, body, size, fetched_at, last_used_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (url, etag, last_modified, content_type, encoding, body, len(body), now, now))
+
+def refresh_http_cache_entry(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+    """Mark a cached response as fresh again after a 304 Not Modified, keeping new validators."""
+    with get_db() as conn:
+        conn.execute('''
+            UPDATE http_cache
+            SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+            WHERE url = ?
+        ''', (time.time(), etag, last_modified, url))
+
+def prune_http_cache(max_age_seconds: float, max_bytes: int) -> int:
+    """
+    Drop cached responses not fetched or revalidated within max_age_seconds, then
+    the least recently used until the stored bodies total at most max_bytes.
+    """
+    with get_db() as conn:
+        expired = conn.execute(
+            'DELETE FROM http_cache WHERE fetched_at < ?', (time.time() - max_age_seconds,)
+        ).rowcount
+        evicted = conn.execute('''
+            DELETE FROM http_cache WHERE url IN (
+                SELECT url FROM (
+                    SELECT url, SUM(size) OVER (ORDER BY last_used_at DESC, url) AS running_size
+                    FROM http_cache
+                ) WHERE running_size > ?
+            )
+        ''', (max_bytes,)).rowcount
+    return expired + evicted
+
+def get_known_listing_urls(urls: List[str], include_seen: bool = True) -> set:
+    """
+    The listing URLs that need no detail fetch: already stored as jobs or, with
+    include_seen, already crawled (see mark_listings_seen).
+    """
+    urls = list({url for url in urls if url})
+    with get_db() as conn:
+        known = {row['job_url'] for row in _select_in(
+            conn, 'SELECT job_url FROM jobs WHERE job_url IN ({placeholders})', urls
+        )}
+        if include_seen:
+            known.update(row['url'] for row in _select_in(
+                conn, 'SELECT url FROM crawl_seen WHERE url IN ({placeholders})', urls
+            ))
+    return known
+
+def mark_listings_seen(source: str, urls: List[str]):
+    """Record listing URLs as crawled, or as still listed if they already were."""
+    now = time.time()
+    with get_db() as conn:
+        conn.executemany('''
+            INSERT INTO crawl_seen (url, source, first_seen_at, last_seen_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET last_seen_at = excluded.last_seen_at
+        ''', [(url, source, now, now) for url in set(urls) if url])
+
+def prune_crawl_seen(max_age_seconds: float) -> int:
+    """Forget listings not seen on a listing page within max_age_seconds."""
+    with get_db() as conn:
+        return conn.execute(
+            'DELETE FROM crawl_seen WHERE last_seen_at < ?', (time.time() - max_age_seconds,)
+        ).rowcount
+
+def get_crawl_watermark(source: str) -> Optional[Dict[str, Any]]:
+    """The source's last crawl: newest listing URL, crawl times and counts, or None."""
+    with get_db() as conn:
+        row = conn.execute('SELECT * FROM crawl_watermarks WHERE source = ?', (source,)).fetchone()
+    return dict(row) if row else None
+
+def update_crawl_watermark(source: str, newest_url: Optional[str], pages_crawled: int, new_listings: int,
+                           full_crawl: bool = False):
+    """Record a finished crawl; a None newest_url keeps the previous one."""
+    now = time.time()
+    with get_db() as conn:
+        conn.execute('''
+            INSERT INTO crawl_watermarks (
+                source, newest_url, last_crawl_at, last_full_crawl_at, pages_crawled, new_listings
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET
+                newest_url = COALESCE(excluded.newest_url, newest_url),
+                last_crawl_at = excluded.last_crawl_at,
+                last_full_crawl_at = COALESCE(excluded.last_full_crawl_at, last_full_crawl_at),
+                pages_crawled = excluded.pages_crawled,
+                new_listings = excluded.new_listings
+        ''', (source, newest_url, now, now if full_crawl else None, pages_crawled, new_listings))
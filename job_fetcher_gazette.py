@@ -6,18 +6,38 @@ import requests
 from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 import re
-from datetime import datetime
+import sqlite3
 import time
+from datetime import datetime
+from keyword_matcher import KeywordMatcher, extract_nz_location, has_excluded_keyword
+from html_extract import extract_job_page
+from polite_crawler import get_crawler
+from database import (
+    get_known_listing_urls, mark_listings_seen, prune_crawl_seen,
+    get_crawl_watermark, update_crawl_watermark
+)
 
 BASE_URL = "https://gazette.education.govt.nz"
-HEADERS = {"User-Agent": "Mozilla/5.0"}
+GAZETTE_SOURCE = 'Education Gazette NZ'
 
+# Incremental crawls stop at the first fully-known page; a periodic full crawl
+# catches listings the board inserted further down
+FULL_CRAWL_INTERVAL_SECONDS = 7 * 24 * 3600
+SEEN_LISTING_MAX_AGE_SECONDS = 90 * 24 * 3600
 
-def search_education_gazette(max_jobs: int = 50) -> List[Dict]:
+
+def search_education_gazette(max_jobs: int = 50, incremental: bool = True) -> List[Dict]:
     """
     Search Education Gazette for Foundation Phase teaching jobs.
     Based on proven scraper pattern with requests + BeautifulSoup.
     
+    Listings with an excluded keyword (see keyword_matcher) are filtered out here
+    too. Incremental crawls only fetch detail pages for listings not yet in jobs.db
+    (or crawled before and filtered out), and stop at the first listing page
+    with nothing new. Every FULL_CRAWL_INTERVAL_SECONDS - or with
+    incremental=False - the crawl walks every page and re-fetches listings that
+    were crawled but never saved.
+    
     Returns empty list if scraping fails (fault-tolerant).
     """
     print(f"\n📰 Searching Education Gazette NZ (Official Government Job Board)...")
@@ -26,6 +46,20 @@ def search_education_gazette(max_jobs: int = 50) -> List[Dict]:
     start = 0
     pages_scraped = 0
     max_pages = 5
+    crawler = get_crawler()
+    
+    # Crawl state never breaks the scrape; without it every listing is fetched
+    try:
+        watermark = get_crawl_watermark(GAZETTE_SOURCE) or {}
+        track_state = True
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Crawl state unavailable ({e}) - fetching every listing")
+        watermark, track_state = {}, False
+    full_crawl = not incremental or time.time() - (watermark.get('last_full_crawl_at') or 0) > FULL_CRAWL_INTERVAL_SECONDS
+    if track_state and full_crawl:
+        print(f"   Full crawl: every page, re-checking listings crawled but not saved")
+    newest_url = None
+    detail_fetches = 0
     
     try:
         while pages_scraped < max_pages and len(all_jobs) < max_jobs:
@@ -33,8 +67,7 @@ def search_education_gazette(max_jobs: int = 50) -> List[Dict]:
             print(f"   🔎 Page {pages_scraped + 1}: Fetching jobs...")
             
             try:
-                response = requests.get(url, headers=HEADERS, timeout=30)
-                response.raise_for_status()
+                response = crawler.get(url, timeout=30)
                 soup = BeautifulSoup(response.text, "html.parser")
                 
                 jobs_on_page = soup.select("article.block-vacancy-featured")
@@ -45,38 +78,75 @@ def search_education_gazette(max_jobs: int = 50) -> List[Dict]:
                 
                 print(f"   Found {len(jobs_on_page)} job listings on this page")
                 
+                cards = []
                 for job_card in jobs_on_page:
-                    if len(all_jobs) >= max_jobs:
-                        break
-                    
                     try:
-                        job_data = scrape_job_from_card(job_card)
-                        
-                        if job_data and is_relevant_job(job_data):
-                            all_jobs.append(job_data)
-                            print(f"   ✅ {len(all_jobs)}. {job_data['job_title']} - {job_data['company_name']}")
-                            if job_data.get('contact_email'):
-                                print(f"      📧 Email: {job_data['contact_email']}")
-                        
-                        time.sleep(1)
-                        
+                        card_data = parse_job_card(job_card)
+                        if card_data:
+                            cards.append(card_data)
                     except Exception as e:
                         print(f"   ⚠️  Error scraping job card: {e}")
-                        continue
+                
+                if newest_url is None and cards:
+                    newest_url = cards[0]['job_url']
+                
+                known = set()
+                if track_state:
+                    page_urls = [card['job_url'] for card in cards]
+                    known = get_known_listing_urls(page_urls, include_seen=not full_crawl)
+                    mark_listings_seen(GAZETTE_SOURCE, [url for url in page_urls if url in known])
+                new_cards = [card for card in cards if card['job_url'] not in known]
+                
+                if known:
+                    print(f"   ♻️  {len(known)}/{len(cards)} listings already known - skipping their detail pages")
+                if cards and not new_cards and not full_crawl:
+                    print(f"   ⏹️  Nothing new on this page - stopping (last crawl reached this point)")
+                    pages_scraped += 1
+                    break
+                
+                # Detail pages are fetched concurrently, paced by the crawler's per-host budget
+                details = crawler.map(fetch_job_details, [card['job_url'] for card in new_cards])
+                detail_fetches += len(new_cards)
+                
+                # Only rejected listings are marked seen here. Returned ones become
+                # known once the caller saves them to jobs (or marks its own rejects
+                # seen), so a failed save is retried
+                rejected_urls = []
+                for card_data, job_details in zip(new_cards, details):
+                    if len(all_jobs) >= max_jobs:
+                        break
+                    
+                    job_data = build_job(card_data, job_details)
+                    
+                    if is_relevant_job(job_data) and not has_excluded_keyword(job_data['job_title'], job_data['description']):
+                        all_jobs.append(job_data)
+                        print(f"   ✅ {len(all_jobs)}. {job_data['job_title']} - {job_data['company_name']}")
+                        if job_data.get('contact_email'):
+                            print(f"      📧 Email: {job_data['contact_email']}")
+                    elif job_data['description']:
+                        # Listings whose page failed to load are retried next run
+                        rejected_urls.append(job_data['job_url'])
+                
+                if track_state:
+                    mark_listings_seen(GAZETTE_SOURCE, rejected_urls)
                 
                 start += 10
                 pages_scraped += 1
-                time.sleep(2)
                 
             except requests.exceptions.RequestException as e:
                 print(f"   ⚠️  Page request failed: {e}")
                 break
         
-        print(f"\n✅ Education Gazette: Found {len(all_jobs)} relevant Foundation Phase jobs")
+        print(f"\n✅ Education Gazette: Found {len(all_jobs)} relevant Foundation Phase jobs "
+              f"({detail_fetches} detail pages fetched)")
         if all_jobs:
             email_count = sum(1 for j in all_jobs if j.get('contact_email'))
             print(f"   Jobs with email addresses: {email_count}/{len(all_jobs)}")
         
+        if track_state:
+            update_crawl_watermark(GAZETTE_SOURCE, newest_url, pages_scraped, detail_fetches, full_crawl=full_crawl)
+            prune_crawl_seen(SEEN_LISTING_MAX_AGE_SECONDS)
+        
         return all_jobs
         
     except Exception as e:
@@ -85,51 +155,54 @@ def search_education_gazette(max_jobs: int = 50) -> List[Dict]:
         return []
 
 
-def scrape_job_from_card(card) -> Optional[Dict]:
-    """Extract job data from listing card and fetch full details."""
-    try:
-        title_elem = card.select_one("h3.title")
-        job_title = title_elem.get_text(strip=True) if title_elem else None
-        
-        if not job_title:
-            return None
-        
-        employer_elem = card.select_one("span.tag.bullet")
-        company_name = employer_elem.get_text(strip=True) if employer_elem else "NZ School"
-        
-        emp_type_elem = card.select_one("p.title-byline")
-        employment_type = emp_type_elem.get_text(strip=True) if emp_type_elem else "Full time"
-        
-        closing_elem = card.select_one("div.cal-icon.end")
-        closing_date = closing_elem.get_text(" ", strip=True) if closing_elem else None
-        
-        link_elem = card.select_one("a")
-        job_url = link_elem["href"] if link_elem and link_elem.get("href") else None
-        
-        if not job_url:
-            return None
-        
-        if not job_url.startswith("http"):
-            job_url = BASE_URL + job_url
-        
-        job_details = fetch_job_details(job_url)
-        
-        job_data = {
-            'job_title': job_title,
-            'company_name': company_name,
-            'location': extract_location(job_details.get('description', '')),
-            'job_url': job_url,
-            'description': job_details.get('description', ''),
-            'posted_date': closing_date or datetime.now().strftime('%Y-%m-%d'),
-            'source_platform': 'Education Gazette NZ',
-            'salary_info': None,
-            'contact_email': job_details.get('email')
-        }
-        
-        return job_data
-        
-    except Exception as e:
+def parse_job_card(card) -> Optional[Dict]:
+    """Extract the listing card fields; the detail page is fetched separately."""
+    title_elem = card.select_one("h3.title")
+    job_title = title_elem.get_text(strip=True) if title_elem else None
+    
+    if not job_title:
         return None
+    
+    employer_elem = card.select_one("span.tag.bullet")
+    company_name = employer_elem.get_text(strip=True) if employer_elem else "NZ School"
+    
+    emp_type_elem = card.select_one("p.title-byline")
+    employment_type = emp_type_elem.get_text(strip=True) if emp_type_elem else "Full time"
+    
+    closing_elem = card.select_one("div.cal-icon.end")
+    closing_date = closing_elem.get_text(" ", strip=True) if closing_elem else None
+    
+    link_elem = card.select_one("a")
+    job_url = link_elem["href"] if link_elem and link_elem.get("href") else None
+    
+    if not job_url:
+        return None
+    
+    if not job_url.startswith("http"):
+        job_url = BASE_URL + job_url
+    
+    return {
+        'job_title': job_title,
+        'company_name': company_name,
+        'employment_type': employment_type,
+        'closing_date': closing_date,
+        'job_url': job_url
+    }
+
+
+def build_job(card_data: Dict, job_details: Dict) -> Dict:
+    """Combine listing card fields with the detail page into a job record."""
+    return {
+        'job_title': card_data['job_title'],
+        'company_name': card_data['company_name'],
+        'location': extract_location(job_details.get('description', '')),
+        'job_url': card_data['job_url'],
+        'description': job_details.get('description', ''),
+        'posted_date': card_data['closing_date'] or datetime.now().strftime('%Y-%m-%d'),
+        'source_platform': GAZETTE_SOURCE,
+        'salary_info': None,
+        'contact_email': job_details.get('email')
+    }
 
 
 def fetch_job_details(job_url: str) -> Dict:
@@ -144,16 +217,11 @@ def fetch_job_details(job_url: str) -> Dict:
     }
     
     try:
-        response = requests.get(job_url, headers=HEADERS, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        desc_elem = soup.select_one("div.description")
-        if desc_elem:
-            details['description'] = desc_elem.get_text(" ", strip=True)[:2000]
-        
-        contact_elem = soup.select_one("div.contact")
-        contact_text = contact_elem.get_text(" ", strip=True) if contact_elem else ""
+        response = get_crawler().get(job_url, timeout=20)
+        # Strict: a page without div.description gives no description, not its nav text
+        page = extract_job_page(response.text, job_url, fallback=False)
+        details['description'] = page['description'][:2000]
+        contact_text = page['contact']
         details['contact'] = contact_text
         
         text_blob = details['description'] + " " + contact_text
@@ -170,20 +238,25 @@ def fetch_job_details(job_url: str) -> Dict:
 
 def extract_location(description: str) -> str:
     """Extract location from job description."""
-    locations = [
-        'Auckland', 'Wellington', 'Canterbury', 'Christchurch', 
-        'Waikato', 'Hamilton', 'Bay of Plenty', 'Tauranga',
-        'Otago', 'Dunedin', 'Manawatu', 'Palmerston North',
-        'Hawke\'s Bay', 'Napier', 'Taranaki', 'New Plymouth',
-        'Nelson', 'Marlborough', 'Gisborne', 'Northland',
-        'Whangarei', 'Southland', 'Invercargill'
-    ]
-    
-    for location in locations:
-        if location.lower() in description.lower():
-            return location
-    
-    return "New Zealand"
+    return extract_nz_location(description)
+
+
+RELEVANCE_EXCLUDE = KeywordMatcher([
+    'secondary', 'high school', 
+    'year 7', 'year 8', 'year 9', 'year 10', 'year 11', 'year 12', 'year 13',
+    'intermediate', 'middle school',
+    'principal', 'deputy principal', 'assistant principal',
+    'head of department', 'hod', 'dean'
+])
+
+RELEVANCE_INCLUDE = KeywordMatcher([
+    'year 1', 'year 2', 'year 3', 'year 0',
+    'years 1-3', 'years 1-4', 'years 0-3',
+    'junior', 'foundation', 'new entrant',
+    'learning support', 'senco', 'special education',
+    'primary', 'early childhood', 'ece', 'ecd',
+    'grade r', 'grade 1', 'grade 2', 'grade 3'
+])
 
 
 def is_relevant_job(job: Dict) -> bool:
@@ -191,39 +264,13 @@ def is_relevant_job(job: Dict) -> bool:
     Filter for Foundation Phase / Junior Primary teaching jobs (Years R-3).
     Exclude secondary, intermediate, and administrative positions.
     """
-    title_lower = job['job_title'].lower()
-    desc_lower = job['description'].lower()
-    combined = title_lower + ' ' + desc_lower
-    
-    exclude_keywords = [
-        'secondary', 'high school', 
-        'year 7', 'year 8', 'year 9', 'year 10', 'year 11', 'year 12', 'year 13',
-        'intermediate', 'middle school',
-        'principal', 'deputy principal', 'assistant principal',
-        'head of department', 'hod', 'dean'
-    ]
-    
-    for keyword in exclude_keywords:
-        if keyword in combined:
-            return False
-    
-    include_keywords = [
-        'year 1', 'year 2', 'year 3', 'year 0',
-        'years 1-3', 'years 1-4', 'years 0-3',
-        'junior', 'foundation', 'new entrant',
-        'learning support', 'senco', 'special education',
-        'primary', 'early childhood', 'ece', 'ecd',
-        'grade r', 'grade 1', 'grade 2', 'grade 3'
-    ]
-    
-    for keyword in include_keywords:
-        if keyword in combined:
-            return True
-    
-    if 'teacher' in title_lower and 'primary' in combined:
-        return True
-    
-    return False
+    combined = job['job_title'] + ' ' + job['description']
+    
+    if RELEVANCE_EXCLUDE.matches(combined):
+        return False
+    
+    # 'primary' is an include keyword, so a primary teacher title is already covered here
+    return RELEVANCE_INCLUDE.matches(combined)
 
 
 if __name__ == "__main__":
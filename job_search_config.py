@@ -45,3 +45,13 @@ EXCLUDED_KEYWORDS = [
     'head of department',
     'HOD'
 ]
+
+# NZ regions and main towns, used for location extraction and the local pre-filter
+NZ_LOCATIONS = [
+    'Auckland', 'Wellington', 'Canterbury', 'Christchurch', 
+    'Waikato', 'Hamilton', 'Bay of Plenty', 'Tauranga',
+    'Otago', 'Dunedin', 'Manawatu', 'Palmerston North',
+    'Hawke\'s Bay', 'Napier', 'Taranaki', 'New Plymouth',
+    'Nelson', 'Marlborough', 'Gisborne', 'Northland',
+    'Whangarei', 'Southland', 'Invercargill'
+]
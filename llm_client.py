@@ -0,0 +1,72 @@
+"""
+Shared Anthropic client for every LLM caller (ai_matcher, cover_letter_generator, ...).
+
+One lazily created client per process keeps a warm HTTP connection pool, so
+consecutive calls reuse keep-alive connections instead of paying a new TCP/TLS
+handshake each time. Also holds the token usage helpers all callers share.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+import httpx
+from anthropic import Anthropic, DefaultHttpxClient
+from database import record_ai_usage
+
+# Enough connections for the scoring thread pool plus cover letters running alongside it
+ANTHROPIC_MAX_CONNECTIONS = int(os.environ.get('ANTHROPIC_MAX_CONNECTIONS', '20'))
+ANTHROPIC_POOL_LIMITS = httpx.Limits(
+    max_connections=ANTHROPIC_MAX_CONNECTIONS,
+    max_keepalive_connections=ANTHROPIC_MAX_CONNECTIONS,
+    keepalive_expiry=60.0
+)
+# Short connect timeout so a dead network fails fast; generous read timeout for long letters
+ANTHROPIC_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+# SDK retries (with its own backoff) on connection errors, 408/409/429 and 5xx
+ANTHROPIC_MAX_RETRIES = 3
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+def get_anthropic_client() -> Optional[Anthropic]:
+    """
+    The process-wide Anthropic client, created on first use. Returns None when
+    ANTHROPIC_API_KEY is not set. Rebuilt if the key changes or after a fork,
+    since a connection pool must not be shared across processes.
+    """
+    global _client, _client_key
+    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    if not api_key:
+        return None
+
+    key = (api_key, os.getpid())
+    with _client_lock:
+        if _client is None or _client_key != key:
+            _client = Anthropic(
+                api_key=api_key,
+                max_retries=ANTHROPIC_MAX_RETRIES,
+                timeout=ANTHROPIC_TIMEOUT,
+                http_client=DefaultHttpxClient(limits=ANTHROPIC_POOL_LIMITS, timeout=ANTHROPIC_TIMEOUT)
+            )
+            _client_key = key
+        return _client
+
+def message_usage(message) -> dict:
+    """Token counts from an API response, including prompt cache writes and reads."""
+    usage = getattr(message, 'usage', None)
+    return {
+        field: getattr(usage, field, 0) or 0
+        for field in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+    }
+
+def record_usage(purpose: str, model: str, usage: dict):
+    """Log one call's token usage; never breaks the caller."""
+    print(f"   🧊 Prompt cache ({purpose}): {usage['cache_read_input_tokens']} read, "
+          f"{usage['cache_creation_input_tokens']} written, {usage['input_tokens']} uncached input tokens")
+    try:
+        record_ai_usage(purpose, model, usage)
+    except sqlite3.Error as e:
+        print(f"   ⚠️  Could not record AI usage: {e}")
@@ -0,0 +1,304 @@
+"""
+Local pre-filter - a deterministic relevance score computed before any AI call.
+
+Phrase queries are built from JOB_PREFERENCES (ideal roles, preferred
+specializations, must-avoid terms), the search keywords, EXCLUDED_KEYWORDS and
+the NZ location gazetteer. A whole batch of jobs is scored in one pass with
+BM25 weighting, using document frequencies from the jobs already in jobs.db.
+Jobs that score confidently low are auto-rejected locally; only the rest are
+sent to Claude.
+
+Calibrate the threshold against past AI scores with:
+    python prefilter.py --calibrate
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cv_profile import JOB_PREFERENCES
+from job_search_config import USER_SEARCH_CONFIG, EXCLUDED_KEYWORDS, NZ_LOCATIONS
+from keyword_matcher import KeywordMatcher
+from database import get_phrase_document_frequencies, get_llm_scored_jobs
+
+PREFILTER_ENABLED = os.environ.get('PREFILTER_ENABLED', '1') == '1'
+# Jobs scoring below this are rejected without an AI call (see --calibrate)
+PREFILTER_REJECT_BELOW = float(os.environ.get('PREFILTER_REJECT_BELOW', '35'))
+# Optionally accept jobs at/above this without an AI call. Off by default: auto-apply
+# acts on the score, so confidently relevant jobs still get a full AI analysis.
+PREFILTER_ACCEPT_AT = float(os.environ['PREFILTER_ACCEPT_AT']) if os.environ.get('PREFILTER_ACCEPT_AT') else None
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Even phrases common across the corpus (e.g. "new zealand") still count as evidence
+IDF_FLOOR = 1.0
+# BM25 mass at which a facet counts as ~63% satisfied
+FACET_SCALE = 1.0
+TITLE_WEIGHT = 2
+CORPUS_STATS_TTL_SECONDS = 3600
+
+# Same points as the AI scoring rubric. Experience can't be judged locally, so it gets
+# half marks - but only as far as the job looks like a relevant role at all
+FACET_POINTS = {'location': 30, 'role': 30, 'specialization': 20}
+NEUTRAL_EXPERIENCE_POINTS = 10
+NON_NZ_MAX_SCORE = 30
+EXCLUDED_IN_DESCRIPTION_PENALTY = 10
+
+FOREIGN_LOCATIONS = [
+    'australia', 'sydney', 'melbourne', 'brisbane', 'perth', 'adelaide',
+    'united kingdom', 'england', 'london', 'scotland', 'ireland',
+    'united states', 'usa', 'canada', 'dubai', 'singapore',
+    'south africa', 'johannesburg', 'cape town', 'pretoria', 'durban'
+]
+
+def _role_phrases() -> List[str]:
+    """Ideal roles, the same roles without the generic 'teacher', and the search keywords."""
+    phrases = []
+    for role in JOB_PREFERENCES['ideal_roles'] + [k.lower() for k in USER_SEARCH_CONFIG['keywords']]:
+        phrases.append(role)
+        core = re.sub(r'\s+teacher$', '', role)
+        if core != role:
+            phrases.append(core)
+    phrases.append('teacher')
+    return list(dict.fromkeys(phrases))
+
+FACETS = {
+    'location': list(dict.fromkeys(JOB_PREFERENCES['must_have_keywords'] + [place.lower() for place in NZ_LOCATIONS])),
+    'role': _role_phrases(),
+    'specialization': list(JOB_PREFERENCES['preferred_specializations']),
+}
+MUST_AVOID = [phrase.lower() for phrase in JOB_PREFERENCES['must_avoid']]
+EXCLUDED = [keyword.lower() for keyword in EXCLUDED_KEYWORDS]
+
+_PHRASE_FACET = {}
+for _facet, _phrases in [('foreign', FOREIGN_LOCATIONS), ('avoid', MUST_AVOID), ('excluded', EXCLUDED)] + list(FACETS.items()):
+    for _phrase in _phrases:
+        _PHRASE_FACET.setdefault(_phrase, _facet)
+
+# One pass over the text finds every phrase, longest first so "primary school teacher" wins over "teacher"
+_PHRASE_MATCHER = KeywordMatcher(_PHRASE_FACET)
+_WORD_PATTERN = re.compile(r'\w+')
+
+_corpus_stats = None
+_corpus_stats_at = 0.0
+_corpus_lock = threading.Lock()
+
+def _get_corpus_stats() -> Dict:
+    """Document frequencies of the scoring phrases across jobs.db, refreshed hourly."""
+    global _corpus_stats, _corpus_stats_at
+    with _corpus_lock:
+        if _corpus_stats is None or time.time() - _corpus_stats_at > CORPUS_STATS_TTL_SECONDS:
+            try:
+                _corpus_stats = get_phrase_document_frequencies([p for p, f in _PHRASE_FACET.items() if f in FACETS])
+            except Exception as e:
+                print(f"   ⚠️  Pre-filter corpus stats unavailable, using batch only: {e}")
+                _corpus_stats = {'total': 0, 'frequencies': {}}
+            _corpus_stats_at = time.time()
+        return _corpus_stats
+
+def _phrase_counts(text: str) -> Dict[str, int]:
+    return _PHRASE_MATCHER.counts(text)
+
+def score_jobs_locally(jobs: List[dict]) -> List[dict]:
+    """
+    Score a batch of jobs 0-100 on the AI rubric's scale. Returns one dict per job
+    with 'score', per-facet 'facets' (0-1), 'reasons', and 'hard_reject' (a reason
+    string when a must-avoid or excluded term appears in the title, else None).
+    """
+    stats = _get_corpus_stats()
+    total_docs = stats['total'] + len(jobs)
+
+    # Term frequencies for every job in one pass each; title matches count double
+    docs = []
+    for job in jobs:
+        title = job.get('job_title') or ''
+        body = ' '.join(str(job.get(field) or '') for field in ('company_name', 'location', 'source_platform', 'description'))
+        counts = {}
+        for phrase, count in _phrase_counts(title).items():
+            counts[phrase] = counts.get(phrase, 0) + TITLE_WEIGHT * count
+        title_phrases = set(counts)
+        for phrase, count in _phrase_counts(body).items():
+            counts[phrase] = counts.get(phrase, 0) + count
+        length = TITLE_WEIGHT * len(_WORD_PATTERN.findall(title)) + len(_WORD_PATTERN.findall(body))
+        docs.append((counts, title_phrases, max(1, length)))
+
+    avg_length = sum(length for _, _, length in docs) / max(1, len(docs))
+    batch_df = {}
+    for counts, _, _ in docs:
+        for phrase in counts:
+            batch_df[phrase] = batch_df.get(phrase, 0) + 1
+
+    idf = {}
+    for phrase, df_in_batch in batch_df.items():
+        df = stats['frequencies'].get(phrase, 0) + df_in_batch
+        idf[phrase] = max(IDF_FLOOR, math.log(1 + (total_docs - df + 0.5) / (df + 0.5)))
+
+    results = []
+    for counts, title_phrases, length in docs:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+        mass = {facet: 0.0 for facet in FACETS}
+        hits = {'foreign': [], 'avoid': [], 'excluded': []}
+        for phrase, tf in counts.items():
+            facet = _PHRASE_FACET[phrase]
+            if facet in mass:
+                mass[facet] += idf[phrase] * tf * (BM25_K1 + 1) / (tf + norm)
+            else:
+                hits[facet].append(phrase)
+
+        facets = {facet: 1 - math.exp(-value / FACET_SCALE) for facet, value in mass.items()}
+        score = (NEUTRAL_EXPERIENCE_POINTS * max(facets['role'], facets['specialization'])
+                 + sum(FACET_POINTS[facet] * value for facet, value in facets.items()))
+        reasons = [f"{facet} {value:.0%}" for facet, value in facets.items()]
+
+        hard_reject = None
+        if hits['avoid']:
+            hard_reject = f"must-avoid term: {hits['avoid'][0]}"
+            score = 0
+        elif any(phrase in title_phrases for phrase in hits['excluded']):
+            hard_reject = f"excluded keyword in title: {next(p for p in hits['excluded'] if p in title_phrases)}"
+        elif hits['excluded']:
+            score -= EXCLUDED_IN_DESCRIPTION_PENALTY * min(2, len(hits['excluded']))
+            reasons.append(f"excluded terms: {', '.join(hits['excluded'][:2])}")
+
+        if hits['foreign'] and facets['location'] < 0.5:
+            score = min(score, NON_NZ_MAX_SCORE)
+            reasons.append(f"non-NZ location: {hits['foreign'][0]}")
+
+        results.append({
+            'score': max(0.0, min(100.0, score)),
+            'facets': facets,
+            'reasons': reasons,
+            'hard_reject': hard_reject
+        })
+    return results
+
+def prefilter_jobs(jobs: List[dict]) -> Tuple[List[dict], List[Tuple[dict, dict]]]:
+    """
+    Split jobs into (jobs_for_ai, decided) where decided holds (job_data, ai_result)
+    pairs settled locally - auto-rejections, plus confident accepts when
+    PREFILTER_ACCEPT_AT is set. ai_result has the same shape as analyze_job_match's,
+    with 'status'/'rejection_reason' set for rejections and 'prefiltered': True.
+    """
+    if not PREFILTER_ENABLED or not jobs:
+        return list(jobs), []
+
+    jobs_for_ai = []
+    decided = []
+    for job_data, local in zip(jobs, score_jobs_locally(jobs)):
+        score = round(local['score'])
+        detail = '; '.join(local['reasons'])
+        has_description = bool((job_data.get('description') or '').strip())
+
+        if local['hard_reject'] or local['score'] < PREFILTER_REJECT_BELOW:
+            reason = local['hard_reject'] or f"local relevance {score}/100 below {PREFILTER_REJECT_BELOW:.0f}"
+            decided.append((job_data, {
+                'match_score': score,
+                'analysis': f"Pre-filter: {reason} ({detail})",
+                'has_description': has_description,
+                'status': 'auto-rejected',
+                'rejection_reason': f"Pre-filter: {reason}",
+                'prefiltered': True,
+                'cached': False
+            }))
+        elif PREFILTER_ACCEPT_AT is not None and local['score'] >= PREFILTER_ACCEPT_AT:
+            decided.append((job_data, {
+                'match_score': score,
+                'analysis': f"Pre-filter: local relevance {score}/100 ({detail})",
+                'has_description': has_description,
+                'prefiltered': True,
+                'cached': False
+            }))
+        else:
+            jobs_for_ai.append(job_data)
+
+    if decided:
+        print(f"🧹 Pre-filter settled {len(decided)}/{len(jobs)} jobs locally; {len(jobs_for_ai)} go to AI scoring")
+    return jobs_for_ai, decided
+
+def _ranks(values: List[float]) -> List[float]:
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2
+        i = j + 1
+    return ranks
+
+def _pearson(xs: List[float], ys: List[float]) -> float:
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    return cov / math.sqrt(var_x * var_y) if var_x and var_y else 0.0
+
+def calibration_report(good_score: int = 50, apply_score: Optional[int] = None) -> Optional[float]:
+    """
+    Compare local scores with the AI scores already stored in jobs.db and print
+    how each reject threshold would have performed. Returns the suggested
+    threshold: the highest one that rejects no job the AI scored at/above the
+    auto-apply threshold and at most 2% of jobs it scored at/above good_score.
+    """
+    apply_score = apply_score or USER_SEARCH_CONFIG.get('auto_apply_threshold', 70)
+    jobs = get_llm_scored_jobs()
+    if len(jobs) < 10:
+        print(f"Only {len(jobs)} AI-scored jobs in the database - not enough to calibrate")
+        return None
+
+    local = score_jobs_locally(jobs)
+    local_scores = [item['score'] for item in local]
+    ai_scores = [float(job['match_score']) for job in jobs]
+    good_total = sum(1 for score in ai_scores if score >= good_score)
+
+    print(f"\n{'='*80}")
+    print(f"🧹 PRE-FILTER CALIBRATION ({len(jobs)} AI-scored jobs)")
+    print(f"{'='*80}")
+    print(f"   Pearson r:  {_pearson(local_scores, ai_scores):.3f}")
+    print(f"   Spearman ρ: {_pearson(_ranks(local_scores), _ranks(ai_scores)):.3f}")
+    hard = [(job, item) for job, item in zip(jobs, local) if item['hard_reject']]
+    if hard:
+        wrongly = sum(1 for job, _ in hard if job['match_score'] >= good_score)
+        print(f"   Hard rejects (must-avoid / excluded title): {len(hard)}, of which AI scored ≥{good_score}: {wrongly}")
+
+    print(f"\n   {'local score':<12}{'jobs':>6}{'mean AI':>9}{f'AI≥{good_score}':>8}{f'AI≥{apply_score}':>8}")
+    for low in range(0, 100, 10):
+        bucket = [ai for loc, ai in zip(local_scores, ai_scores) if low <= loc < low + 10 or (low == 90 and loc == 100)]
+        if bucket:
+            print(f"   {f'{low}-{low + 9}':<12}{len(bucket):>6}{sum(bucket) / len(bucket):>9.1f}"
+                  f"{sum(1 for ai in bucket if ai >= good_score):>8}{sum(1 for ai in bucket if ai >= apply_score):>8}")
+
+    print(f"\n   {'reject <':<10}{'rejected':>10}{'share':>8}{f'lost ≥{good_score}':>10}{f'lost ≥{apply_score}':>10}")
+    suggestion = None
+    for threshold in range(10, 65, 5):
+        rejected = [(job, item) for job, item in zip(jobs, local) if item['hard_reject'] or item['score'] < threshold]
+        lost_good = sum(1 for job, _ in rejected if job['match_score'] >= good_score)
+        lost_apply = sum(1 for job, _ in rejected if job['match_score'] >= apply_score)
+        print(f"   {threshold:<10}{len(rejected):>10}{len(rejected) / len(jobs):>8.0%}{lost_good:>10}{lost_apply:>10}")
+        if lost_apply == 0 and lost_good <= 0.02 * max(1, good_total):
+            suggestion = threshold
+
+    current = f" (current: {PREFILTER_REJECT_BELOW:.0f})"
+    if suggestion is None:
+        print(f"\n   No threshold is safe on this data - keep the pre-filter conservative{current}")
+    else:
+        print(f"\n   Suggested PREFILTER_REJECT_BELOW={suggestion}{current}")
+    print(f"{'='*80}\n")
+    return suggestion
+
+if __name__ == '__main__':
+    import sys
+    import database
+    if '--calibrate' in sys.argv:
+        paths = [arg for arg in sys.argv[1:] if arg != '--calibrate']
+        if paths:
+            database.DATABASE_PATH = paths[0]
+        calibration_report()
+    else:
+        print("Usage: python prefilter.py --calibrate [path/to/jobs.db]")
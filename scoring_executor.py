@@ -0,0 +1,228 @@
+"""
+Concurrent AI scoring - runs analyze_job_match on a bounded thread pool while
+staying inside the Anthropic account's rate limits.
+
+Requests, input tokens and output tokens per minute are each tracked with a
+token bucket shared by every caller in the process (scheduled runs, CSV imports
+and manual searches all draw from the same budget). A 429 or 529 response pauses
+all workers, honours Retry-After, and halves the request rate, which then
+recovers gradually as calls succeed. Other transient failures (5xx, 408, 409,
+connection errors and timeouts) are retried by the worker that hit them.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from anthropic import APIConnectionError, APIStatusError
+from ai_matcher import analyze_job_match, get_cached_match, estimate_match_tokens, MATCH_REQUEST_MAX_TOKENS
+from prefilter import prefilter_jobs
+from rate_limit import TokenBucket
+
+# Defaults match Anthropic's tier 1 limits for Haiku; raise them via env vars on higher tiers
+SCORING_CONCURRENCY = int(os.environ.get('AI_SCORING_CONCURRENCY', '4'))
+REQUESTS_PER_MINUTE = int(os.environ.get('ANTHROPIC_REQUESTS_PER_MINUTE', '50'))
+INPUT_TOKENS_PER_MINUTE = int(os.environ.get('ANTHROPIC_INPUT_TOKENS_PER_MINUTE', '50000'))
+OUTPUT_TOKENS_PER_MINUTE = int(os.environ.get('ANTHROPIC_OUTPUT_TOKENS_PER_MINUTE', '10000'))
+
+# Rate limit / overloaded: slow every worker down
+THROTTLE_STATUS_CODES = (429, 529)
+# Retried by the failing worker only, as the SDK would have (its own retries are off)
+TRANSIENT_STATUS_CODES = (408, 409, 500, 502, 503, 504)
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+MIN_RATE_SCALE = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+# Most jobs score_job_stream takes from a stream per batch
+SCORING_STREAM_BATCH_SIZE = 20
+
+class RateLimiter:
+    """
+    Request and token budgets plus the shared backoff state. The rate scale
+    drops multiplicatively on every 429/529 and recovers additively on success.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE,
+                 input_tokens_per_minute: int = INPUT_TOKENS_PER_MINUTE,
+                 output_tokens_per_minute: int = OUTPUT_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self.output_tokens = TokenBucket(output_tokens_per_minute)
+        self.rate_scale = 1.0
+        self.pause_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, input_estimate: int, output_estimate: int):
+        """Wait out any shared pause, then reserve budget for one request."""
+        while True:
+            with self.lock:
+                wait = self.pause_until - time.monotonic()
+                scale = self.rate_scale
+            if wait <= 0:
+                break
+            time.sleep(wait)
+
+        # A reduced rate scale makes each request cost proportionally more of the bucket
+        self.requests.acquire(1.0 / scale)
+        self.input_tokens.acquire(input_estimate)
+        self.output_tokens.acquire(output_estimate)
+
+    def record_success(self, input_estimate: int, output_estimate: int, usage: Optional[dict]):
+        """Reconcile the reserved token estimates with the real usage."""
+        if usage:
+            # Prompt cache reads and writes still count against the input token limit
+            actual_input = (usage.get('input_tokens', 0) + usage.get('cache_creation_input_tokens', 0)
+                            + usage.get('cache_read_input_tokens', 0))
+            self.input_tokens.adjust(actual_input - input_estimate)
+            self.output_tokens.adjust(usage.get('output_tokens', output_estimate) - output_estimate)
+        with self.lock:
+            self.rate_scale = min(1.0, self.rate_scale + RATE_RECOVERY_STEP)
+
+    def record_throttle(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Pause every worker and slow down after a 429/529. Returns the pause length."""
+        if retry_after is None:
+            # Full jitter so parallel workers don't retry in lockstep
+            retry_after = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        delay = max(0.5, min(BACKOFF_MAX_SECONDS, retry_after))
+        with self.lock:
+            self.rate_scale = max(MIN_RATE_SCALE, self.rate_scale / 2)
+            self.pause_until = max(self.pause_until, time.monotonic() + delay)
+        return delay
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter, so concurrent imports and scheduled runs share one budget."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+def _retry_after_seconds(error: APIStatusError) -> Optional[float]:
+    """Read the Retry-After header (seconds) from an API error, if present."""
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def score_job(job_data: dict, limiter: Optional[RateLimiter] = None) -> dict:
+    """
+    Score one job within the shared rate limits, retrying 429/529 responses and
+    transient server or connection errors. Returns the same dict shape as analyze_job_match, including its error results.
+    """
+    cached = get_cached_match(job_data)
+    if cached:
+        return cached
+
+    limiter = limiter or get_rate_limiter()
+    input_estimate = estimate_match_tokens(job_data)
+
+    reason = 'rate limited'
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire(input_estimate, MATCH_REQUEST_MAX_TOKENS)
+        try:
+            result = analyze_job_match(job_data, raise_api_errors=True)
+        except APIStatusError as e:
+            if e.status_code in THROTTLE_STATUS_CODES:
+                delay = limiter.record_throttle(attempt, _retry_after_seconds(e))
+                print(f"   ⏳ Anthropic returned {e.status_code} for '{job_data.get('job_title', '')}' - "
+                      f"pausing scoring for {delay:.1f}s (attempt {attempt + 1}/{MAX_ATTEMPTS})")
+                reason = 'rate limited'
+                continue
+            if e.status_code not in TRANSIENT_STATUS_CODES:
+                print(f"Error in AI analysis: {e}")
+                return {'match_score': 0, 'analysis': f'AI analysis error: {str(e)}', 'has_description': False}
+            reason = f"HTTP {e.status_code}"
+        except APIConnectionError as e:
+            # Includes APITimeoutError
+            reason = e.__class__.__name__
+        else:
+            limiter.record_success(input_estimate, MATCH_REQUEST_MAX_TOKENS, result.get('usage'))
+            return result
+
+        if attempt == MAX_ATTEMPTS - 1:
+            break
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        print(f"   ⏳ {reason} scoring '{job_data.get('job_title', '')}' - "
+              f"retrying in {delay:.1f}s (attempt {attempt + 1}/{MAX_ATTEMPTS})")
+        time.sleep(delay)
+
+    print(f"   ❌ Gave up scoring '{job_data.get('job_title', '')}' after {MAX_ATTEMPTS} attempts ({reason})")
+    return {'match_score': 0, 'analysis': f'AI analysis error: {reason}', 'has_description': False}
+
+def score_jobs(jobs: Iterable[dict], max_workers: Optional[int] = None) -> Iterator[Tuple[dict, dict]]:
+    """
+    Score jobs concurrently, yielding (job_data, ai_result) pairs as each one
+    completes (not in input order). Throughput is bounded by the shared rate
+    limits rather than per-request latency. Jobs the local pre-filter rejects
+    are yielded first, without an API call.
+    """
+    jobs, decided = prefilter_jobs(list(jobs))
+    yield from decided
+    if not jobs:
+        return
+
+    workers = max(1, min(max_workers or SCORING_CONCURRENCY, len(jobs)))
+    limiter = get_rate_limiter()
+    print(f"🤖 Scoring {len(jobs)} jobs with {workers} parallel workers")
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-scoring')
+    try:
+        futures = {pool.submit(score_job, job_data, limiter): job_data for job_data in jobs}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If the caller stops early, don't spend API calls on the remaining jobs
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def score_job_stream(jobs: Iterable[dict], prepare: Optional[Callable[[List[dict]], List[dict]]] = None,
+                     batch_size: int = SCORING_STREAM_BATCH_SIZE) -> Iterator[Tuple[dict, dict]]:
+    """
+    score_jobs for a lazy stream of jobs, e.g. Apify datasets still being paged in.
+    A background thread keeps pulling from the stream while earlier jobs are
+    scored; each batch is whatever has arrived (up to batch_size), passed through
+    prepare (e.g. dedupe filters) first. An error raised by the stream is re-raised
+    once the jobs that arrived before it have been scored.
+    """
+    arrived = queue.Queue()
+    finished = object()
+    errors = []
+    
+    def pull():
+        try:
+            for job_data in jobs:
+                arrived.put(job_data)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            arrived.put(finished)
+    
+    threading.Thread(target=pull, name='job-stream', daemon=True).start()
+    
+    done = False
+    while not done:
+        batch = [arrived.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(arrived.get_nowait())
+            except queue.Empty:
+                break
+        if batch[-1] is finished:
+            batch.pop()
+            done = True
+        
+        if prepare:
+            batch = prepare(batch)
+        if batch:
+            yield from score_jobs(batch)
+    
+    if errors:
+        raise errors[0]
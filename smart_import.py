@@ -5,25 +5,26 @@ Avoids duplicates by matching on URL, and falls back to title+employer matching.
 """
 
 import csv
-import sqlite3
-from ai_matcher import analyze_job_match
+from ai_matcher import score_jobs_batch, MATCH_SUB_SCORES
+from scoring_executor import score_jobs
 from auto_apply import auto_apply_to_job, should_auto_apply
-from database import job_exists, insert_job
+from database import get_db, init_db, insert_jobs_many, normalize_key
 
-def smart_import_csv(csv_path):
+def smart_import_csv(csv_path, use_batch=False):
     """
     Smart import that:
     1. Updates descriptions for existing jobs (matched by URL or title+employer)
     2. Imports NEW jobs that don't exist yet
     3. Avoids duplicates
+    
+    use_batch scores through the Message Batches API (cheaper, slower). If the
+    import is interrupted, running it again on the same CSV resumes the batch.
     """
     print(f"\n{'='*80}")
     print(f"🚀 SMART IMPORT - Import New + Update Existing")
     print(f"{'='*80}")
     
-    conn = sqlite3.connect('jobs.db')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    init_db()
     
     with open(csv_path, 'r', encoding='utf-8') as f:
         first_line = f.readline()
@@ -44,6 +45,12 @@ def smart_import_csv(csv_path):
         'auto_applied': 0
     }
     
+    # New jobs are collected here, scored concurrently, then written in one transaction
+    to_score = []
+    row_details = {}
+    pending_jobs = []
+    pending_urls = set()
+    
     for i, row in enumerate(rows):
         try:
             title = row.get('Title', row.get('Position', '')).strip()
@@ -59,16 +66,22 @@ def smart_import_csv(csv_path):
             if email == 'N/A' or not email or '@' not in email:
                 email = None
             
-            cursor.execute('SELECT id, description, status FROM jobs WHERE job_url = ?', (link,))
-            existing_job = cursor.fetchone()
+            if link in pending_urls:
+                stats['duplicates_skipped'] += 1
+                continue
+            
+            with get_db() as conn:
+                existing_job = conn.execute(
+                    'SELECT id, description, status FROM jobs WHERE job_url = ?', (link,)
+                ).fetchone()
             
             if existing_job:
                 current_desc = existing_job['description'] or ''
                 if len(description) > 50 and len(current_desc) < 50:
-                    cursor.execute('''
-                        UPDATE jobs SET description = ? WHERE id = ?
-                    ''', (description[:5000], existing_job['id']))
-                    conn.commit()
+                    with get_db() as conn:
+                        conn.execute('''
+                            UPDATE jobs SET description = ? WHERE id = ?
+                        ''', (description[:5000], existing_job['id']))
                     stats['descriptions_updated'] += 1
                     print(f"   📝 Updated description: {title[:40]}...")
                 else:
@@ -76,20 +89,23 @@ def smart_import_csv(csv_path):
                 continue
             
             if not existing_job and title and employer:
-                cursor.execute('''
-                    SELECT id, description, status FROM jobs 
-                    WHERE LOWER(job_title) LIKE LOWER(?) 
-                    AND LOWER(company_name) LIKE LOWER(?)
-                ''', (f'%{title[:30]}%', f'%{employer[:20]}%'))
-                title_match = cursor.fetchone()
+                # Prefix range on the (title_norm, company_norm) index instead of a
+                # LIKE '%...%' scan; the employer substring is checked on that small range
+                title_prefix = normalize_key(title)[:30]
+                with get_db() as conn:
+                    title_match = conn.execute('''
+                        SELECT id, description, status FROM jobs 
+                        WHERE title_norm >= ? AND title_norm < ?
+                        AND instr(company_norm, ?) > 0
+                    ''', (title_prefix, title_prefix + '\uffff', normalize_key(employer)[:20])).fetchone()
                 
                 if title_match:
                     current_desc = title_match['description'] or ''
                     if len(description) > 50 and len(current_desc) < 50:
-                        cursor.execute('''
-                            UPDATE jobs SET description = ? WHERE id = ?
-                        ''', (description[:5000], title_match['id']))
-                        conn.commit()
+                        with get_db() as conn:
+                            conn.execute('''
+                                UPDATE jobs SET description = ? WHERE id = ?
+                            ''', (description[:5000], title_match['id']))
                         stats['descriptions_updated'] += 1
                         print(f"   📝 Updated (title match): {title[:40]}...")
                     else:
@@ -100,69 +116,77 @@ def smart_import_csv(csv_path):
             print(f"      School: {employer}")
             print(f"      Email: {email or 'None'}")
             
-            job_for_analysis = {
+            to_score.append({
                 'job_title': title,
                 'company_name': employer,
                 'description': description,
                 'job_url': link
-            }
-            ai_result = analyze_job_match(job_for_analysis)
-            match_score = ai_result.get('match_score', 0)
-            ai_analysis = ai_result.get('analysis', '')
-            
-            fetched_desc = ai_result.get('fetched_description', '')
-            if fetched_desc and len(fetched_desc) > len(description):
-                description = fetched_desc
-            
-            print(f"      Match Score: {match_score}%")
-            
-            if match_score < 70:
-                print(f"      ⏭️  Skipping (below 70% threshold)")
-                stats['duplicates_skipped'] += 1
-                continue
-            
-            job_data = {
-                'job_title': title,
-                'company_name': employer,
-                'location': 'New Zealand',
-                'job_url': link,
-                'description': description[:5000] if description else '',
-                'posted_date': '',
-                'source_platform': 'Education Gazette NZ (CSV Import)',
-                'salary_info': employment_type,
-                'status': 'new',
-                'match_score': match_score,
-                'ai_analysis': ai_analysis,
-                'contact_email': email
-            }
-            
-            job_id = insert_job(job_data)
-            
-            if job_id:
-                stats['new_jobs_imported'] += 1
-                
-                if email:
-                    cursor.execute('''
-                        UPDATE jobs SET email_id = ? WHERE id = ?
-                    ''', (email, job_id))
-                    conn.commit()
-                
-                if email:
-                    print(f"      🎯 {match_score}% match with email - auto-applying...")
-                    job_data['id'] = job_id
-                    apply_result = auto_apply_to_job(job_data)
-                    if apply_result.get('success'):
-                        stats['auto_applied'] += 1
-                        print(f"      ✅ Application sent!")
-            else:
-                stats['duplicates_skipped'] += 1
+            })
+            row_details[link] = {'employment_type': employment_type, 'email': email}
+            pending_urls.add(link)
                 
         except Exception as e:
             print(f"   ⚠️  Error: {e}")
             stats['errors'] += 1
             continue
     
-    conn.close()
+    scored = score_jobs_batch(to_score, label='smart_import') if use_batch else score_jobs(to_score)
+    for job_for_analysis, ai_result in scored:
+        title = job_for_analysis['job_title']
+        link = job_for_analysis['job_url']
+        match_score = ai_result.get('match_score', 0)
+        ai_analysis = ai_result.get('analysis', '')
+        
+        description = job_for_analysis['description']
+        fetched_desc = ai_result.get('fetched_description', '')
+        if fetched_desc and len(fetched_desc) > len(description):
+            description = fetched_desc
+        
+        print(f"      {title[:50]}: Match Score {match_score}%")
+        
+        if match_score < 70:
+            print(f"      ⏭️  Skipping (below 70% threshold)")
+            stats['duplicates_skipped'] += 1
+            continue
+        
+        job_data = {
+            'job_title': title,
+            'company_name': job_for_analysis['company_name'],
+            'location': 'New Zealand',
+            'job_url': link,
+            'description': description[:5000] if description else '',
+            'posted_date': '',
+            'source_platform': 'Education Gazette NZ (CSV Import)',
+            'salary_info': row_details[link]['employment_type'],
+            'status': 'new',
+            'match_score': match_score,
+            'ai_analysis': ai_analysis,
+            'contact_email': row_details[link]['email'],
+            'cover_letter': ai_result.get('cover_letter'),
+            **{column: ai_result.get(column) for column in MATCH_SUB_SCORES}
+        }
+        pending_jobs.append(job_data)
+    
+    result = insert_jobs_many(pending_jobs)
+    
+    for job_data, outcome in zip(pending_jobs, result['outcomes']):
+        if outcome['outcome'] != 'inserted':
+            stats['duplicates_skipped'] += 1
+            continue
+        
+        stats['new_jobs_imported'] += 1
+        
+        if job_data['contact_email']:
+            print(f"   🎯 {job_data['match_score']}% match with email - auto-applying: {job_data['job_title'][:40]}...")
+            job_data['id'] = outcome['id']
+            try:
+                apply_result = auto_apply_to_job(job_data)
+                if apply_result.get('success'):
+                    stats['auto_applied'] += 1
+                    print(f"      ✅ Application sent!")
+            except Exception as e:
+                print(f"   ⚠️  Error: {e}")
+                stats['errors'] += 1
     
     print(f"\n{'='*80}")
     print(f"✅ SMART IMPORT COMPLETE!")
@@ -177,9 +201,10 @@ def smart_import_csv(csv_path):
 
 if __name__ == '__main__':
     import sys
-    if len(sys.argv) > 1:
-        csv_path = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if arg != '--batch']
+    if args:
+        csv_path = args[0]
     else:
         csv_path = 'gazette_jobs_fresh.csv'
     
-    smart_import_csv(csv_path)
+    smart_import_csv(csv_path, use_batch='--batch' in sys.argv)